@@ -0,0 +1,79 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import (absolute_import, division, print_function)
+
+__metaclass__ = type
+
+
+class ModuleDocFragment(object):
+    # Options shared by every module that talks to the Red Hat Assisted Installer API
+    DOCUMENTATION = r'''
+options:
+  retries:
+    description:
+      - Number of times a failed idempotent request (GET, DELETE) is retried on connection errors, timeouts, HTTP 429 and HTTP 5xx.
+      - POST and PATCH requests are retried at most once, and only when the API did not process them (connection refused, HTTP 429 or HTTP 503).
+      - Retries use exponential backoff with jitter and honor the C(Retry-After) header.
+    type: int
+    required: false
+    default: 3
+  timeout:
+    description:
+      - Read timeout in seconds for each request sent to the API.
+    type: int
+    required: false
+    default: 60
+  api_url:
+    description:
+      - Base URL of the Assisted Installer API, e.g. C(https://assisted.example.com/api/assisted-install/v2/) for an on-prem assisted-service.
+      - Defaults to the C(REDHAT_API_URL) environment variable, then to C(https://api.openshift.com/api/assisted-install/v2/).
+    type: str
+    required: false
+  sso_url:
+    description:
+      - URL of the SSO token endpoint the offline token is exchanged at for access tokens.
+      - Defaults to the C(REDHAT_SSO_URL) environment variable, then to the Red Hat SSO token endpoint.
+    type: str
+    required: false
+  auth_mode:
+    description:
+      - How requests to the API are authenticated.
+      - C(offline_token) sends an access token minted from the offline token.
+      - C(none) sends no credentials, for an assisted-service deployed with C(AUTH_TYPE=none).
+      - Defaults to the C(REDHAT_AUTH_MODE) environment variable, then to C(offline_token).
+    type: str
+    required: false
+    choices: ['offline_token', 'none']
+  ca_bundle:
+    description:
+      - Path to a PEM CA bundle used to verify the certificates of the API and SSO endpoints, e.g. of an internal CA.
+      - Defaults to the C(REDHAT_CA_BUNDLE) environment variable, then to the trust store of the requests package.
+    type: path
+    required: false
+  validate_certs:
+    description:
+      - Whether the TLS certificates of the API and SSO endpoints are verified.
+    type: bool
+    required: false
+    default: true
+  debug_timings:
+    description:
+      - Return the number of requests, the seconds and the bytes spent per endpoint in the C(timings) result.
+    type: bool
+    required: false
+    default: false
+  trace_file:
+    description:
+      - Path of a file every request to the API and SSO is appended to as a span in the Chrome trace event format.
+      - The file can be loaded into chrome://tracing, Perfetto or speedscope, and several tasks can append to the same file.
+      - Defaults to the C(REDHAT_TRACE_FILE) environment variable, no trace is written when neither is set.
+    type: path
+    required: false
+  persistent_client:
+    description:
+      - Send requests through a helper process that keeps one authenticated client for every task of the play.
+      - The access token, the connections to the API and the name index and desired state caches are reused between tasks.
+      - The helper is started on first use, is private to the user and the account, and exits after C(REDHAT_BROKER_IDLE_TIMEOUT) idle seconds, 300 by default.
+      - Defaults to the C(REDHAT_PERSISTENT_CLIENT) environment variable, requests are sent directly when neither is set or the helper cannot be started.
+    type: bool
+    required: false
+'''
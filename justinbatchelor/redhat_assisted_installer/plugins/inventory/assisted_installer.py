@@ -0,0 +1,306 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import (absolute_import, division, print_function)
+
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+name: assisted_installer
+short_description: Build an inventory from the hosts discovered by the Red Hat Assisted Installer
+version_added: "0.0.1"
+description:
+  - Lists the clusters and infrastructure environments of the account, then the hosts of every infrastructure environment concurrently.
+  - Every host becomes an inventory host named after its hostname, with its role, status, addresses and ids as host variables.
+  - Hosts are grouped by cluster, infrastructure environment, role and status, and can be grouped further with C(keyed_groups) and C(groups).
+  - The result can be cached with the inventory cache settings, so repeated runs within C(cache_timeout) send no request at all.
+  - The configuration file name must end with C(assisted_installer.yml) or C(assisted_installer.yaml).
+options:
+  plugin:
+    description:
+      - Marks the file as a configuration of this plugin.
+    type: str
+    required: true
+    choices:
+      - justinbatchelor.redhat_assisted_installer.assisted_installer
+  offline_token:
+    description:
+      - Offline token for authentication with the Red Hat Assisted Installer API.
+    type: str
+    required: false
+    env:
+      - name: REDHAT_OFFLINE_TOKEN
+  api_url:
+    description:
+      - Base URL of the Assisted Installer API, e.g. C(https://assisted.example.com/api/assisted-install/v2/) for an on-prem assisted-service.
+      - Defaults to C(https://api.openshift.com/api/assisted-install/v2/).
+    type: str
+    required: false
+    env:
+      - name: REDHAT_API_URL
+  sso_url:
+    description:
+      - Token endpoint the offline token is exchanged at for access tokens.
+    type: str
+    required: false
+    env:
+      - name: REDHAT_SSO_URL
+  auth_mode:
+    description:
+      - C(offline_token) sends a bearer access token minted from the offline token, C(none) sends requests without authentication.
+    type: str
+    required: false
+    choices:
+      - offline_token
+      - none
+    env:
+      - name: REDHAT_AUTH_MODE
+  ca_bundle:
+    description:
+      - PEM bundle of the CA that signed the API and SSO certificates.
+    type: path
+    required: false
+    env:
+      - name: REDHAT_CA_BUNDLE
+  validate_certs:
+    description:
+      - Whether the TLS certificates of the API and SSO are verified.
+    type: bool
+    default: true
+  timeout:
+    description:
+      - Read timeout in seconds for each request sent to the API.
+    type: int
+    default: 60
+  retries:
+    description:
+      - Number of times a failed request is retried.
+    type: int
+    default: 3
+  max_workers:
+    description:
+      - Number of infrastructure environments whose hosts are listed at the same time.
+    type: int
+    default: 8
+  cluster_ids:
+    description:
+      - Only include the hosts of these clusters.
+    type: list
+    elements: str
+    required: false
+  infra_env_ids:
+    description:
+      - Only include the hosts of these infrastructure environments.
+    type: list
+    elements: str
+    required: false
+  hostnames:
+    description:
+      - C(hostname) names inventory hosts after their requested or discovered hostname, C(id) after their host id.
+      - Hosts without a hostname, or whose hostname is already taken by another host, are named after their id.
+    type: str
+    default: hostname
+    choices:
+      - hostname
+      - id
+  default_groups:
+    description:
+      - Add every host to the C(assisted_installer), C(cluster_<name>), C(infra_env_<name>), C(role_<role>) and C(status_<status>) groups.
+      - The role is the one assigned to the host, or the suggested one while it is C(auto-assign).
+      - Characters not valid in group names, such as the dashes of cluster names, are replaced by underscores.
+    type: bool
+    default: true
+  include_inventory:
+    description:
+      - Add the hardware inventory reported by the agent as the C(assisted_inventory) host variable.
+    type: bool
+    default: false
+extends_documentation_fragment:
+  - constructed
+  - inventory_cache
+author:
+  - Justin Batchelor (@justinbatchelor)
+'''
+
+EXAMPLES = r'''
+# assisted_installer.yml
+plugin: justinbatchelor.redhat_assisted_installer.assisted_installer
+cluster_ids:
+  - "your_cluster_id"
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_connection: ~/.cache/assisted-installer-inventory
+cache_timeout: 300
+keyed_groups:
+  - key: assisted_cpu_count | string
+    prefix: cpus
+compose:
+  ansible_user: "'core'"
+'''
+
+import re
+
+from ansible.errors import AnsibleError
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable
+
+from ansible_collections.justinbatchelor.redhat_assisted_installer.plugins.module_utils.api import (
+    get_clusters, get_infrastructure_environement_hosts, get_infrastructure_environements,
+)
+from ansible_collections.justinbatchelor.redhat_assisted_installer.plugins.module_utils.bulk import run_bounded
+from ansible_collections.justinbatchelor.redhat_assisted_installer.plugins.module_utils.client import AssistedInstallerClient, set_client
+from ansible_collections.justinbatchelor.redhat_assisted_installer.plugins.module_utils.hosts import host_addresses, host_hostname, host_inventory
+from ansible_collections.justinbatchelor.redhat_assisted_installer.plugins.module_utils.retry import RetryPolicy
+
+
+# prefix of every host variable set by the plugin
+VAR_PREFIX = "assisted_"
+
+# characters replaced in the default group names, which must be valid variable names
+INVALID_GROUP_CHARS = re.compile(r"[^A-Za-z0-9_]")
+
+
+def host_record(host: dict, infra_env: dict, cluster_names: dict, include_inventory: bool) -> dict:
+    """
+    Returns the host variables of one host, the unit cached between runs.
+    """
+    inventory = host_inventory(host)
+    addresses = host_addresses(inventory)
+    role = host.get("role")
+    record = dict(
+        id=host.get("id"),
+        hostname=host_hostname(host, inventory),
+        role=role,
+        suggested_role=host.get("suggested_role"),
+        effective_role=host.get("suggested_role") if role in (None, "auto-assign") and host.get("suggested_role") else role,
+        status=host.get("status"),
+        status_info=host.get("status_info"),
+        stage=(host.get("progress") or {}).get("current_stage"),
+        infra_env_id=infra_env.get("id"),
+        infra_env_name=infra_env.get("name"),
+        cluster_id=host.get("cluster_id") or infra_env.get("cluster_id"),
+        installation_disk_path=host.get("installation_disk_path"),
+        cpu_count=(inventory.get("cpu") or {}).get("count"),
+        memory_bytes=(inventory.get("memory") or {}).get("physical_bytes"),
+        **addresses,
+    )
+    record["cluster_name"] = cluster_names.get(record["cluster_id"])
+    if include_inventory:
+        record["inventory"] = inventory
+    return record
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+
+    NAME = 'justinbatchelor.redhat_assisted_installer.assisted_installer'
+
+    def verify_file(self, path):
+        return super().verify_file(path) and path.endswith(("assisted_installer.yml", "assisted_installer.yaml"))
+
+    def parse(self, inventory, loader, path, cache=True):
+        super().parse(inventory, loader, path, cache)
+        self._read_config_data(path)
+
+        cache_key = self.get_cache_key(path)
+        # the cache is read unless --flush-cache was given, and written whenever it was not read
+        use_cache = self.get_option('cache') and cache
+        update_cache = self.get_option('cache') and not cache
+
+        records = None
+        if use_cache:
+            try:
+                records = self._cache[cache_key]
+            except KeyError:
+                update_cache = True
+        if records is None:
+            records = self.fetch_records()
+        if update_cache:
+            self._cache[cache_key] = records
+
+        self.populate(records)
+
+    def create_client(self) -> AssistedInstallerClient:
+        return AssistedInstallerClient(
+            api_base=self.get_option('api_url'),
+            offline_token=self.get_option('offline_token'),
+            sso_url=self.get_option('sso_url'),
+            auth_mode=self.get_option('auth_mode'),
+            ca_bundle=self.get_option('ca_bundle'),
+            validate_certs=self.get_option('validate_certs'),
+            timeout=self.get_option('timeout'),
+            retry_policy=RetryPolicy(retries=self.get_option('retries')),
+        )
+
+    def fetch_records(self) -> list:
+        """
+        Lists clusters and infrastructure environments side by side, then the hosts of every infrastructure environment on a bounded pool.
+        """
+        set_client(self.create_client())
+
+        listings = run_bounded(lambda get_all: get_all(), [get_clusters, get_infrastructure_environements])
+        clusters, infra_envs = [self.json_or_fail(response, error, "list the clusters and infrastructure environments")
+                                for response, error in listings]
+        cluster_names = {cluster.get("id"): cluster.get("name") for cluster in clusters}
+
+        cluster_ids = self.get_option('cluster_ids')
+        infra_env_ids = self.get_option('infra_env_ids')
+        # infra envs without a cluster (late binding) may hold hosts bound to one of the clusters
+        infra_envs = [infra_env for infra_env in infra_envs
+                      if (not cluster_ids or not infra_env.get("cluster_id") or infra_env.get("cluster_id") in cluster_ids)
+                      and (not infra_env_ids or infra_env.get("id") in infra_env_ids)]
+
+        outcomes = run_bounded(lambda infra_env: get_infrastructure_environement_hosts(infra_env_id=infra_env["id"]),
+                               infra_envs, self.get_option('max_workers'))
+
+        include_inventory = self.get_option('include_inventory')
+        records = []
+        for infra_env, (response, error) in zip(infra_envs, outcomes):
+            hosts = self.json_or_fail(response, error, f"list the hosts of infrastructure environment {infra_env.get('id')}")
+            for host in hosts:
+                record = host_record(host, infra_env, cluster_names, include_inventory)
+                if cluster_ids and record["cluster_id"] not in cluster_ids:
+                    continue
+                records.append(record)
+        return records
+
+    def json_or_fail(self, response, error, action: str):
+        if error is None and not response.ok:
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+        if error is not None:
+            raise AnsibleError(f"Failed to {action}: {error}")
+        return response.json()
+
+    def populate(self, records: list) -> None:
+        strict = self.get_option('strict')
+        by_id = self.get_option('hostnames') == "id"
+        default_groups = self.get_option('default_groups')
+        owners = {}
+
+        if default_groups:
+            self.inventory.add_group("assisted_installer")
+
+        for record in records:
+            name = record["id"] if by_id else (record.get("hostname") or record["id"])
+            # two hosts reporting the same hostname must not be merged into one inventory host
+            if owners.setdefault(name, record["id"]) != record["id"]:
+                self.display.warning(f"Hostname {name} is used by hosts {owners[name]} and {record['id']}, naming the latter by its id")
+                name = record["id"]
+                owners[name] = record["id"]
+
+            self.inventory.add_host(name)
+            hostvars = {f"{VAR_PREFIX}{key}": value for key, value in record.items()}
+            address = (record["ipv4_addresses"] or record["ipv6_addresses"] or [None])[0]
+            if address is not None:
+                hostvars["ansible_host"] = address
+            for key, value in hostvars.items():
+                self.inventory.set_variable(name, key, value)
+
+            if default_groups:
+                self.inventory.add_child("assisted_installer", name)
+                for prefix, value in (("cluster", record["cluster_name"]), ("infra_env", record["infra_env_name"]),
+                                      ("role", record["effective_role"]), ("status", record["status"])):
+                    if value:
+                        group = self.inventory.add_group(INVALID_GROUP_CHARS.sub("_", f"{prefix}_{value}"))
+                        self.inventory.add_child(group, name)
+
+            self._set_composite_vars(self.get_option('compose'), hostvars, name, strict=strict)
+            self._add_host_to_composed_groups(self.get_option('groups'), hostvars, name, strict=strict)
+            self._add_host_to_keyed_groups(self.get_option('keyed_groups'), hostvars, name, strict=strict)
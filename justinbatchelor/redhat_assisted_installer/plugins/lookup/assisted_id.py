@@ -0,0 +1,220 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import (absolute_import, division, print_function)
+
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+name: assisted_id
+short_description: Resolve Red Hat Assisted Installer cluster and infrastructure environment names to ids
+version_added: "0.0.1"
+description:
+  - Returns the id, or another attribute, of the clusters or infrastructure environments with the given names.
+  - The objects are listed once and kept for the life of the process, so any number of lookups cost a single API call.
+    A name missing from the listing triggers one more listing, to find objects created since.
+  - Ansible evaluates the templates of each task in its own worker process. With C(persistent_client) the listing is also
+    kept by the helper process of the persistent client, so every task of the play shares it.
+options:
+  _terms:
+    description:
+      - The kind of object, C(cluster) or C(infra_env), followed by one or more names.
+    required: true
+  field:
+    description:
+      - Attribute of the objects to return, e.g. C(status) or C(openshift_version).
+    type: str
+    default: id
+  errors:
+    description:
+      - What to do with a name no object or several objects have, C(strict) fails, C(warn) and C(ignore) return null.
+    type: str
+    default: strict
+    choices:
+      - strict
+      - warn
+      - ignore
+  ttl:
+    description:
+      - Seconds a listing is reused for, 0 keeps it for the life of the process.
+    type: int
+    default: 0
+  offline_token:
+    description:
+      - Offline token for authentication with the Red Hat Assisted Installer API.
+    type: str
+    env:
+      - name: REDHAT_OFFLINE_TOKEN
+  api_url:
+    description:
+      - Base URL of the Assisted Installer API, defaults to C(https://api.openshift.com/api/assisted-install/v2/).
+    type: str
+    env:
+      - name: REDHAT_API_URL
+  sso_url:
+    description:
+      - Token endpoint the offline token is exchanged at for access tokens.
+    type: str
+    env:
+      - name: REDHAT_SSO_URL
+  auth_mode:
+    description:
+      - C(offline_token) sends a bearer access token minted from the offline token, C(none) sends requests without authentication.
+    type: str
+    choices:
+      - offline_token
+      - none
+    env:
+      - name: REDHAT_AUTH_MODE
+  ca_bundle:
+    description:
+      - PEM bundle of the CA that signed the API and SSO certificates.
+    type: path
+    env:
+      - name: REDHAT_CA_BUNDLE
+  validate_certs:
+    description:
+      - Whether the TLS certificates of the API and SSO are verified.
+    type: bool
+    default: true
+  persistent_client:
+    description:
+      - Send requests through the helper process of the persistent client and keep the listings in it for the whole play.
+    type: bool
+    env:
+      - name: REDHAT_PERSISTENT_CLIENT
+author:
+  - Justin Batchelor (@justinbatchelor)
+'''
+
+EXAMPLES = r'''
+- name: Install a cluster by name
+  justinbatchelor.redhat_assisted_installer.cluster_actions:
+    cluster_id: "{{ lookup('justinbatchelor.redhat_assisted_installer.assisted_id', 'cluster', 'my-cluster') }}"
+    state: install
+
+- name: Get the ids of several infrastructure environments
+  ansible.builtin.debug:
+    msg: "{{ query('justinbatchelor.redhat_assisted_installer.assisted_id', 'infra_env', 'env-a', 'env-b') }}"
+
+- name: Get the status of a cluster, null when it does not exist
+  ansible.builtin.debug:
+    msg: "{{ lookup('justinbatchelor.redhat_assisted_installer.assisted_id', 'cluster', 'my-cluster', field='status', errors='ignore') }}"
+'''
+
+RETURN = r'''
+_raw:
+  description:
+    - The requested attribute of the object with each name, in the order of the names.
+  type: list
+'''
+
+import time
+
+from ansible.errors import AnsibleError
+from ansible.plugins.lookup import LookupBase
+from ansible.utils.display import Display
+
+from ansible_collections.justinbatchelor.redhat_assisted_installer.plugins.module_utils.api import get_clusters, get_infrastructure_environements
+from ansible_collections.justinbatchelor.redhat_assisted_installer.plugins.module_utils.client import AssistedInstallerClient, persistent_client_enabled, set_client
+from ansible_collections.justinbatchelor.redhat_assisted_installer.plugins.module_utils.tools import IndexedResponse
+
+display = Display()
+
+# collection name in the api and listing function of every kind of object
+KINDS = {
+    "cluster": ("clusters", get_clusters),
+    "infra_env": ("infra-envs", get_infrastructure_environements),
+}
+
+## listings shared by every lookup in this process, keyed by kind and account
+_listings = {}
+
+
+class LookupModule(LookupBase):
+
+    def run(self, terms, variables=None, **kwargs):
+        self.set_options(var_options=variables, direct=kwargs)
+
+        if len(terms) < 2:
+            raise AnsibleError("assisted_id expects the kind of object, cluster or infra_env, followed by one or more names")
+        kind, names = terms[0], terms[1:]
+        if kind not in KINDS:
+            raise AnsibleError(f"Unsupported kind {kind}, expected one of {', '.join(KINDS)}")
+
+        client = set_client(self.create_client())
+        listing = self.listing(kind, client)
+        refreshed = False
+
+        results = []
+        for name in names:
+            matches = listing.get_by_name(name)
+            # the object may have been created after the listing, list once more
+            if not matches and not refreshed:
+                listing = self.listing(kind, client, refresh=True)
+                refreshed = True
+                matches = listing.get_by_name(name)
+            results.append(self.select(kind, name, matches))
+        return results
+
+    def create_client(self) -> AssistedInstallerClient:
+        client = AssistedInstallerClient(
+            api_base=self.get_option('api_url'),
+            offline_token=self.get_option('offline_token'),
+            sso_url=self.get_option('sso_url'),
+            auth_mode=self.get_option('auth_mode'),
+            ca_bundle=self.get_option('ca_bundle'),
+            validate_certs=self.get_option('validate_certs'),
+        )
+        if persistent_client_enabled(self.get_option('persistent_client')):
+            client.connect_broker()
+        return client
+
+    def listing(self, kind: str, client: AssistedInstallerClient, refresh: bool = False) -> IndexedResponse:
+        """
+        Returns the indexed listing of a kind of object, from memory, the broker or the api in that order.
+        """
+        collection, get_all = KINDS[kind]
+        key = (kind, client.account_key())
+        ttl = self.get_option('ttl')
+
+        if not refresh:
+            entry = _listings.get(key)
+            if entry is None and client.broker is not None:
+                try:
+                    shared = client.broker.cache_get(f"{collection}-listing")
+                except OSError:
+                    shared = None
+                if shared is not None:
+                    entry = _listings[key] = (shared["built_at"], IndexedResponse(shared["objects"]))
+            if entry is not None and (not ttl or entry[0] + ttl > time.time()):
+                return entry[1]
+
+        try:
+            response = get_all()
+            response.raise_for_status()
+        except Exception as e:
+            raise AnsibleError(f"Failed to list the {collection}: {e}")
+
+        objects = response.json()
+        built_at = time.time()
+        _listings[key] = (built_at, IndexedResponse(objects))
+        if client.broker is not None:
+            try:
+                client.broker.cache_put(f"{collection}-listing", dict(built_at=built_at, objects=objects))
+            except OSError:
+                pass
+        return _listings[key][1]
+
+    def select(self, kind: str, name: str, matches: list):
+        if len(matches) == 1:
+            return matches[0].get(self.get_option('field'))
+
+        if matches:
+            error = f"{len(matches)} objects of kind {kind} are named {name}: {', '.join(str(match.get('id')) for match in matches)}"
+        else:
+            error = f"No object of kind {kind} is named {name}"
+        if self.get_option('errors') == "strict":
+            raise AnsibleError(error)
+        if self.get_option('errors') == "warn":
+            display.warning(error)
+        return None
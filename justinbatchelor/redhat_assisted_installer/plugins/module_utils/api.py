@@ -4,76 +4,62 @@ import requests
 ## import url encoding functions
 from urllib.parse import urlencode
 
-## import the python classes that implement the various schemas defined and used by the api
-from .schema.cluster import *
-from .schema.infra_env import *
+## import the pooled http client shared by all api calls
+from .client import get_client
 
 ## importing helper functions
-from .tools import *
+from .tools import filter_dict_by_keys
 
+# the schema classes and the downloader are not imported here, so modules that only read
+# from the api do not load them; annotations naming them are strings for the same reason
 
-API_BASE = "https://api.openshift.com/api/assisted-install/v2/"
+## attributes accepted by the PATCH endpoints, the only ones compared when updating an object
+CLUSTER_PATCH_PARAMS = [
+    "additional_ntp_source","api_vips","base_dns_domain","cluster_network_cidr",
+    "cluster_network_host_prefix","cluster_networks","disk_encryption","http_proxy","https_proxy","hyperthreading",
+    "ignition_endpoint","ingress_vips","machine_network_cidr","machine_networks","name","network_type","no_proxy",
+    "olm_operators","platform","pull_secret","schedulable_masters","service_network_cidr","service_networks",
+    "ssh_public_key","tags","user_managed_networking","vip_dhcp_allocation",
+]
 
-def __get_headers():
-    return  {
-        "Authorization": "Bearer {}".format(__get_access_token()),
-        "Content-Type": "application/json"
-    }
+INFRA_ENV_PATCH_PARAMS = [
+    "additional_ntp_sources","additional_trust_bundle","ignition_config_override","image_type",
+    "kernel_arguments","proxy","pull_secret","ssh_authorized_key","static_network_config",
+]
 
-
-def __get_access_token():
-    # URL for the token request
-    url = "https://sso.redhat.com/auth/realms/redhat-external/protocol/openid-connect/token"
-
-    # Headers to be sent with the request
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
-
-    # Data to be sent in the request, explicitly encoding each variable
-    data = urlencode({
-        "grant_type": "refresh_token",
-        "client_id": "cloud-services",
-        "refresh_token": os.environ.get("REDHAT_OFFLINE_TOKEN")
-    })
-
-    response = requests.post(url, headers=headers, data=data)
-    access_token = response.json().get("access_token")
-    return access_token
+HOST_PATCH_PARAMS = [
+    "disks_selected_config","host_name","host_role","machine_config_pool_name","node_labels",
+]
 
 
 def get_cluster(cluster_id: str=None) -> requests.Response:
-    url = API_BASE + f"clusters/{cluster_id}"
+    endpoint = f"clusters/{cluster_id}"
 
-    response = requests.get(url, headers=__get_headers())
+    response = get_client().get(endpoint)
     return response   
 
 def get_default_config() -> requests.Response:
-    url = API_BASE + f"clusters/default-config"
+    endpoint = f"clusters/default-config"
 
-    response = requests.get(url, headers=__get_headers())
+    response = get_client().get(endpoint)
  
     return response
 
 def get_clusters(with_hosts: bool=False, owner: str=None) -> requests.Response:
-    url = API_BASE + "clusters"
+    endpoint = "clusters"
 
+    # filters the api applies itself, so unwanted clusters are never serialized
+    query_string = {}
     if with_hosts:
-        if '?' not in url:
-            url += '?'
-        url += f'with_hosts={with_hosts}&'            
-
+        query_string["with_hosts"] = "true"
     if owner is not None:
-        if '?' not in url:
-            url += '?'
-        url += f'owner={owner}&'
-    
-    response = requests.get(url, headers=__get_headers())
+        query_string["owner"] = owner
+
+    response = get_client().get(endpoint, params=query_string) if query_string else get_client().get(endpoint)
  
     return response
 
-def post_cluster(cluster: Cluster) -> requests.Response:
+def post_cluster(cluster: "Cluster") -> requests.Response:
     VALID_POST_PARAMS = [
         "additional_ntp_source","api_vips","base_dns_domain","cluster_networks","cpu_architecture","disk_encryption",
         "high_availability_mode","http_proxy","https_proxy","hyperthreading","ignition_endpoint","ingress_vips",
@@ -82,163 +68,214 @@ def post_cluster(cluster: Cluster) -> requests.Response:
         "tags","user_managed_networking","vip_dhcp_allocation",
         ]
     
-    url = API_BASE + "clusters"
+    endpoint = "clusters"
 
     cluster_params = filter_dict_by_keys(cluster.create_params(), VALID_POST_PARAMS)
 
-    response = requests.post(url, headers=__get_headers(), json=cluster_params)    
+    response = get_client().post(endpoint, json=cluster_params)    
  
     return response
 
 def patch_cluster(cluster_id: str, cluster: dict) -> requests.Response:
-    VALID_PATCH_PARAMS = [
-        "additional_ntp_source","api_vips","base_dns_domain","cluster_network_cidr",
-        "cluster_network_host_prefix","cluster_networks","disk_encryption","http_proxy","https_proxy","hyperthreading",
-        "ignition_endpoint","ingress_vips","machine_network_cidr","machine_networks","name","network_type","no_proxy",
-        "olm_operators","platform","pull_secret","schedulable_masters","service_network_cidr","service_networks",
-        "ssh_public_key","tags","user_managed_networking","vip_dhcp_allocation",
-        ]
+    endpoint = f"clusters/{cluster_id}"
     
-    url = API_BASE + f"clusters/{cluster_id}"
-    
-    cluster_params = filter_dict_by_keys(cluster, VALID_PATCH_PARAMS)
+    cluster_params = filter_dict_by_keys(cluster, CLUSTER_PATCH_PARAMS)
 
-    response = requests.patch(url, headers=__get_headers(), json=cluster_params)
+    response = get_client().patch(endpoint, json=cluster_params)
  
     return response
 
 def delete_cluster(cluster_id: str) -> bool:
-    url = API_BASE + f"clusters/{cluster_id}"
-    response = requests.delete(url, headers=__get_headers())
+    endpoint = f"clusters/{cluster_id}"
+    response = get_client().delete(endpoint)
     return True if (response.status_code == 204) else False
 
 def get_infrastructure_environement(infra_env_id: str) -> requests.Response:
-    url = API_BASE + f"infra-envs/{infra_env_id}"
+    endpoint = f"infra-envs/{infra_env_id}"
 
-    response = requests.get(url, headers=__get_headers())
+    response = get_client().get(endpoint)
  
     return response
 
 # Method that will implement the /v2/infra-envs GET assisted installer endpoint
-def get_infrastructure_environements() -> requests.Response:
-    url = API_BASE + "infra-envs"
-    
-    response = requests.get(url, headers=__get_headers())
+def get_infrastructure_environements(cluster_id: str=None, owner: str=None) -> requests.Response:
+    endpoint = "infra-envs"
+
+    query_string = {}
+    if cluster_id is not None:
+        query_string["cluster_id"] = cluster_id
+    if owner is not None:
+        query_string["owner"] = owner
+
+    response = get_client().get(endpoint, params=query_string) if query_string else get_client().get(endpoint)
  
     return response
 
-    
 def patch_infrastructure_environment(infra_env_id: str, infra_env: dict) -> requests.Response:
-    VALID_PATCH_PARAMS =  [
-        "additional_ntp_sources","additional_trust_bundle","ignition_config_override","image_type",
-        "kernel_arguments","proxy","pull_secret","ssh_authorized_key","static_network_config",
-        ]
-    
-    url = API_BASE + f"infra-envs/{infra_env_id}"
+    endpoint = f"infra-envs/{infra_env_id}"
 
-    infra_env_params = filter_dict_by_keys(infra_env, VALID_PATCH_PARAMS)
+    infra_env_params = filter_dict_by_keys(infra_env, INFRA_ENV_PATCH_PARAMS)
 
-    response = requests.patch(url, headers=__get_headers(), json=infra_env_params)
+    response = get_client().patch(endpoint, json=infra_env_params)
  
     return response
 
-def post_infrastructure_environment(infra_env: InfraEnv) -> requests.Response:
+def post_infrastructure_environment(infra_env: "InfraEnv") -> requests.Response:
     VALID_POST_PARAMS = [
         "additional_ntp_sources","additional_trust_bundle","cluster_id","cpu_architecture",
         "ignition_config_override","image_type","kernel_arguments","name","openshift_version",
         "proxy","pull_secret","ssh_authorized_key","static_network_config",
         ]
     
-    url = API_BASE + "infra-envs"
+    endpoint = "infra-envs"
 
     infra_env_params = filter_dict_by_keys(infra_env.create_params(), VALID_POST_PARAMS)
 
-    response = requests.post(url, headers=__get_headers(), json=infra_env_params)
+    response = get_client().post(endpoint, json=infra_env_params)
  
     return response
 
 def delete_infrastructure_environment(infra_env_id: str) -> bool:
-    url = API_BASE + f"infra-envs/{infra_env_id}"
+    endpoint = f"infra-envs/{infra_env_id}"
 
-    response = requests.delete(url, headers=__get_headers())
+    response = get_client().delete(endpoint)
     return True if (response.status_code == 204) else False
 
 def cluster_action_allow_add_hosts(cluster_id: str):
-    url = API_BASE + f"clusters/{cluster_id}/actions/allow-add-hosts"
+    endpoint = f"clusters/{cluster_id}/actions/allow-add-hosts"
 
-    response = requests.post(url, headers=__get_headers())
+    response = get_client().post(endpoint)
  
     return response
 
 def cluster_action_allow_add_workers(cluster_id: str):
-    url = API_BASE + f"clusters/{cluster_id}/actions/allow-add-workers"
+    endpoint = f"clusters/{cluster_id}/actions/allow-add-workers"
 
-    response = requests.post(url, headers=__get_headers())
+    response = get_client().post(endpoint)
  
     return response
 
 def cluster_action_cancel(cluster_id: str):
-    url = API_BASE + f"clusters/{cluster_id}/actions/cancel"
+    endpoint = f"clusters/{cluster_id}/actions/cancel"
 
-    response = requests.post(url, headers=__get_headers())
+    response = get_client().post(endpoint)
     print(f"Successfully canceled installation for cluster: {cluster_id}") 
  
     return response
 
 def cluster_action_complete_installation(cluster_id: str):
-    url = API_BASE + f"clusters/{cluster_id}/actions/complete-installation"
+    endpoint = f"clusters/{cluster_id}/actions/complete-installation"
     
-    response = requests.post(url, headers=__get_headers())
+    response = get_client().post(endpoint)
     print(f"Successfully complete installation for cluster: {cluster_id}")      
  
     return response
 
 def cluster_action_reset(cluster_id: str):
-    url = API_BASE + f"clusters/{cluster_id}/actions/reset"
+    endpoint = f"clusters/{cluster_id}/actions/reset"
 
-    response = requests.post(url, headers=__get_headers())
+    response = get_client().post(endpoint)
  
     return response
 
 def cluster_action_install(cluster_id: str):
 
-    url = API_BASE + f"clusters/{cluster_id}/actions/install"
-    response = requests.post(url, headers=__get_headers())
+    endpoint = f"clusters/{cluster_id}/actions/install"
+    response = get_client().post(endpoint)
     print(f"Successfully initiated cluster install for cluster: {cluster_id}")
  
     return response
     
 def cluster_get_credentials(cluster_id: str, credentials: str = None):
     endpoint = f"clusters/{cluster_id}/downloads/credentials" if credentials is not None else f"clusters/{cluster_id}/credentials"
-    url = API_BASE + endpoint
     
     query_string = {"file_name": credentials}
 
     if credentials is not None:
-        response = requests.get(url, headers=__get_headers(), params=query_string)
+        response = get_client().get(endpoint, params=query_string)
         return response
     else:
-        response = requests.get(url, headers=__get_headers())
+        response = get_client().get(endpoint)
         return response
 
 def cluster_get_files(cluster_id: str, file_name: str = "install-config.yaml"):
-    url = API_BASE + f"clusters/{cluster_id}/downloads/files"
+    endpoint = f"clusters/{cluster_id}/downloads/files"
     
     query_string = {"file_name": file_name}
 
-    response = requests.get(url, headers=__get_headers(), params=query_string)
+    response = get_client().get(endpoint, params=query_string)
     return response
 
+def download_cluster_artifact(endpoint: str, file_name: str, dest: str, connections: int = None, checksum: str = None) -> dict:
+    from .download import DEFAULT_CONNECTIONS, ParallelDownloader
+
+    client = get_client()
+    downloader = ParallelDownloader(
+        session=client.session,
+        connections=connections or DEFAULT_CONNECTIONS,
+        timeout=client.timeout,
+        retry_policy=client.retry_policy,
+        headers=client.get_headers(),
+    )
+    url = f"{client.api_base}{endpoint}?{urlencode({'file_name': file_name})}"
+    return downloader.download(url, dest, checksum=checksum)
+
+def cluster_download_credentials(cluster_id: str, credentials: str, dest: str, connections: int = None) -> dict:
+    endpoint = f"clusters/{cluster_id}/downloads/credentials"
+
+    return download_cluster_artifact(endpoint, credentials, dest, connections)
+
+def cluster_download_files(cluster_id: str, dest: str, file_name: str = "install-config.yaml", connections: int = None) -> dict:
+    endpoint = f"clusters/{cluster_id}/downloads/files"
+
+    return download_cluster_artifact(endpoint, file_name, dest, connections)
+
 def get_infrastructure_environement_hosts(infra_env_id: str) -> requests.Response:
-    url = API_BASE + f"infra-envs/{infra_env_id}/hosts"
+    endpoint = f"infra-envs/{infra_env_id}/hosts"
 
-    response = requests.get(url, headers=__get_headers())
+    response = get_client().get(endpoint)
  
     return response
 
 def get_infrastructure_environement_host(infra_env_id: str, host_id: str) -> requests.Response:
-    url = API_BASE + f"infra-envs/{infra_env_id}/hosts/{host_id}"
+    endpoint = f"infra-envs/{infra_env_id}/hosts/{host_id}"
+
+    response = get_client().get(endpoint)
+ 
+    return response
+
+def patch_infrastructure_environment_host(infra_env_id: str, host_id: str, host: dict) -> requests.Response:
+    endpoint = f"infra-envs/{infra_env_id}/hosts/{host_id}"
+
+    host_params = filter_dict_by_keys(host, HOST_PATCH_PARAMS)
+
+    response = get_client().patch(endpoint, json=host_params)
 
-    response = requests.get(url, headers=__get_headers())
+    return response
+
+# Method that will implement the /v2/events GET assisted installer endpoint
+def get_events(cluster_id: str=None, infra_env_id: str=None, host_id: str=None, severities: list=None,
+               categories: list=None, order: str=None, limit: int=None, offset: int=None) -> requests.Response:
+    endpoint = "events"
+
+    query_string = {}
+    for key, value in (("cluster_id", cluster_id), ("infra_env_id", infra_env_id), ("host_id", host_id),
+                       ("order", order), ("limit", limit), ("offset", offset)):
+        if value is not None:
+            query_string[key] = value
+    # list filters are sent as comma separated values
+    if severities:
+        query_string["severities"] = ",".join(severities)
+    if categories:
+        query_string["categories"] = ",".join(categories)
+
+    response = get_client().get(endpoint, params=query_string)
+
+    return response
+
+def get_infrastructure_environement_image_url(infra_env_id: str) -> requests.Response:
+    endpoint = f"infra-envs/{infra_env_id}/downloads/image-url"
+
+    response = get_client().get(endpoint)
  
-    return response
\ No newline at end of file
+    return response
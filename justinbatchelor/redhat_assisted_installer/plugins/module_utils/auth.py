@@ -0,0 +1,199 @@
+import hashlib, json, os, tempfile, threading, time
+
+import requests
+
+## import url encoding functions
+from urllib.parse import urlencode
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+SSO_TOKEN_URL = "https://sso.redhat.com/auth/realms/redhat-external/protocol/openid-connect/token"
+
+# environment variable overriding the token endpoint, e.g. to use a local stand-in of the api
+SSO_URL_ENV = "REDHAT_SSO_URL"
+
+# environment variable that enables the on-disk token cache when set to a directory
+TOKEN_CACHE_DIR_ENV = "REDHAT_TOKEN_CACHE_DIR"
+
+# seconds before the advertised expiry at which a cached token is considered stale
+DEFAULT_REFRESH_MARGIN = 60
+
+# lifetime assumed when the sso response does not carry an expires_in value
+DEFAULT_EXPIRES_IN = 300
+
+
+def request_access_token(offline_token: str, post=requests.post, token_url: str = SSO_TOKEN_URL) -> dict:
+    """
+    Exchanges an offline token for an access token at the Red Hat SSO token endpoint.
+
+    Args:
+        offline_token (str): The offline (refresh) token for the Red Hat account.
+        post (callable): Callable with the signature of requests.post used to send the request.
+        token_url (str): The SSO token endpoint.
+
+    Returns:
+        dict: The decoded token response, containing at least access_token and expires_in.
+    """
+    # Headers to be sent with the request
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
+
+    # Data to be sent in the request, explicitly encoding each variable
+    data = urlencode({
+        "grant_type": "refresh_token",
+        "client_id": "cloud-services",
+        "refresh_token": offline_token,
+    })
+
+    response = post(token_url, headers=headers, data=data)
+    return response.json()
+
+
+class AccessTokenCache:
+    """
+    Caches SSO access tokens per offline token until shortly before they expire.
+
+    Tokens are always kept in memory for the life of the process. When a cache directory
+    is configured, tokens are also persisted to a 0600 file named after a sha256 hash of
+    the offline token, so that separate module processes can share one token. A lock file
+    serializes refreshes so that only one process mints a new token when it goes stale.
+    """
+    def __init__(self,
+                 cache_dir: str = None,
+                 refresh_margin: int = DEFAULT_REFRESH_MARGIN,
+                 fetch=request_access_token,
+                 ) -> None:
+        self.cache_dir = cache_dir
+        self.refresh_margin = refresh_margin
+        self.fetch = fetch
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(offline_token: str, token_url: str = None) -> str:
+        """
+        Returns the hex sha256 digest used to identify an offline token without storing it.
+
+        Tokens minted by another sso than Red Hat's are also keyed by its token url.
+        """
+        material = offline_token or ""
+        if token_url is not None and token_url != SSO_TOKEN_URL:
+            material = f"{token_url}\n{material}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def is_fresh(self, entry: dict) -> bool:
+        """
+        Checks that a cache entry holds a token that is not within refresh_margin of expiry.
+        """
+        return (entry is not None and entry.get("access_token") is not None
+                and entry.get("expires_at", 0) - self.refresh_margin > time.time())
+
+    def get_token(self, offline_token: str, fetch=None, token_url: str = None) -> str:
+        """
+        Returns a valid access token for the offline token, minting a new one only when needed.
+
+        Args:
+            offline_token (str): The offline token for the Red Hat account.
+            fetch (callable): Optional override of the callable used to mint a new token.
+            token_url (str): The sso token endpoint fetch mints the token at.
+
+        Returns:
+            str: The bearer access token.
+        """
+        key = self.cache_key(offline_token, token_url)
+
+        with self.lock:
+            entry = self.tokens.get(key)
+            if self.is_fresh(entry):
+                return entry["access_token"]
+
+            if self.cache_dir is None:
+                entry = self.refresh(offline_token, fetch)
+            else:
+                entry = self.refresh_shared(offline_token, key, fetch)
+
+            self.tokens[key] = entry
+            return entry["access_token"]
+
+    def invalidate(self, offline_token: str, token_url: str = None) -> None:
+        """
+        Drops the cached token for the offline token, e.g. after the API rejected it with a 401.
+        """
+        key = self.cache_key(offline_token, token_url)
+        with self.lock:
+            self.tokens.pop(key, None)
+            if self.cache_dir is not None:
+                try:
+                    os.remove(self.cache_path(key))
+                except OSError:
+                    pass
+
+    def refresh(self, offline_token: str, fetch=None) -> dict:
+        """
+        Mints a new access token and returns it as a cache entry.
+        """
+        token_response = (fetch or self.fetch)(offline_token)
+        expires_in = token_response.get("expires_in") or DEFAULT_EXPIRES_IN
+        return {
+            "access_token": token_response.get("access_token"),
+            "expires_at": time.time() + float(expires_in),
+        }
+
+    def cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def refresh_shared(self, offline_token: str, key: str, fetch=None) -> dict:
+        """
+        Reads the token from the on-disk cache, minting and persisting a new one if it is stale.
+
+        The lock file is held while checking and refreshing, so concurrent processes wait for
+        the first one to finish and then pick up the token it wrote.
+        """
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+
+        lock_fd = os.open(os.path.join(self.cache_dir, f"{key}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+
+            entry = self.read_entry(key)
+            if self.is_fresh(entry):
+                return entry
+
+            entry = self.refresh(offline_token, fetch)
+            if entry["access_token"] is not None:
+                self.write_entry(key, entry)
+            return entry
+        finally:
+            os.close(lock_fd)
+
+    def read_entry(self, key: str) -> dict:
+        try:
+            with open(self.cache_path(key), "r") as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+    def write_entry(self, key: str, entry: dict) -> None:
+        # write to a private temporary file and rename it so readers never see a partial token
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{key}.")
+        try:
+            os.fchmod(fd, 0o600)
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(entry, tmp_file)
+            os.replace(tmp_path, self.cache_path(key))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+## token cache shared by every api call made in this process
+TOKEN_CACHE = AccessTokenCache(cache_dir=os.environ.get(TOKEN_CACHE_DIR_ENV))
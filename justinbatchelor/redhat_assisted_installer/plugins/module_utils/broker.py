@@ -0,0 +1,321 @@
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# environment variable overriding the seconds an idle broker waits for requests before exiting
+IDLE_TIMEOUT_ENV = "REDHAT_BROKER_IDLE_TIMEOUT"
+
+# seconds a broker lives without receiving a request, long enough to span the pauses of a play
+DEFAULT_IDLE_TIMEOUT = 300
+
+# seconds a module waits for a broker it spawned to accept connections
+DEFAULT_SPAWN_TIMEOUT = 10
+
+# part of the broker key, bumped when the messages change so modules never talk to an older broker
+PROTOCOL_VERSION = 1
+
+
+def runtime_dir() -> str:
+    """
+    Returns the private directory holding the sockets of the brokers of the current user.
+    """
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"redhat-assisted-installer-{os.getuid()}")
+
+def broker_key(config: dict) -> str:
+    """
+    Returns the hash identifying the broker for a client configuration, including its account.
+    """
+    return hashlib.sha256(json.dumps([PROTOCOL_VERSION, config], sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+def read_line(sock_file) -> dict:
+    line = sock_file.readline()
+    if not line:
+        raise ConnectionError("The broker closed the connection")
+    return json.loads(line)
+
+
+class BrokerConnection:
+    """
+    Sends the requests of a module to the broker process serving its client configuration.
+
+    The broker holds one AssistedInstallerClient for every module run of the play: the access
+    token is minted once, connections to the api stay open, and the name index and desired
+    state caches live in its memory. Every call opens a short Unix socket connection carrying
+    one JSON line and receives one JSON line followed by the response body.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def call(self, message: dict, body: bytes = b"") -> tuple:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.path)
+            with sock.makefile("rwb") as sock_file:
+                sock_file.write(json.dumps(message).encode("utf-8") + b"\n")
+                sock_file.flush()
+                header = read_line(sock_file)
+                payload = sock_file.read(header.get("length", 0)) if header.get("length") else b""
+        if header.get("error_type") == "fatal":
+            raise RuntimeError(header.get("error"))
+        return header, payload
+
+    def ping(self) -> bool:
+        try:
+            header, _ = self.call(dict(op="ping"))
+            return header.get("ok", False)
+        except (OSError, ValueError, RuntimeError):
+            return False
+
+    def request(self, method: str, url: str, endpoint: str, params=None, json_body=None, timeout=None) -> requests.Response:
+        """
+        Sends a request through the broker and returns it as a requests.Response.
+
+        The broker applies its retry policy and re-authenticates on 401, the number of retries
+        it needed is set as the `retries` attribute of the response.
+
+        Raises:
+            requests.exceptions.ConnectionError: If the broker could not reach the api.
+        """
+        header, payload = self.call(dict(op="request", method=method, endpoint=endpoint,
+                                         params=params, json=json_body, timeout=timeout))
+        if header.get("error") is not None:
+            raise requests.exceptions.ConnectionError(header["error"])
+
+        response = requests.Response()
+        response.status_code = header["status"]
+        response.reason = header.get("reason")
+        response.headers = CaseInsensitiveDict(header.get("headers") or {})
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = payload
+        response.request = requests.Request(method, url, params=params, json=json_body).prepare()
+        response.url = response.request.url
+        response.retries = header.get("retries", 0)
+        return response
+
+    def access_token(self) -> str:
+        header, _ = self.call(dict(op="token"))
+        if header.get("error") is not None:
+            raise requests.exceptions.ConnectionError(header["error"])
+        return header.get("access_token")
+
+    def cache_get(self, key: str):
+        header, payload = self.call(dict(op="cache_get", key=key))
+        return json.loads(payload) if payload else None
+
+    def cache_put(self, key: str, value) -> None:
+        self.call(dict(op="cache_put", key=key, value=value))
+
+
+class BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            message = read_line(self.rfile)
+        except (ConnectionError, ValueError):
+            return
+        self.server.touch()
+
+        body = b""
+        op = message.get("op")
+        try:
+            if op == "ping":
+                header = dict(ok=True, pid=os.getpid(), stats=self.server.client.stats)
+            elif op == "request":
+                header, body = self.forward(message)
+            elif op == "token":
+                header = dict(access_token=self.server.client.get_access_token())
+            elif op == "cache_get":
+                value = self.server.cache.get(message.get("key"))
+                body = json.dumps(value).encode("utf-8") if value is not None else b""
+                header = dict(found=value is not None)
+            elif op == "cache_put":
+                self.server.cache[message.get("key")] = message.get("value")
+                header = dict(ok=True)
+            else:
+                header = dict(error=f"Unknown operation {op}", error_type="fatal")
+        except Exception as e:
+            # report every failure to the module, the broker keeps serving the play
+            header = dict(error=f"{type(e).__name__}: {e}")
+
+        header["length"] = len(body)
+        self.wfile.write(json.dumps(header).encode("utf-8") + b"\n")
+        if body:
+            self.wfile.write(body)
+
+    def forward(self, message: dict) -> tuple:
+        kwargs = {}
+        if message.get("params") is not None:
+            kwargs["params"] = message["params"]
+        if message.get("json") is not None:
+            kwargs["json"] = message["json"]
+        if message.get("timeout") is not None:
+            kwargs["timeout"] = tuple(message["timeout"]) if isinstance(message["timeout"], list) else message["timeout"]
+
+        response = self.server.client.request(message["method"], message["endpoint"], **kwargs)
+        header = dict(
+            status=response.status_code,
+            reason=response.reason,
+            headers=dict(response.headers),
+            retries=getattr(response, "retries", 0),
+        )
+        return header, response.content
+
+
+class BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serves one AssistedInstallerClient on a Unix socket until it is idle for `idle_timeout` seconds.
+    """
+    daemon_threads = True
+    # every fork of a play may connect at once, the default backlog of 5 would refuse some of them
+    request_queue_size = 128
+
+    def __init__(self, path: str, client, idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> None:
+        self.client = client
+        self.cache = {}
+        self.idle_timeout = idle_timeout
+        self.last_used = time.monotonic()
+        super().__init__(path, BrokerHandler)
+        os.chmod(path, 0o600)
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+
+    def serve_until_idle(self) -> None:
+        def watch():
+            while time.monotonic() - self.last_used < self.idle_timeout:
+                time.sleep(min(1.0, self.idle_timeout))
+            self.shutdown()
+
+        threading.Thread(target=watch, daemon=True).start()
+        try:
+            self.serve_forever(poll_interval=0.5)
+        finally:
+            self.server_close()
+            try:
+                os.remove(self.server_address)
+            except OSError:
+                pass
+
+
+def serve(config: dict, path: str, idle_timeout: float) -> None:
+    """
+    Runs a broker for the client configuration in the current process.
+    """
+    from .client import AssistedInstallerClient
+    from .retry import RetryPolicy
+
+    client = AssistedInstallerClient(
+        api_base=config["api_base"],
+        sso_url=config["sso_url"],
+        auth_mode=config["auth_mode"],
+        offline_token=config.get("offline_token"),
+        ca_bundle=config["verify"] if isinstance(config["verify"], str) else None,
+        validate_certs=config["verify"] is not False,
+        timeout=config["timeout"],
+        retry_policy=RetryPolicy(retries=config["retries"]),
+    )
+    # a stale socket is left behind when a broker was killed, binding fails while it exists,
+    # but a socket a live broker answers on belongs to it
+    if BrokerConnection(path).ping():
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    BrokerServer(path, client, idle_timeout).serve_until_idle()
+
+def main() -> None:
+    """
+    Entry point of the broker process, the configuration is read from stdin so the offline token never shows in ps.
+    """
+    request = json.loads(sys.stdin.readline())
+    sys.stdin.close()
+    serve(request["config"], request["path"], request["idle_timeout"])
+
+
+def spawn(config: dict, path: str, idle_timeout: float) -> subprocess.Popen:
+    """
+    Starts a detached broker process serving config on path.
+
+    The broker imports this module by its fully qualified name, from the directory holding
+    ansible_collections and the sys.path of the caller. For modules that directory is the zip
+    they were shipped in, which the broker only needs while importing, the module waits for it
+    to accept connections before going on. Controller plugins import collections through
+    Ansible's own finder, so the directory is not on their sys.path.
+    """
+    marker = f"{os.sep}ansible_collections{os.sep}"
+    roots = [__file__[:__file__.rindex(marker)]] if marker in __file__ else []
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(roots + [entry for entry in sys.path if entry]))
+    bootstrap = f"import importlib; importlib.import_module({__name__!r}).main()"
+    process = subprocess.Popen(
+        [sys.executable, "-c", bootstrap],
+        stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=env, cwd="/", start_new_session=True, close_fds=True,
+    )
+    process.stdin.write(json.dumps(dict(config=config, path=path, idle_timeout=idle_timeout)).encode("utf-8") + b"\n")
+    process.stdin.close()
+    return process
+
+def connect(config: dict, idle_timeout: float = None, spawn_timeout: float = DEFAULT_SPAWN_TIMEOUT) -> BrokerConnection:
+    """
+    Returns a connection to the broker for config, starting the broker when none is running.
+
+    Brokers are keyed by the whole configuration, so every account, endpoint and TLS setting
+    gets its own. A lock file makes concurrent module runs start a single broker.
+
+    Returns:
+        BrokerConnection: The connection, or None when no broker could be reached, in which case
+            the module talks to the api directly.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    if idle_timeout is None:
+        idle_timeout = float(os.environ.get(IDLE_TIMEOUT_ENV) or DEFAULT_IDLE_TIMEOUT)
+
+    directory = runtime_dir()
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        info = os.stat(directory)
+    except OSError:
+        return None
+    # never talk to a socket another user could have planted
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        return None
+
+    key = broker_key(config)
+    connection = BrokerConnection(os.path.join(directory, f"{key}.sock"))
+    if connection.ping():
+        return connection
+
+    lock_fd = os.open(os.path.join(directory, "spawn.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        # another module run may have started the broker while this one waited for the lock
+        if connection.ping():
+            return connection
+
+        process = spawn(config, connection.path, idle_timeout)
+        deadline = time.monotonic() + spawn_timeout
+        while time.monotonic() < deadline and process.poll() is None:
+            if connection.ping():
+                return connection
+            time.sleep(0.05)
+        return None
+    finally:
+        os.close(lock_fd)
@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+# number of write calls sent to the api at the same time by the bulk modules
+DEFAULT_MAX_WORKERS = 8
+
+
+def run_bounded(func, items: list, max_workers: int = DEFAULT_MAX_WORKERS) -> list:
+    """
+    Calls `func` for every item on a pool of at most `max_workers` threads.
+
+    One failing item does not stop the others, the exception is captured in its outcome.
+
+    Args:
+        func (callable): Called with one item, its return value is recorded.
+        items (list): The items to process.
+        max_workers (int): Upper bound of concurrent calls.
+
+    Returns:
+        list: One (value, error) tuple per item, in the order of items.
+    """
+    if not items:
+        return []
+
+    def call(item):
+        try:
+            return func(item), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        return list(pool.map(call, items))
@@ -0,0 +1,441 @@
+import os, threading, time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from urllib3.exceptions import NewConnectionError
+
+## import the access token cache shared by all api calls
+from .auth import SSO_TOKEN_URL, SSO_URL_ENV, TOKEN_CACHE, request_access_token
+
+## import the retry policy applied to every request
+from .retry import RetryPolicy
+
+## import the per request timings
+from .timing import SSO_ENDPOINT, TRACE_FILE_ENV, RequestTimings, endpoint_template
+
+
+API_BASE = "https://api.openshift.com/api/assisted-install/v2/"
+
+# environment variable overriding API_BASE, e.g. an on-prem assisted-service or a local stand-in of the api
+API_URL_ENV = "REDHAT_API_URL"
+
+# environment variable pointing at a CA bundle used to verify the api and sso certificates
+CA_BUNDLE_ENV = "REDHAT_CA_BUNDLE"
+
+# environment variable selecting how requests are authenticated, see AUTH_MODES
+AUTH_MODE_ENV = "REDHAT_AUTH_MODE"
+
+# offline_token: bearer access tokens minted from the offline token at the sso endpoint
+# none: no Authorization header, for an assisted-service deployed with AUTH_TYPE=none
+AUTH_MODES = ("offline_token", "none")
+DEFAULT_AUTH_MODE = "offline_token"
+
+# number of distinct hosts (api + sso + image service) a session keeps connection pools for
+DEFAULT_POOL_CONNECTIONS = 4
+
+# number of keep-alive connections kept open per host
+DEFAULT_POOL_MAXSIZE = 16
+
+# connect timeout in seconds, the read timeout is configurable per module
+DEFAULT_CONNECT_TIMEOUT = 10
+
+# read timeout in seconds applied to every request
+DEFAULT_TIMEOUT = 60
+
+# number of retries for idempotent requests
+DEFAULT_RETRIES = 3
+
+# environment variable enabling the persistent client when set to a true value
+PERSISTENT_CLIENT_ENV = "REDHAT_PERSISTENT_CLIENT"
+
+# request options the persistent client forwards, anything else is sent directly
+BROKER_KWARGS = frozenset(["params", "json", "timeout"])
+
+# socket errors meaning the broker is gone, unlike requests errors which it reports for the api
+BROKER_ERRORS = (ConnectionError, FileNotFoundError)
+
+
+def client_argument_spec() -> dict:
+    """
+    Returns the module options shared by every module that talks to the API.
+    """
+    return dict(
+        retries=dict(type='int', required=False, default=DEFAULT_RETRIES),
+        timeout=dict(type='int', required=False, default=DEFAULT_TIMEOUT),
+        api_url=dict(type='str', required=False),
+        sso_url=dict(type='str', required=False),
+        auth_mode=dict(type='str', required=False, choices=list(AUTH_MODES)),
+        ca_bundle=dict(type='path', required=False),
+        validate_certs=dict(type='bool', required=False, default=True),
+        debug_timings=dict(type='bool', required=False, default=False),
+        trace_file=dict(type='path', required=False),
+        persistent_client=dict(type='bool', required=False),
+    )
+
+
+def persistent_client_enabled(value: bool = None) -> bool:
+    """
+    Resolves the persistent_client option, falling back to the REDHAT_PERSISTENT_CLIENT environment variable.
+    """
+    if value is not None:
+        return value
+    return os.environ.get(PERSISTENT_CLIENT_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def endpoint_origin(url: str) -> str:
+    """
+    Returns the scheme://host[:port]/ prefix of a url, the unit requests pools connections by.
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+
+## sessions shared by every client of this process, keyed by endpoints and tls settings
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def pooled_session(endpoints: list,
+                   verify=True,
+                   pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                   pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                   ) -> requests.Session:
+    """
+    Returns the keep-alive session for a set of endpoints, creating it on first use.
+
+    Every endpoint origin gets its own adapter, so the api, the sso and any other host never
+    compete for the same pool. Clients created for the same endpoints and TLS settings reuse
+    the session and its open connections, while a client for another endpoint, e.g. an
+    on-prem assisted-service next to the public one, gets separate pools.
+    """
+    origins = sorted({endpoint_origin(endpoint) for endpoint in endpoints})
+    key = (tuple(origins), verify, pool_connections, pool_maxsize)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is not None:
+            return session
+
+        session = requests.Session()
+        session.headers.update({"Connection": "keep-alive"})
+        session.verify = verify
+
+        # retries are handled above the adapter so urllib3 must not retry on its own
+        for prefix in ["https://", "http://"] + origins:
+            session.mount(prefix, HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0))
+
+        _sessions[key] = session
+        return session
+
+def discard_session(session: requests.Session) -> None:
+    """
+    Closes a pooled session and forgets it, the next client for its endpoints opens a new one.
+    """
+    with _sessions_lock:
+        for key, pooled in list(_sessions.items()):
+            if pooled is session:
+                del _sessions[key]
+    session.close()
+
+
+def is_connect_error(error: Exception) -> bool:
+    """
+    Checks if a request failed before a connection was established, i.e. nothing was sent.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class AssistedInstallerClient:
+    """
+    HTTP client for the Assisted Installer API built on a pooled, keep-alive requests.Session.
+
+    One client is meant to be shared by every API call made during a module run, so the TCP
+    and TLS handshakes to api.openshift.com and sso.redhat.com are only paid once.
+
+    The api and sso urls, the CA bundle and the auth mode default to the REDHAT_API_URL,
+    REDHAT_SSO_URL, REDHAT_CA_BUNDLE and REDHAT_AUTH_MODE environment variables and then to
+    the public Red Hat endpoints, so the same modules can manage an on-prem assisted-service.
+    """
+    def __init__(self,
+                 api_base: str = None,
+                 offline_token: str = None,
+                 token_cache=TOKEN_CACHE,
+                 timeout: int = DEFAULT_TIMEOUT,
+                 retry_policy: RetryPolicy = None,
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 sso_url: str = None,
+                 auth_mode: str = None,
+                 ca_bundle: str = None,
+                 validate_certs: bool = True,
+                 trace_file: str = None,
+                 ) -> None:
+        api_base = api_base or os.environ.get(API_URL_ENV) or API_BASE
+        self.api_base = api_base if api_base.endswith("/") else api_base + "/"
+        self.sso_url = sso_url or os.environ.get(SSO_URL_ENV) or SSO_TOKEN_URL
+        self.auth_mode = auth_mode or os.environ.get(AUTH_MODE_ENV) or DEFAULT_AUTH_MODE
+        if self.auth_mode not in AUTH_MODES:
+            raise ValueError(f"Unsupported auth mode {self.auth_mode}, expected one of {', '.join(AUTH_MODES)}")
+        self.offline_token = offline_token
+        self.token_cache = token_cache
+        self.timeout = (min(DEFAULT_CONNECT_TIMEOUT, timeout), timeout)
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+
+        # counters exposed in module results, updated in place as requests are sent
+        self.stats = dict(requests=0, retries=0)
+        self.stats_lock = threading.Lock()
+
+        # every request is timed, the trace file is only written when configured
+        self.timings = RequestTimings(trace_file=trace_file or os.environ.get(TRACE_FILE_ENV))
+
+        # a CA bundle path replaces the system trust store, validate_certs=False disables verification
+        self.verify = (ca_bundle or os.environ.get(CA_BUNDLE_ENV) or True) if validate_certs else False
+        endpoints = [self.api_base] if self.auth_mode == "none" else [self.api_base, self.sso_url]
+        self.session = pooled_session(endpoints, self.verify, pool_connections, pool_maxsize)
+
+        # connection to the broker holding the persistent client, see connect_broker
+        self.broker = None
+
+    def get_offline_token(self) -> str:
+        # fall back to the environment so modules can keep exporting REDHAT_OFFLINE_TOKEN
+        return self.offline_token if self.offline_token is not None else os.environ.get("REDHAT_OFFLINE_TOKEN")
+
+    def get_access_token(self) -> str:
+        if self.broker is not None:
+            try:
+                return self.broker.access_token()
+            except BROKER_ERRORS:
+                self.broker = None
+        return self.token_cache.get_token(
+            self.get_offline_token(),
+            fetch=lambda offline_token: request_access_token(offline_token, post=self.timed_sso_post, token_url=self.sso_url),
+            token_url=self.sso_url,
+        )
+
+    def timed_sso_post(self, url: str, **kwargs) -> requests.Response:
+        return self.timings.timed("POST", SSO_ENDPOINT, self.session.post, url, **kwargs)
+
+    def get_headers(self) -> dict:
+        if self.auth_mode == "none":
+            return {"Content-Type": "application/json"}
+        return {
+            "Authorization": "Bearer {}".format(self.get_access_token()),
+            "Content-Type": "application/json"
+        }
+
+    def account_key(self) -> str:
+        """
+        Returns the string identifying the account and endpoint, used to key on-disk caches.
+
+        The public api is keyed by the offline token alone, other endpoints also by their url
+        so that objects of different assisted-service deployments never share a cache.
+        """
+        account = self.get_offline_token() if self.auth_mode != "none" else None
+        if self.api_base == API_BASE:
+            return account
+        return f"{self.api_base}\n{account or ''}"
+
+    def broker_config(self) -> dict:
+        """
+        Returns the settings a broker needs to send requests on behalf of this client, which also key it.
+        """
+        return dict(
+            api_base=self.api_base,
+            sso_url=self.sso_url,
+            auth_mode=self.auth_mode,
+            offline_token=self.get_offline_token() if self.auth_mode != "none" else None,
+            verify=self.verify,
+            timeout=self.timeout[1],
+            retries=self.retry_policy.retries,
+        )
+
+    def connect_broker(self) -> bool:
+        """
+        Routes the requests of this client through the persistent client of the play.
+
+        A broker process is started on first use and kept running between tasks, so the access
+        token, the open connections and the object caches outlive a single module run. When no
+        broker can be reached the client keeps sending requests itself.
+
+        Returns:
+            bool: Whether requests go through a broker.
+        """
+        from .broker import connect
+
+        try:
+            self.broker = connect(self.broker_config())
+        except OSError:
+            self.broker = None
+        return self.broker is not None
+
+    def request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        Sends a request to an endpoint relative to the API base URL.
+
+        Failed attempts are retried according to the client's RetryPolicy. A 401 response
+        invalidates the cached access token and the request is sent once more with a freshly
+        minted token, without counting against the retry budget.
+
+        Args:
+            method (str): The HTTP method.
+            endpoint (str): Endpoint path relative to api_base, optionally with a query string.
+            **kwargs: Extra keyword arguments passed to requests.Session.request.
+
+        Returns:
+            requests.Response: The last response from the API.
+
+        Raises:
+            requests.exceptions.RequestException: If the last attempt failed without a response.
+        """
+        url = self.api_base + endpoint
+        template = endpoint_template(endpoint)
+        if self.broker is not None and BROKER_KWARGS.issuperset(kwargs):
+            try:
+                return self.broker_request(method, endpoint, url, template, **kwargs)
+            except BROKER_ERRORS:
+                # the broker exited, e.g. after its idle timeout, continue without it
+                self.broker = None
+        kwargs.setdefault("timeout", self.timeout)
+
+        budget = self.retry_policy.budget(method)
+        attempt = 0
+        reauthenticated = False
+
+        while True:
+            self.count("requests")
+            headers = self.get_headers()
+            started = time.time()
+            clock = time.perf_counter()
+            try:
+                response = self.session.request(method, url, headers=headers, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.timings.record(method, template, None, started, time.perf_counter() - clock, attempt=attempt)
+                if attempt >= budget or not self.retry_policy.should_retry_error(method, is_connect_error(e)):
+                    raise
+                self.retry_policy.wait(attempt)
+            else:
+                self.record_response(method, template, response, started, time.perf_counter() - clock, attempt, kwargs.get("stream", False))
+
+                if response.status_code == 401 and not reauthenticated and self.auth_mode != "none":
+                    reauthenticated = True
+                    self.token_cache.invalidate(self.get_offline_token(), token_url=self.sso_url)
+                    continue
+
+                if attempt >= budget or not self.retry_policy.should_retry_status(method, response.status_code):
+                    # read by the broker to report the retries of a forwarded request
+                    response.retries = attempt
+                    return response
+                self.retry_policy.wait(attempt, response.headers.get("Retry-After"))
+                response.close()
+
+            attempt += 1
+            self.count("retries")
+
+    def broker_request(self, method: str, endpoint: str, url: str, template: str, **kwargs) -> requests.Response:
+        """
+        Sends a request through the broker, which applies the retry policy and re-authenticates.
+
+        The attempts the broker made are counted in the stats and timings of this client, the
+        broker only reports the last one so retries are recorded as part of its duration.
+        """
+        started = time.time()
+        clock = time.perf_counter()
+        try:
+            response = self.broker.request(method, url, endpoint,
+                                           params=kwargs.get("params"), json_body=kwargs.get("json"), timeout=kwargs.get("timeout"))
+        except requests.exceptions.RequestException:
+            self.count("requests")
+            self.timings.record(method, template, None, started, time.perf_counter() - clock)
+            raise
+        with self.stats_lock:
+            self.stats["requests"] += 1 + response.retries
+            self.stats["retries"] += response.retries
+        self.record_response(method, template, response, started, time.perf_counter() - clock, response.retries, False)
+        return response
+
+    def record_response(self, method: str, template: str, response: requests.Response,
+                        started: float, elapsed: float, attempt: int, stream: bool) -> None:
+        body = response.request.body if response.request is not None else None
+        if stream:
+            # reading the content would consume the stream, rely on the advertised size
+            received = int(response.headers.get("Content-Length") or 0)
+        else:
+            received = len(response.content or b"")
+        self.timings.record(method, template, response.status_code, started, elapsed,
+                            bytes_sent=len(body) if body is not None else 0,
+                            bytes_received=received, attempt=attempt)
+
+    def count(self, stat: str) -> None:
+        # bulk modules share one client across threads
+        with self.stats_lock:
+            self.stats[stat] += 1
+
+    def get(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("GET", endpoint, **kwargs)
+
+    def post(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("POST", endpoint, **kwargs)
+
+    def patch(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", endpoint, **kwargs)
+
+    def delete(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", endpoint, **kwargs)
+
+    def close(self) -> None:
+        discard_session(self.session)
+
+    @classmethod
+    def from_module_params(cls, params: dict) -> "AssistedInstallerClient":
+        """
+        Creates a client from the common module options returned by client_argument_spec.
+        """
+        client = cls(
+            api_base=params.get('api_url'),
+            # the broker is keyed on the token, which the modules only export to the environment afterwards
+            offline_token=params.get('offline_token'),
+            sso_url=params.get('sso_url'),
+            auth_mode=params.get('auth_mode'),
+            ca_bundle=params.get('ca_bundle'),
+            validate_certs=params.get('validate_certs') if params.get('validate_certs') is not None else True,
+            trace_file=params.get('trace_file'),
+            timeout=params.get('timeout') or DEFAULT_TIMEOUT,
+            retry_policy=RetryPolicy(retries=params.get('retries') if params.get('retries') is not None else DEFAULT_RETRIES),
+        )
+        if persistent_client_enabled(params.get('persistent_client')):
+            client.connect_broker()
+        return client
+
+
+## client shared by every api call made in this process
+_client = None
+
+def get_client() -> AssistedInstallerClient:
+    """
+    Returns the process wide client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        _client = AssistedInstallerClient()
+    return _client
+
+def set_client(client: AssistedInstallerClient) -> AssistedInstallerClient:
+    """
+    Replaces the process wide client, e.g. to apply module specific settings.
+    """
+    global _client
+    _client = client
+    return _client
+
+def set_module_client(params: dict, result: dict) -> AssistedInstallerClient:
+    """
+    Replaces the process wide client with one created from the module options, so every api call of the
+    module run shares its pooled connections, and reports its stats, and timings when debug_timings is set, in result.
+    """
+    client = set_client(AssistedInstallerClient.from_module_params(params))
+    result['api_stats'] = client.stats
+    if params.get('debug_timings'):
+        result['timings'] = client.timings.summary
+    return client
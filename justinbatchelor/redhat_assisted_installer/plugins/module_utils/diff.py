@@ -0,0 +1,97 @@
+from collections.abc import Mapping
+
+from .schema.schema import Field
+
+
+# fields compare as plain values unless the schema class describes them
+DEFAULT_FIELD = Field()
+
+
+def normalize_value(value, field: Field):
+    if value is None or field.normalize is None:
+        return value
+    return field.normalize(value)
+
+def diff_values(desired, current, field: Field, path: str, changes: list) -> None:
+    """
+    Compares a desired value with the value returned by the api and appends every difference to changes.
+
+    Only the keys present in a desired object are compared, keys the api populates on its own,
+    such as the cluster_id of a VIP or the verification status of a network, are ignored.
+    Lists must have the same length; lists of objects whose field has `match_on` are matched
+    element by element on that key, so their order does not matter.
+    """
+    desired = normalize_value(desired, field)
+    current = normalize_value(current, field)
+
+    if isinstance(desired, Mapping):
+        if not isinstance(current, Mapping):
+            changes.append(dict(path=path, before=current, after=desired))
+            return
+        for key, value in desired.items():
+            child = field.schema.get(key, DEFAULT_FIELD)
+            if value is None or child.write_only:
+                continue
+            diff_values(value, current.get(key), child, f"{path}.{key}", changes)
+        return
+
+    if isinstance(desired, list):
+        if not isinstance(current, list) or len(desired) != len(current):
+            changes.append(dict(path=path, before=current, after=desired))
+            return
+        element = Field(schema=field.schema)
+        if field.match_on is None:
+            for index, (desired_item, current_item) in enumerate(zip(desired, current)):
+                diff_values(desired_item, current_item, element, f"{path}[{index}]", changes)
+            return
+        current_items = {item.get(field.match_on): item for item in current if isinstance(item, Mapping)}
+        for item in desired:
+            key = item.get(field.match_on) if isinstance(item, Mapping) else item
+            item_path = f"{path}[{field.match_on}={key}]"
+            if key not in current_items:
+                changes.append(dict(path=item_path, before=None, after=item))
+                continue
+            diff_values(item, current_items[key], element, item_path, changes)
+        return
+
+    if desired != current:
+        changes.append(dict(path=path, before=current, after=desired))
+
+
+class ObjectDiff:
+    """
+    The differences between the desired params of an API object and the object returned by the api.
+
+    Attributes are compared according to the `fields` of the schema class, see Field. Only the
+    attributes listed in `keys`, e.g. the ones the PATCH endpoint accepts, are compared when given.
+
+    Attributes:
+        changes (list): One dict per difference with the key path, the api value (before) and the desired value (after).
+        params (dict): The desired value of every top-level attribute that differs, ready to be sent in a PATCH.
+    """
+    def __init__(self, desired: dict, current: dict, fields: dict, keys: list = None) -> None:
+        self.current = current
+        self.changes = []
+        self.params = {}
+        for key, value in desired.items():
+            if keys is not None and key not in keys:
+                continue
+            field = fields.get(key, DEFAULT_FIELD)
+            if value is None or field.write_only:
+                continue
+            found = len(self.changes)
+            diff_values(value, current.get(key), field, key, self.changes)
+            if len(self.changes) > found:
+                self.params[key] = value
+
+    def __bool__(self) -> bool:
+        return bool(self.params)
+
+    def ansible_diff(self) -> dict:
+        """
+        Returns the before and after values of the changed attributes in the format of the Ansible `diff` result.
+        """
+        return dict(
+            before={key: self.current.get(key) for key in sorted(self.params)},
+            after={key: self.params[key] for key in sorted(self.params)},
+        )
@@ -0,0 +1,405 @@
+import hashlib, json, os, re, threading
+
+import requests
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from urllib.parse import urlsplit, urlunsplit
+
+## import the retry policy used between resume attempts
+from .retry import RetryPolicy
+
+
+# bytes written per chunk, memory use stays constant regardless of the image size
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# suffix of the partial file kept on disk so an interrupted download can be resumed
+PART_SUFFIX = ".part"
+
+# suffix of the sidecar file holding the fingerprint of the downloaded image
+META_SUFFIX = ".meta.json"
+
+# suffix of the file recording which byte ranges of a parallel download are complete
+SEGMENTS_SUFFIX = ".segments.json"
+
+# number of parallel connections used for ranged downloads
+DEFAULT_CONNECTIONS = 4
+
+# size of each byte range fetched by one worker, objects smaller than this are streamed
+DEFAULT_SEGMENT_SIZE = 16 * 1024 * 1024
+
+CONTENT_RANGE_PATTERN = re.compile(r'^bytes\s+(?:(\d+)-(\d+)|\*)/(\d+|\*)$')
+
+
+class DownloadError(Exception):
+    pass
+
+
+def parse_content_range(value: str) -> tuple:
+    """
+    Parses a Content-Range header such as "bytes 100-199/1000" or "bytes */1000".
+
+    Returns:
+        tuple: (start, end, total), each None when not present in the header.
+    """
+    match = CONTENT_RANGE_PATTERN.match((value or "").strip())
+    if match is None:
+        return None, None, None
+    start, end, total = match.groups()
+    return (int(start) if start is not None else None,
+            int(end) if end is not None else None,
+            int(total) if total not in (None, "*") else None)
+
+def file_sha256(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """
+    Returns the hex sha256 digest of a file, reading it in fixed-size chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def normalize_checksum(checksum: str) -> str:
+    """
+    Accepts "sha256:<hex>" or a bare hex digest and returns the lowercase hex digest.
+    """
+    if checksum is None:
+        return None
+    algorithm, _, value = checksum.rpartition(":")
+    if algorithm not in ("", "sha256"):
+        raise DownloadError(f"Unsupported checksum algorithm {algorithm}, only sha256 is supported")
+    return value.strip().lower()
+
+def url_fingerprint(url: str, *parts) -> str:
+    """
+    Returns a stable fingerprint of a download url and any extra identifying values.
+
+    The query string is dropped because it carries short lived credentials that change every
+    time a new url is issued for the same image.
+    """
+    scheme, netloc, path, _, _ = urlsplit(url)
+    digest = hashlib.sha256(urlunsplit((scheme, netloc, path, "", "")).encode("utf-8"))
+    for part in parts:
+        digest.update(b"\0" + str(part).encode("utf-8"))
+    return digest.hexdigest()
+
+def read_metadata(dest: str) -> dict:
+    try:
+        with open(dest + META_SUFFIX, "r") as meta_file:
+            return json.load(meta_file)
+    except (OSError, ValueError):
+        return None
+
+def write_metadata(dest: str, metadata: dict) -> None:
+    tmp_path = dest + META_SUFFIX + ".tmp"
+    with open(tmp_path, "w") as meta_file:
+        json.dump(metadata, meta_file)
+    os.replace(tmp_path, dest + META_SUFFIX)
+
+def is_current(dest: str, fingerprint: str) -> bool:
+    """
+    Checks that dest exists and was downloaded from the image identified by fingerprint.
+    """
+    metadata = read_metadata(dest)
+    return (metadata is not None and metadata.get("fingerprint") == fingerprint
+            and os.path.isfile(dest) and os.path.getsize(dest) == metadata.get("size"))
+
+
+class StreamingDownloader:
+    """
+    Streams a url to disk in fixed-size chunks with constant memory use.
+
+    Data is written to `<dest>.part`. If a previous attempt left a partial file, the download
+    resumes from its end with an HTTP Range request; servers that ignore the range answer 200
+    and the file is rewritten from the start. Interrupted transfers are resumed up to
+    `retries` times. The partial file is only renamed to dest once its size, and checksum if
+    one was given, have been verified.
+    """
+    def __init__(self,
+                 session: requests.Session,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 timeout=(10, 60),
+                 retry_policy: RetryPolicy = None,
+                 headers: dict = None,
+                 ) -> None:
+        self.session = session
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.headers = headers or {}
+
+    def fetch(self, url: str, part: str) -> tuple:
+        """
+        Appends the remaining bytes of url to part.
+
+        Returns:
+            tuple: (total, start) the total size of the object if known, and the byte offset the transfer started at.
+        """
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = dict(self.headers)
+        if offset > 0:
+            headers["Range"] = f"bytes={offset}-"
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 416:
+                # the partial file already holds every byte, or is larger than the object
+                _, _, total = parse_content_range(response.headers.get("Content-Range"))
+                if total is not None and total == offset:
+                    return total, offset
+                os.remove(part)
+                raise DownloadError(f"Partial download of {offset} bytes does not match the remote object, restarting")
+
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                start, _, total = parse_content_range(response.headers.get("Content-Range"))
+                if start != offset:
+                    raise DownloadError(f"Server resumed at byte {start} instead of {offset}")
+                mode = "ab"
+            else:
+                length = response.headers.get("Content-Length")
+                total = int(length) if length is not None else None
+                mode = "wb"
+                offset = 0
+
+            with open(part, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+
+        return total, offset
+
+    def download(self, url: str, dest: str, expected_size: int = None, checksum: str = None) -> dict:
+        """
+        Downloads url to dest, resuming a previous partial download if there is one.
+
+        Args:
+            url (str): The url to download.
+            dest (str): The destination path.
+            expected_size (int): Optional size in bytes the file must have.
+            checksum (str): Optional sha256 digest, as "sha256:<hex>" or bare hex, the file must match.
+
+        Returns:
+            dict: size, resumed_from and attempts of the download, and sha256 when a checksum was verified.
+
+        Raises:
+            DownloadError: If the file could not be downloaded or failed verification.
+        """
+        part = dest + PART_SUFFIX
+        resumed_from = None
+        expected_checksum = normalize_checksum(checksum)
+
+        attempt = 0
+        while True:
+            try:
+                total, start = self.fetch(url, part)
+                resumed_from = start if resumed_from is None else resumed_from
+                break
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError, DownloadError) as e:
+                if attempt >= self.retry_policy.retries:
+                    raise DownloadError(f"Failed to download {urlsplit(url).path} after {attempt + 1} attempts: {e}")
+                self.retry_policy.wait(attempt)
+                attempt += 1
+
+        size = os.path.getsize(part)
+        if total is not None and size != total:
+            raise DownloadError(f"Downloaded {size} bytes but the server announced {total}")
+        if expected_size is not None and size != expected_size:
+            raise DownloadError(f"Downloaded {size} bytes but expected {expected_size}")
+
+        result = dict(size=size, resumed_from=resumed_from, attempts=attempt + 1)
+        if expected_checksum is not None:
+            digest = file_sha256(part, self.chunk_size)
+            if digest != expected_checksum:
+                os.remove(part)
+                raise DownloadError(f"Checksum mismatch, expected sha256 {expected_checksum} got {digest}")
+            result["sha256"] = digest
+
+        os.replace(part, dest)
+        return result
+
+
+class ParallelDownloader:
+    """
+    Downloads a url over several connections at once by splitting it into byte ranges.
+
+    The object is probed with a one byte range request. When the server supports ranges and
+    the object is larger than one segment, `<dest>.part` is preallocated to the full size and
+    a thread pool fetches `segment_size` ranges, writing each at its offset with pwrite. The
+    completed segments are recorded in `<dest>.part.segments.json`, so an interrupted download
+    only fetches the missing ranges next time. Within one download, a segment whose connection
+    drops is retried from the last byte written; the offset is only kept in memory, so a
+    segment left incomplete by an interrupted run is fetched again from its start. Servers
+    without range support, and small objects, fall back to the StreamingDownloader.
+    """
+    def __init__(self,
+                 session: requests.Session,
+                 connections: int = DEFAULT_CONNECTIONS,
+                 segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 timeout=(10, 60),
+                 retry_policy: RetryPolicy = None,
+                 headers: dict = None,
+                 ) -> None:
+        self.session = session
+        self.connections = max(1, connections)
+        self.segment_size = segment_size
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.headers = headers or {}
+        self.lock = threading.Lock()
+        self.retries = 0
+
+    def streaming(self) -> StreamingDownloader:
+        return StreamingDownloader(self.session, self.chunk_size, self.timeout, self.retry_policy, self.headers)
+
+    def probe(self, url: str) -> tuple:
+        """
+        Returns (size, accepts_ranges) for url using a one byte range request.
+        """
+        headers = dict(self.headers, Range="bytes=0-0")
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if response.status_code == 206:
+                _, _, total = parse_content_range(response.headers.get("Content-Range"))
+                return total, total is not None
+            length = response.headers.get("Content-Length")
+            return (int(length) if length is not None else None), False
+
+    def fetch_segment(self, url: str, fd: int, start: int, end: int) -> None:
+        """
+        Fetches bytes start..end (inclusive) of url and writes them at the same offsets of fd.
+        """
+        position = start
+        attempt = 0
+        while True:
+            try:
+                headers = dict(self.headers, Range=f"bytes={position}-{end}")
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    range_start, _, _ = parse_content_range(response.headers.get("Content-Range"))
+                    if response.status_code != 206 or range_start != position:
+                        raise DownloadError(f"Server did not honor the range {position}-{end}")
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        chunk = chunk[:end + 1 - position]
+                        os.pwrite(fd, chunk, position)
+                        position += len(chunk)
+                if position != end + 1:
+                    raise DownloadError(f"Range {start}-{end} ended at byte {position}")
+                return
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError, DownloadError):
+                if attempt >= self.retry_policy.retries:
+                    raise
+                self.retry_policy.wait(attempt)
+                attempt += 1
+                with self.lock:
+                    self.retries += 1
+
+    def load_segments(self, part: str, size: int) -> set:
+        """
+        Returns the indexes of the segments already present in part.
+        """
+        try:
+            with open(part + SEGMENTS_SUFFIX, "r") as segments_file:
+                state = json.load(segments_file)
+            if state.get("size") == size and state.get("segment_size") == self.segment_size:
+                return set(state.get("done", []))
+        except (OSError, ValueError):
+            pass
+
+        # a partial file without a segment record was written sequentially by StreamingDownloader
+        if os.path.exists(part) and os.path.getsize(part) <= size:
+            prefix = os.path.getsize(part)
+            return set(index for index in range(prefix // self.segment_size))
+        return set()
+
+    def save_segments(self, part: str, size: int, done: set) -> None:
+        tmp_path = part + SEGMENTS_SUFFIX + ".tmp"
+        with open(tmp_path, "w") as segments_file:
+            json.dump(dict(size=size, segment_size=self.segment_size, done=sorted(done)), segments_file)
+        os.replace(tmp_path, part + SEGMENTS_SUFFIX)
+
+    def download(self, url: str, dest: str, expected_size: int = None, checksum: str = None) -> dict:
+        """
+        Downloads url to dest over up to `connections` parallel connections.
+
+        Args:
+            url (str): The url to download.
+            dest (str): The destination path.
+            expected_size (int): Optional size in bytes the file must have.
+            checksum (str): Optional sha256 digest, as "sha256:<hex>" or bare hex, the file must match.
+
+        Returns:
+            dict: size, resumed_from, attempts, connections and segments of the download,
+            and sha256 when a checksum was verified.
+
+        Raises:
+            DownloadError: If the file could not be downloaded or failed verification.
+        """
+        size, accepts_ranges = self.probe(url)
+        part = dest + PART_SUFFIX
+        if not accepts_ranges or size <= self.segment_size or self.connections == 1:
+            # a preallocated parallel partial has holes, it cannot be resumed sequentially
+            if os.path.exists(part + SEGMENTS_SUFFIX):
+                os.remove(part + SEGMENTS_SUFFIX)
+                if os.path.exists(part):
+                    os.remove(part)
+            result = self.streaming().download(url, dest, expected_size, checksum)
+            result.update(connections=1, segments=1)
+            return result
+
+        if expected_size is not None and size != expected_size:
+            raise DownloadError(f"The server announced {size} bytes but expected {expected_size}")
+        expected_checksum = normalize_checksum(checksum)
+
+        segments = [(index, start, min(start + self.segment_size, size) - 1)
+                    for index, start in enumerate(range(0, size, self.segment_size))]
+        done = self.load_segments(part, size)
+        resumed_from = sum(end + 1 - start for index, start, end in segments if index in done)
+        self.save_segments(part, size, done)
+
+        fd = os.open(part, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # reserve the full size up front so every worker can write at its own offset
+            os.ftruncate(fd, size)
+            if hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(fd, 0, size)
+                except OSError:
+                    pass
+
+            errors = []
+            with ThreadPoolExecutor(max_workers=self.connections) as pool:
+                futures = {pool.submit(self.fetch_segment, url, fd, start, end): index
+                           for index, start, end in segments if index not in done}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    done.add(futures[future])
+                    self.save_segments(part, size, done)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        if errors:
+            raise DownloadError(f"Failed to download {len(errors)} of {len(segments)} segments of {urlsplit(url).path}: {errors[0]}")
+
+        result = dict(size=size, resumed_from=resumed_from, attempts=self.retries + 1,
+                      connections=self.connections, segments=len(segments))
+        if expected_checksum is not None:
+            digest = file_sha256(part, self.chunk_size)
+            if digest != expected_checksum:
+                os.remove(part)
+                os.remove(part + SEGMENTS_SUFFIX)
+                raise DownloadError(f"Checksum mismatch, expected sha256 {expected_checksum} got {digest}")
+            result["sha256"] = digest
+
+        os.replace(part, dest)
+        os.remove(part + SEGMENTS_SUFFIX)
+        return result
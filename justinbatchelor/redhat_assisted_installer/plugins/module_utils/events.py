@@ -0,0 +1,129 @@
+import re
+
+from collections import deque
+from datetime import datetime, timezone
+
+from .api import get_events
+
+
+# events requested per page while walking back to the cursor
+DEFAULT_PAGE_SIZE = 100
+
+# events kept in memory, the oldest are dropped first
+DEFAULT_BUFFER_SIZE = 1000
+
+# RFC 3339 timestamps as returned by the api, e.g. 2024-06-01T12:00:00.123Z
+EVENT_TIME_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:?\d{2})?$")
+
+
+def parse_event_time(value: str) -> datetime:
+    """
+    Parses an event time or a cursor into an aware datetime.
+
+    Fractions of any precision are accepted, the api may return milliseconds or nanoseconds,
+    and timestamps without an offset are taken as UTC.
+
+    Raises:
+        ValueError: The value is not an RFC 3339 timestamp.
+    """
+    match = EVENT_TIME_PATTERN.match(value.strip())
+    if match is None:
+        raise ValueError(f"Not an RFC 3339 timestamp: {value}")
+    base, fraction, zone = match.groups()
+    zone = "+00:00" if zone in (None, "Z") else zone
+    return datetime.fromisoformat(f"{base}.{(fraction or '').ljust(6, '0')[:6]}{zone}").astimezone(timezone.utc)
+
+def event_key(event: dict) -> tuple:
+    return (event.get("event_time"), event.get("name"), event.get("host_id"), event.get("message"))
+
+
+class EventTail:
+    """
+    Follows the events of a cluster, infrastructure environment or host from a cursor.
+
+    The api cannot filter events by time, so they are requested newest first, page by page, until one
+    at or before the cursor is seen. A poll costs a single request unless more than a page of events
+    was emitted since the cursor, instead of transferring the whole event history every time.
+
+    Received events are kept in a ring buffer of `buffer_size` events, so following a long installation
+    holds a bounded number of events in memory, the oldest being dropped first.
+    """
+    def __init__(self, filters: dict, since: str = None, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 page_size: int = DEFAULT_PAGE_SIZE) -> None:
+        self.filters = filters
+        self.cursor = since
+        self.since = parse_event_time(since) if since else None
+        # keys of the events received at the cursor time, later events may share that time;
+        # None for a cursor given by the user, whose events at that time were all received by an earlier run
+        self.at_cursor = None
+        self.buffer = deque(maxlen=buffer_size)
+        self.page_size = page_size
+        self.received = 0
+        self.truncated = False
+
+    @property
+    def events(self) -> list:
+        """
+        The buffered events, oldest first.
+        """
+        return list(self.buffer)
+
+    @property
+    def dropped(self) -> int:
+        """
+        Number of received events pushed out of the ring buffer by newer ones.
+        """
+        return self.received - len(self.buffer)
+
+    def fetch(self) -> list:
+        """
+        Requests the events newer than the cursor and moves the cursor to the newest one.
+
+        At most `buffer_size` events are requested; when the buffer fills up before the cursor is reached,
+        the older events are skipped and `truncated` is set.
+
+        Returns:
+            list: The new events, oldest first.
+        """
+        newer = []
+        seen = set()
+        offset = 0
+        while True:
+            # never request more events than the buffer still has room for
+            limit = min(self.page_size, self.buffer.maxlen - len(newer))
+            response = get_events(order="descending", limit=limit, offset=offset, **self.filters)
+            response.raise_for_status()
+            page = response.json()
+            for event in page:
+                key = event_key(event)
+                if self.since is not None:
+                    event_time = parse_event_time(event["event_time"])
+                    if event_time < self.since:
+                        return self.accept(newer)
+                    # events sharing the cursor time come in any order, only the ones already received are skipped
+                    if event_time == self.since and (self.at_cursor is None or key in self.at_cursor):
+                        continue
+                # events emitted while paging shift older ones onto the next page
+                if key in seen:
+                    continue
+                seen.add(key)
+                newer.append(event)
+                if len(newer) >= self.buffer.maxlen:
+                    self.truncated = True
+                    return self.accept(newer)
+            if len(page) < limit:
+                return self.accept(newer)
+            offset += len(page)
+
+    def accept(self, newer: list) -> list:
+        newer.reverse()
+        if newer:
+            since = parse_event_time(newer[-1]["event_time"])
+            if since != self.since or self.at_cursor is None:
+                self.at_cursor = set()
+            self.at_cursor.update(event_key(event) for event in newer if parse_event_time(event["event_time"]) == since)
+            self.cursor = newer[-1]["event_time"]
+            self.since = since
+        self.buffer.extend(newer)
+        self.received += len(newer)
+        return newer
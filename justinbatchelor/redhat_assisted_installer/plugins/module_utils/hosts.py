@@ -0,0 +1,157 @@
+import json
+import time
+
+from datetime import datetime, timezone
+
+
+def host_inventory(host: dict) -> dict:
+    """
+    Returns the hardware inventory the agent reported for a host.
+
+    The api serializes it as a JSON string in the `inventory` attribute, which is empty until
+    the agent registered. Malformed inventories are treated as empty.
+    """
+    inventory = host.get("inventory")
+    if isinstance(inventory, dict):
+        return inventory
+    if not inventory:
+        return {}
+    try:
+        inventory = json.loads(inventory)
+    except ValueError:
+        return {}
+    return inventory if isinstance(inventory, dict) else {}
+
+def strip_prefix(address: str) -> str:
+    """
+    Returns the address of an interface address given in CIDR notation, e.g. 192.168.1.10/24.
+    """
+    return address.split("/", 1)[0]
+
+def host_addresses(inventory: dict) -> dict:
+    """
+    Returns the mac, ipv4 and ipv6 addresses of every interface in a host inventory.
+
+    Returns:
+        dict: mac_addresses, ipv4_addresses and ipv6_addresses lists, the addresses without
+            their prefix length, in interface order.
+    """
+    addresses = dict(mac_addresses=[], ipv4_addresses=[], ipv6_addresses=[])
+    for interface in inventory.get("interfaces") or []:
+        if interface.get("mac_address"):
+            addresses["mac_addresses"].append(interface["mac_address"].lower())
+        addresses["ipv4_addresses"].extend(strip_prefix(address) for address in interface.get("ipv4_addresses") or [])
+        addresses["ipv6_addresses"].extend(strip_prefix(address) for address in interface.get("ipv6_addresses") or [])
+    return addresses
+
+def host_hostname(host: dict, inventory: dict = None) -> str:
+    """
+    Returns the hostname of a host, the one requested through the api before the one the agent reported.
+    """
+    if host.get("requested_hostname"):
+        return host["requested_hostname"]
+    if inventory is None:
+        inventory = host_inventory(host)
+    return inventory.get("hostname")
+
+def find_disk(inventory: dict, disk: str) -> dict:
+    """
+    Returns the disk of a host inventory with the given id, e.g. /dev/disk/by-id/wwn-0x..., path or name, None if it has none.
+    """
+    for candidate in inventory.get("disks") or []:
+        if disk in (candidate.get("id"), candidate.get("path"), candidate.get("by_path"), candidate.get("name")):
+            return candidate
+    return None
+
+
+class HostIndex:
+    """
+    Indexed view over the hosts of an infrastructure environment.
+
+    A single pass over the listing parses every inventory once and builds dictionaries keyed by
+    id, by mac address and by hostname, so resolving any number of hosts costs no further request.
+    Hosts sharing a hostname are all kept, which makes ambiguous hostnames easy to detect.
+    """
+    def __init__(self, hosts: list) -> None:
+        self.hosts = hosts if hosts is not None else []
+        self.inventories = {}
+        self.by_id = {}
+        self.by_mac = {}
+        self.by_hostname = {}
+        for host in self.hosts:
+            inventory = host_inventory(host)
+            self.inventories[host.get("id")] = inventory
+            self.by_id.setdefault(host.get("id"), []).append(host)
+            for mac in host_addresses(inventory)["mac_addresses"]:
+                self.by_mac.setdefault(mac, []).append(host)
+            hostname = host_hostname(host, inventory)
+            if hostname:
+                self.by_hostname.setdefault(hostname, []).append(host)
+
+    def __len__(self):
+        return len(self.hosts)
+
+    def find(self, id: str = None, mac_address: str = None, hostname: str = None) -> list:
+        """
+        Returns the hosts with the given id, else mac address, else hostname. Mac addresses are compared case-insensitively.
+        """
+        if id is not None:
+            return list(self.by_id.get(id, []))
+        if mac_address is not None:
+            return list(self.by_mac.get(mac_address.lower(), []))
+        return list(self.by_hostname.get(hostname, []))
+
+    def inventory(self, host: dict) -> dict:
+        """
+        Returns the parsed inventory of a host of the listing.
+        """
+        return self.inventories.get(host.get("id"), {})
+
+
+class HostArrivals:
+    """
+    Records when the hosts of successive listings of an infrastructure environment were first seen.
+
+    Every host gets the time it registered, and the time it was first seen in one of `statuses`, e.g.
+    known once it passed its validations, both as an ISO timestamp and as seconds since the tracking started.
+    Hosts already registered when the tracking started are recorded with an elapsed time of 0.
+    """
+    def __init__(self, statuses: list = None, clock=time.monotonic) -> None:
+        self.statuses = set(statuses) if statuses else None
+        self.clock = clock
+        self.started = clock()
+        self.by_id = {}
+
+    def stamp(self) -> dict:
+        return dict(at=datetime.now(timezone.utc).isoformat(), elapsed=round(self.clock() - self.started, 3))
+
+    def matches(self, host: dict) -> bool:
+        return self.statuses is None or host.get("status") in self.statuses
+
+    def update(self, hosts: list) -> list:
+        """
+        Records the hosts of one listing, and returns those in one of the awaited statuses.
+        """
+        matching = []
+        for host in hosts:
+            arrival = self.by_id.get(host.get("id"))
+            if arrival is None:
+                stamp = self.stamp()
+                arrival = self.by_id[host.get("id")] = dict(
+                    id=host.get("id"), registered_at=stamp["at"], registered_elapsed=stamp["elapsed"],
+                    ready_at=None, ready_elapsed=None,
+                )
+            arrival.update(hostname=host_hostname(host), status=host.get("status"))
+            if self.matches(host):
+                matching.append(host)
+                if arrival["ready_at"] is None:
+                    stamp = self.stamp()
+                    arrival.update(ready_at=stamp["at"], ready_elapsed=stamp["elapsed"])
+        return matching
+
+    @property
+    def arrivals(self) -> list:
+        """
+        Every host seen, in the order they registered.
+        """
+        return list(self.by_id.values())
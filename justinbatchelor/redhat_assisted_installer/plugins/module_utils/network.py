@@ -0,0 +1,122 @@
+import functools
+import ipaddress
+
+
+# the network lists of a cluster, in the order their errors are reported
+NETWORK_LISTS = ("machine_networks", "cluster_networks", "service_networks")
+
+# the virtual ip lists of a cluster, every vip must be in one of the machine networks
+VIP_LISTS = ("api_vips", "ingress_vips")
+
+# every node gets a subnet of at least 2^7 = 128 addresses out of a cluster network, a host_prefix of at most 25 for IPv4
+MIN_HOST_SUBNET_BITS = 7
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_network(cidr: str):
+    """
+    Parses a CIDR once, fleet specs mostly repeat the same few networks. Host bits may be set, as the api accepts them.
+    """
+    return ipaddress.ip_network(cidr, strict=False)
+
+@functools.lru_cache(maxsize=1024)
+def parse_address(ip: str):
+    return ipaddress.ip_address(ip)
+
+def find_overlaps(networks: list) -> list:
+    """
+    Returns the pairs of overlapping networks among a list of (label, network) tuples.
+
+    The networks of each IP version are sorted by their first address and swept once, keeping the
+    network reaching the furthest so far: a network starting before that end overlaps it. This costs
+    O(n log n) instead of comparing every pair, and reports every network overlapping an earlier one.
+
+    Returns:
+        list: (label, label) tuples, the earlier network first.
+    """
+    overlaps = []
+    for version in (4, 6):
+        intervals = sorted((int(network.network_address), int(network.broadcast_address), label)
+                           for label, network in networks if network.version == version)
+        reach = None
+        for start, end, label in intervals:
+            if reach is not None and start <= reach[0]:
+                overlaps.append((reach[1], label))
+            if reach is None or end > reach[0]:
+                reach = (end, label)
+    return overlaps
+
+def validate_cluster_networks(params: dict) -> list:
+    """
+    Checks the networks and virtual ips of cluster params offline, before anything is sent to the api.
+
+    The checks are the ones the api would reject the cluster for after a round trip:
+      - every cidr and ip parses,
+      - no two machine, cluster or service networks overlap,
+      - the host_prefix of every cluster network is within the network and leaves at least 128 addresses per node,
+      - every api and ingress vip is in one of the machine networks, and the api and ingress vips differ,
+      - dual-stack clusters list one IPv4 then one IPv6 network in every network list, and their vips in the same order.
+
+    Only the lists present in params are checked, so params of a PATCH are checked on their own.
+
+    Parameters:
+    params (dict): The cluster params, e.g. Cluster.create_params().
+
+    Returns:
+        list: One message per problem found, empty when the networks are valid.
+    """
+    errors = []
+    networks = {}
+    for key in NETWORK_LISTS:
+        for index, item in enumerate(params.get(key) or []):
+            label = f"{key}[{index}] {item.get('cidr')}"
+            try:
+                network = parse_network(item.get('cidr'))
+            except (TypeError, ValueError):
+                errors.append(f"{label} is not a valid CIDR")
+                continue
+            networks.setdefault(key, []).append((label, network))
+
+            host_prefix = item.get('host_prefix')
+            if key == 'cluster_networks' and host_prefix is not None:
+                if host_prefix < network.prefixlen:
+                    errors.append(f"{label}: host_prefix {host_prefix} is shorter than the network prefix /{network.prefixlen}")
+                elif host_prefix > network.max_prefixlen - MIN_HOST_SUBNET_BITS:
+                    errors.append(f"{label}: host_prefix {host_prefix} leaves fewer than {2 ** MIN_HOST_SUBNET_BITS} addresses per node, "
+                                  f"use at most {network.max_prefixlen - MIN_HOST_SUBNET_BITS}")
+
+    for earlier, later in find_overlaps([entry for key in NETWORK_LISTS for entry in networks.get(key, [])]):
+        errors.append(f"{later} overlaps {earlier}")
+
+    machine_networks = [network for _, network in networks.get('machine_networks', [])]
+    vips = {}
+    for key in VIP_LISTS:
+        for index, item in enumerate(params.get(key) or []):
+            label = f"{key}[{index}] {item.get('ip')}"
+            try:
+                address = parse_address(item.get('ip'))
+            except (TypeError, ValueError):
+                errors.append(f"{label} is not a valid IP address")
+                continue
+            vips.setdefault(key, []).append((label, address))
+            if machine_networks and not any(address in network for network in machine_networks if network.version == address.version):
+                errors.append(f"{label} is not in any machine network")
+
+    shared = {address for _, address in vips.get('api_vips', [])} & {address for _, address in vips.get('ingress_vips', [])}
+    for address in sorted(shared, key=str):
+        errors.append(f"{address} is used as both an api and an ingress vip")
+
+    # a dual-stack cluster lists IPv4 first and IPv6 second everywhere, a single-stack one a single version
+    families = {network.version for entries in networks.values() for _, network in entries}
+    for key in NETWORK_LISTS:
+        versions = [network.version for _, network in networks.get(key, [])]
+        if len(families) > 1 and versions and versions != [4, 6]:
+            errors.append(f"{key} of a dual-stack cluster must list one IPv4 network then one IPv6 network, "
+                          f"found {', '.join(f'IPv{version}' for version in versions)}")
+    for key in VIP_LISTS:
+        versions = [address.version for _, address in vips.get(key, [])]
+        if len(versions) != len(set(versions)):
+            errors.append(f"{key} may hold at most one vip per IP version")
+        elif len(versions) > 1 and versions != [4, 6]:
+            errors.append(f"{key} must list the IPv4 vip before the IPv6 vip")
+    return errors
@@ -0,0 +1,260 @@
+import os
+
+## import the python classes that implement the various schemas defined and used by the api
+from .schema.cluster import (APIVIP, Cluster, ClusterNetwork, DiskEncryption, IgnitionEndpoint, IngressVIP,
+                             MachineNetwork, OLMOperator, Platform, PlatformExternal, ServiceNetwork)
+from .schema.infra_env import KernelArgument, MacInterfaceMap, Proxy, StaticNetworkConfig
+
+
+def create_additional_ntp_sources_from_params(module_params: list) -> str:
+    if module_params is None:
+        return None
+    additional_ntp_sources = ""
+    for source in module_params:
+        additional_ntp_sources += (source + ',')
+    return additional_ntp_sources[:-1]
+
+def create_api_vips_from_module_params(module_params: list[dict]) -> list[APIVIP]:
+    if module_params is None:
+        return None
+    api_vips = []
+    for api_vip in module_params:
+        api_vips.append(APIVIP(
+            cluster_id=api_vip.get('cluster_id', None),
+            ip=api_vip.get('ip', None),
+            verification=api_vip.get('verification', None),
+        ))
+    return api_vips
+
+def create_cluster_networks_from_module_params(module_params: list[dict]) -> list[ClusterNetwork]:
+    if module_params is None:
+        return None
+    cluster_networks = []
+    for cluster_network in module_params:
+        cluster_networks.append(ClusterNetwork(
+            cidr=cluster_network.get('cidr', None),
+            cluster_id=cluster_network.get('cluster_id', None),
+            host_prefix=cluster_network.get('host_prefix', None),
+        ))
+    return cluster_networks
+        
+def create_disk_encryption_from_module_params(module_params: dict) -> DiskEncryption:
+    if module_params is None:
+        return None
+    return DiskEncryption(
+        enable_on=module_params.get('enable_on', None),
+        mode=module_params.get('mode', None),
+        tang_server=module_params.get('tang_server', None),
+    )
+
+def create_ignition_endpoint_from_module_params(module_params: dict) -> IgnitionEndpoint:
+    if module_params is None:
+        return None
+    return IgnitionEndpoint(
+        ca_certificate=module_params.get('ca_certificate', None),
+        url=module_params.get('url', None),
+    )
+
+def create_ingress_vips_from_module_params(module_params: list[dict]) -> list[IngressVIP]:
+    if module_params is None:
+        return None
+    ingress_vips = []
+    for ingress_vip in module_params:
+        ingress_vips.append(IngressVIP(
+            ip=ingress_vip.get('ip', None),
+            cluster_id=ingress_vip.get('cluster_id', None),
+            verification=ingress_vip.get('verification', None),
+        ))
+    return ingress_vips
+
+
+def create_machine_networks_from_module_params(module_params: list[dict]) -> list[MachineNetwork]:
+    if module_params is None:
+        return None
+    machine_networks = []
+    for machine_network in module_params:
+        machine_networks.append(MachineNetwork(
+            cidr=machine_network.get('cidr', None),
+            cluster_id=machine_network.get('cluster_id', None),
+        ))
+    return machine_networks
+
+def create_olm_operators_from_module_params(module_params: list[dict]) -> list[OLMOperator]:
+    if module_params is None:
+        return None
+    olm_operators = []
+    for olm_operator in module_params:
+        olm_operators.append(OLMOperator(
+            name=olm_operator.get('name', None),
+            properties=olm_operator.get("properties", None),
+        ))
+    return olm_operators
+
+def create_platform_external_from_module_params(module_params: dict) -> PlatformExternal:
+    if module_params is None:
+        return None
+
+    return PlatformExternal(
+        cloud_controller_manager=module_params.get('cloud_controller_manager', None),
+        platform_name=module_params.get("platform_name", None),
+        )
+
+def create_platform_from_module_params(module_params: dict) -> Platform:
+    if module_params is None:
+        return None
+    
+    return Platform(
+        external=create_platform_external_from_module_params(module_params.get("external", None)),
+        type=module_params.get("type", None),
+    )
+
+def create_service_networks_from_module_params(module_params: list[dict]) -> list[ServiceNetwork]:
+    if module_params is None:
+        return None
+    service_networks = []
+    for service_network in module_params:
+        service_networks.append(ServiceNetwork(
+            cidr=service_network.get('cidr', None),
+            cluster_id=service_network.get('cluster_id', None),
+        ))
+    return service_networks
+
+
+def create_proxy_from_module_params(module_params: dict) -> Proxy:
+    if module_params is None or (module_params.get("http_proxy", None) is None and module_params.get("https_proxy") is None and module_params.get("no_proxy") is None):
+        return None
+    return Proxy(
+        http_proxy=module_params.get('http_proxy', None),
+        https_proxy=module_params.get('https_proxy', None),
+        no_proxy=module_params.get('no_proxy', None),
+    )
+
+def create_kernel_arguments_from_module_params(module_params: list[dict]) -> list[KernelArgument]:
+    if module_params is None:
+        return None
+    kernel_arguments = []
+    for kernel_argument in module_params:
+        kernel_arguments.append(KernelArgument(
+            operation=kernel_argument.get('operation', None),
+            value=kernel_argument.get('value', None),
+        ))
+    return kernel_arguments
+
+
+def create_static_network_config_from_module_params(module_params: list[dict]) -> list[StaticNetworkConfig]:
+    if module_params is None:
+        return None
+    network_configs = []
+    # for each static network config
+    for network_config in module_params:
+        # create an array of mac_interfaces
+        mac_interfaces = []
+        for mac_interface in network_config.get('mac_interface_map', None):
+            mac_interfaces.append(MacInterfaceMap(
+                logical_nic_name=mac_interface.get('logical_nic_name', None),
+                mac_address=mac_interface.get('mac_address', None),
+            ))
+
+        network_configs.append(StaticNetworkConfig(
+            mac_interface_map=mac_interfaces,
+            network_yaml=network_config.get('network_yaml', None),
+        ))
+    return network_configs
+    
+
+def cluster_argument_spec() -> dict:
+    """
+    Returns the argument spec describing one cluster, shared by the cluster and cluster_bulk modules.
+    """
+    return dict(
+        additional_ntp_sources=dict(type='list', required=False),
+        api_vips=dict(type='list', elements='dict', required=False, options=dict(
+            cluster_id=dict(type='str', required=False),
+            ip=dict(type='str', required=True),
+            verification=dict(type='str', required=False, choices=["unverified", "failed", "succeeded"])
+        )),
+        base_dns_domain=dict(type='str', required=False),
+        cluster_networks=dict(type='list',elements='dict', required=False, options=dict(
+            cidr=dict(type='str', required=True),
+            cluster_id=dict(type='str', required=False),
+            host_prefix=dict(type='int', required=False),
+        )),
+        cluster_id=dict(type='str', required=False),
+        cpu_architecture=dict(type='str', required=False, choices=['x86_64', 'aarch64', 'arm64', 'ppc64le', 's390x']),
+        disk_encryption=dict(type='dict',required=False,options=dict(
+            enable_on=dict(type='str', required=True, choices=["none", "all", "masters", "workers"]),
+            mode=dict(type='str', required=True, choices=["tang", "tpmv2"]),
+            tang_server=dict(type='str', required=False),
+        )),
+        high_availability_mode=dict(type='str', required=False, choices=["None", "Full"]),
+        http_proxy=dict(type='str', required=False),
+        https_proxy=dict(type='str', required=False),
+        hyperthreading=dict(type='str', required=False, choices=['all', 'none', "masters", "workers"]),
+        ignition_endpoint=dict(type='dict',elements='dict', required=False, options=dict(
+            ca_certificate=dict(type='str', required=True),
+            url=dict(type='str', required=True)
+        )),
+        ingress_vips=dict(type='list',elements='dict',required=False,options=dict(
+            cluster_id=dict(type='str', required=False),
+            ip=dict(type='str', required=True),
+            verification=dict(type='str', required=False, choices=["unverified", "failed", "succeeded"]),
+        )),
+        machine_networks=dict(type='list', elements='dict', required=False, options=dict(
+            cidr=dict(type='str', required=True),
+            cluster_id=dict(type='str', required=False),
+        )),
+        name=dict(type='str', required=False),
+        network_type=dict(type='str', required=False, choices=['OpenShiftSDN', 'OVNKubernetes']),
+        olm_operators=dict(type='list', elements='dict', required=False, options=dict(
+            name=dict(type='str', required=True),
+            properties=dict(type='str', required=False),
+        )),
+        openshift_version=dict(type='str', required=False),
+        platform=dict(type='dict', required=False, options=dict(
+            external=dict(type='dict', required=False, options=dict(
+                cloud_controller_manager=dict(type='str', required=True, choices=["", "External"]),
+                platform_name=dict(type='str', required=True),
+            )),
+            type=dict(type='str', required=True, choices=["baremetal", "nutanix", "vsphere", "none", "external"]),
+        )),
+        schedulable_masters=dict(type='bool', required=False),
+        service_networks=dict(type='list', elements='dict', required=False, options=dict(
+            cidr=dict(type='str', required=True),
+            cluster_id=dict(type='str', required=False),
+        )),
+        state=dict(type='str', required=True, choices=['present', 'absent']),
+        tags=dict(type='str', required=False),
+        user_managed_networking=dict(type='bool', required=False),
+        ssh_public_key=dict(type='str', required=False),
+        vip_dhcp_allocation=dict(type='bool', required=False),
+    )
+
+def create_cluster_from_module_params(module_params: dict) -> Cluster:
+    return Cluster(
+        additional_ntp_sources=create_additional_ntp_sources_from_params(module_params.get('additional_ntp_sources')),
+        api_vips=create_api_vips_from_module_params(module_params.get('api_vips')),
+        base_dns_domain=module_params.get('base_dns_domain'),
+        cluster_networks=create_cluster_networks_from_module_params(module_params.get('cluster_networks')),
+        cluster_id=module_params.get('cluster_id'),
+        cpu_architecture=module_params.get('cpu_architecture'),
+        disk_encryption=create_disk_encryption_from_module_params(module_params.get('disk_encryption')),
+        high_availability_mode=module_params.get('high_availability_mode'),
+        http_proxy=module_params.get('http_proxy'),
+        https_proxy=module_params.get('https_proxy'),
+        hyperthreading=module_params.get('hyperthreading'),
+        ignition_endpoint=create_ignition_endpoint_from_module_params(module_params.get('ignition_endpoint')),
+        ingress_vips=create_ingress_vips_from_module_params(module_params.get('ingress_vips')),
+        machine_networks=create_machine_networks_from_module_params(module_params.get('machine_networks')),
+        name=module_params.get('name'),
+        network_type=module_params.get('network_type'),
+        olm_operator=create_olm_operators_from_module_params(module_params.get('olm_operators')),
+        openshift_version=module_params.get("openshift_version"),
+        platform=create_platform_from_module_params(module_params.get('platform')),
+        schedulable_masters=module_params.get('schedulable_masters'),
+        service_networks=create_service_networks_from_module_params(module_params.get('service_networks')),
+        tags=module_params.get('tags'),
+        user_managed_networking=module_params.get('user_managed_networking'),
+        ssh_public_key=module_params.get('ssh_public_key'),
+        vip_dhcp_allocation=module_params.get('vip_dhcp_allocation'),
+        pull_secret=module_params.get('pull_secret') or os.environ.get("REDHAT_PULL_SECRET"),
+    )
@@ -0,0 +1,92 @@
+import time
+
+from datetime import datetime, timezone
+
+
+# seconds between the first polls, while the object is still changing quickly
+DEFAULT_INITIAL_INTERVAL = 5
+
+# upper bound of the delay between polls during long phases
+DEFAULT_MAX_INTERVAL = 60
+
+# growth of the delay for every poll that sees no change
+DEFAULT_BACKOFF_FACTOR = 1.5
+
+
+class AdaptivePoller:
+    """
+    Polls an API object in-process until a condition holds, a failure state is seen or time runs out.
+
+    The interval starts at `initial_interval` and grows by `factor` on every poll that observes
+    no change, up to `max_interval`. Whenever the observed state changes, e.g. the cluster moves
+    to the next installation phase, the interval drops back to `initial_interval`, since the
+    next transition often follows quickly.
+    """
+    def __init__(self,
+                 timeout: float,
+                 initial_interval: float = DEFAULT_INITIAL_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_INTERVAL,
+                 factor: float = DEFAULT_BACKOFF_FACTOR,
+                 clock=time.monotonic,
+                 sleep=time.sleep,
+                 state_key: str = "status",
+                 ) -> None:
+        self.timeout = timeout
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.clock = clock
+        self.sleep = sleep
+        self.state_key = state_key
+        self.timeline = []
+        self.polls = 0
+
+    def record(self, state, started: float, **extra) -> None:
+        entry = {self.state_key: state}
+        entry.update(
+            at=datetime.now(timezone.utc).isoformat(),
+            elapsed=round(self.clock() - started, 3),
+        )
+        entry.update(extra)
+        self.timeline.append(entry)
+
+    def poll(self, fetch, state_of, is_done, is_failed=None, describe=None) -> tuple:
+        """
+        Calls `fetch` until `is_done` or `is_failed` returns True for its result, or the timeout expires.
+
+        Args:
+            fetch (callable): Returns the current object, raising on API errors.
+            state_of (callable): Extracts the value whose changes are tracked, e.g. the status.
+            is_done (callable): Returns True when the object reached the desired state.
+            is_failed (callable): Optional, returns True when the object reached a state it will not leave.
+            describe (callable): Optional, returns extra fields recorded in the timeline on every change.
+
+        Returns:
+            tuple: (outcome, last_object) where outcome is one of "done", "failed" or "timeout".
+        """
+        started = self.clock()
+        deadline = started + self.timeout
+        interval = self.initial_interval
+        last_state = object()
+
+        while True:
+            obj = fetch()
+            self.polls += 1
+
+            state = state_of(obj)
+            if state != last_state:
+                self.record(state, started, **(describe(obj) if describe is not None else {}))
+                last_state = state
+                interval = self.initial_interval
+            else:
+                interval = min(self.max_interval, interval * self.factor)
+
+            if is_done(obj):
+                return "done", obj
+            if is_failed is not None and is_failed(obj):
+                return "failed", obj
+
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return "timeout", obj
+            self.sleep(min(interval, remaining))
@@ -0,0 +1,197 @@
+import hashlib, json, os, tempfile, time
+
+from .api import get_cluster, get_clusters, get_infrastructure_environement, get_infrastructure_environements
+from .client import get_client
+from .tools import IndexedResponse
+
+
+# environment variable that enables the on-disk name index when set to a directory
+CACHE_DIR_ENV = "REDHAT_CACHE_DIR"
+
+# seconds a name index built from a full listing is trusted before it is rebuilt
+DEFAULT_INDEX_TTL = 300
+
+# statuses returned by the api for an id that does not exist or is not a valid uuid
+NOT_FOUND_CODES = (400, 404)
+
+
+class NameIndex:
+    """
+    Maps object names to ids for one kind of object (clusters, infra-envs) and one account.
+
+    The index lives in memory and, when a cache directory is configured, is persisted as JSON
+    so later module runs can skip listing every object. Without a cache directory it is kept
+    by the broker of the persistent client when there is one, for the rest of the play.
+    Entries older than `ttl` seconds are ignored.
+    """
+    def __init__(self, kind: str, account: str = None, cache_dir: str = None, ttl: int = DEFAULT_INDEX_TTL, broker=None) -> None:
+        self.kind = kind
+        self.ttl = ttl
+        self.broker = broker
+        self.path = None
+        if cache_dir is not None:
+            account_hash = hashlib.sha256((account or "").encode("utf-8")).hexdigest()[:16]
+            self.path = os.path.join(cache_dir, f"{kind}-index-{account_hash}.json")
+        self.built_at = 0
+        self.entries = {}
+        self.load()
+
+    def load(self) -> None:
+        if self.path is None and self.broker is None:
+            return
+        try:
+            if self.path is None:
+                data = self.broker.cache_get(f"{self.kind}-index") or {}
+            else:
+                with open(self.path, "r") as index_file:
+                    data = json.load(index_file)
+            self.built_at = data.get("built_at", 0)
+            self.entries = data.get("entries", {})
+        except (OSError, ValueError):
+            self.built_at = 0
+            self.entries = {}
+
+    def save(self) -> None:
+        if self.path is None:
+            if self.broker is not None:
+                try:
+                    self.broker.cache_put(f"{self.kind}-index", {"built_at": self.built_at, "entries": self.entries})
+                except OSError:
+                    pass
+            return
+        cache_dir = os.path.dirname(self.path)
+        try:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=f".{self.kind}-index.")
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump({"built_at": self.built_at, "entries": self.entries}, tmp_file)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # the index is only an optimization, failing to persist it must not fail the module
+            pass
+
+    def is_fresh(self) -> bool:
+        return self.built_at + self.ttl > time.time()
+
+    def lookup(self, name: str) -> list:
+        """
+        Returns the ids recorded for a name, or None if the index cannot answer.
+        """
+        if not self.is_fresh():
+            return None
+        return self.entries.get(name)
+
+    def rebuild(self, objects: IndexedResponse) -> None:
+        self.entries = {name: [obj.get("id") for obj in items if obj.get("id") is not None]
+                        for name, items in objects.by_name.items()}
+        self.built_at = time.time()
+        self.save()
+
+    def add(self, obj: dict) -> None:
+        ids = self.entries.setdefault(obj.get("name"), [])
+        if obj.get("id") not in ids:
+            ids.append(obj.get("id"))
+        self.save()
+
+    def discard(self, obj_id: str) -> None:
+        for name in list(self.entries):
+            if obj_id in self.entries[name]:
+                self.entries[name].remove(obj_id)
+                if not self.entries[name]:
+                    del self.entries[name]
+        self.save()
+
+
+class Resolver:
+    """
+    Finds API objects by id or name without listing the whole account where possible.
+
+    Lookups by id go straight to the single object endpoint. Lookups by name consult the
+    NameIndex and validate every hit with a single object GET. Only when the index has no
+    entry, is stale, or a hit no longer matches, the full list is fetched, the index rebuilt
+    and the name filtered from the list.
+    """
+    def __init__(self, get_one, get_all, index: NameIndex) -> None:
+        self.get_one = get_one
+        self.get_all = get_all
+        self.index = index
+        # index_hits counts the full listings that were avoided
+        self.stats = dict(index_hits=0, full_scans=0)
+
+    def by_id(self, obj_id: str) -> list:
+        """
+        Returns a list holding the object with the given id, or an empty list if it does not exist.
+
+        Raises:
+            requests.exceptions.HTTPError: If the api returned an unexpected error.
+        """
+        response = self.get_one(obj_id)
+        if response.status_code in NOT_FOUND_CODES:
+            return []
+        response.raise_for_status()
+        return [response.json()]
+
+    def by_name(self, name: str) -> list:
+        """
+        Returns the list of objects with the given name.
+
+        Raises:
+            requests.exceptions.HTTPError: If the api returned an unexpected error.
+        """
+        ids = self.index.lookup(name)
+        if ids:
+            matches = []
+            for obj_id in ids:
+                found = self.by_id(obj_id)
+                if not found or found[0].get("name") != name:
+                    matches = None
+                    break
+                matches.append(found[0])
+            if matches is not None:
+                self.stats["index_hits"] += 1
+                return matches
+
+        return self.scan(name)
+
+    def scan(self, name: str) -> list:
+        self.stats["full_scans"] += 1
+        response = self.get_all()
+        response.raise_for_status()
+        objects = IndexedResponse(response.json())
+        self.index.rebuild(objects)
+        return objects.get_by_name(name)
+
+    def resolve(self, obj_id: str = None, name: str = None) -> list:
+        """
+        Resolves by id when one is given, otherwise by name.
+        """
+        if obj_id is not None:
+            return self.by_id(obj_id)
+        return self.by_name(name)
+
+    def remember(self, obj: dict) -> None:
+        """
+        Records an object created by the module so the next run finds it without a full scan.
+        """
+        self.index.add(obj)
+
+    def forget(self, obj_id: str) -> None:
+        """
+        Removes an object deleted by the module from the index.
+        """
+        self.index.discard(obj_id)
+
+
+def cluster_resolver(ttl: int = DEFAULT_INDEX_TTL) -> Resolver:
+    return Resolver(
+        get_one=lambda cluster_id: get_cluster(cluster_id=cluster_id),
+        get_all=get_clusters,
+        index=NameIndex("clusters", get_client().account_key(), os.environ.get(CACHE_DIR_ENV), ttl, get_client().broker),
+    )
+
+def infra_env_resolver(ttl: int = DEFAULT_INDEX_TTL) -> Resolver:
+    return Resolver(
+        get_one=lambda infra_env_id: get_infrastructure_environement(infra_env_id=infra_env_id),
+        get_all=get_infrastructure_environements,
+        index=NameIndex("infra-envs", get_client().account_key(), os.environ.get(CACHE_DIR_ENV), ttl, get_client().broker),
+    )
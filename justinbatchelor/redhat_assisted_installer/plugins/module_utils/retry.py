@@ -0,0 +1,86 @@
+import random, time
+
+from email.utils import parsedate_to_datetime
+
+
+# verbs that can be replayed without side effects if the first attempt did reach the server
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+
+# statuses worth retrying for idempotent verbs
+RETRYABLE_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# statuses where the server tells us it did not process the request, safe for any verb
+REJECTED_STATUSES = frozenset([429, 503])
+
+
+def parse_retry_after(value: str) -> float:
+    """
+    Parses a Retry-After header given either as delta-seconds or as an HTTP-date.
+
+    Args:
+        value (str): The raw header value.
+
+    Returns:
+        float: The number of seconds to wait, or None if the header could not be parsed.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed request should be sent again.
+
+    Idempotent verbs are retried on connection errors, timeouts, 429 and 5xx responses up to
+    `retries` times. POST and PATCH get their own smaller budget and are only retried when the
+    request demonstrably did not take effect: a connection could not be established, or the
+    server answered 429/503. Delays use exponential backoff with full jitter, unless the server
+    sent a Retry-After header, which is honored up to `max_retry_after` seconds.
+    """
+    def __init__(self,
+                 retries: int = 3,
+                 non_idempotent_retries: int = 1,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 max_retry_after: float = 120.0,
+                 sleep=time.sleep,
+                 ) -> None:
+        self.retries = retries
+        self.non_idempotent_retries = min(non_idempotent_retries, retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.sleep = sleep
+
+    def budget(self, method: str) -> int:
+        return self.retries if method.upper() in IDEMPOTENT_METHODS else self.non_idempotent_retries
+
+    def should_retry_status(self, method: str, status_code: int) -> bool:
+        if method.upper() in IDEMPOTENT_METHODS:
+            return status_code in RETRYABLE_STATUSES
+        return status_code in REJECTED_STATUSES
+
+    def should_retry_error(self, method: str, connect_error: bool) -> bool:
+        # a connect error means the request never left this host, so any verb is safe to resend
+        return connect_error or method.upper() in IDEMPOTENT_METHODS
+
+    def backoff(self, attempt: int, retry_after: str = None) -> float:
+        """
+        Returns the delay before retry number `attempt` (starting at 0).
+        """
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            return min(delay, self.max_retry_after)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def wait(self, attempt: int, retry_after: str = None) -> float:
+        delay = self.backoff(attempt, retry_after)
+        self.sleep(delay)
+        return delay
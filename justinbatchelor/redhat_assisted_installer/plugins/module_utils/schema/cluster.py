@@ -1,8 +1,9 @@
 import os
 
-from .schema import APIObject
+from .schema import APIObject, Field, comma_separated_set, stripped
 
-"""
+# the attributes of clusters accepted by the api, with the constraints the api enforces on them
+SCHEMA = r"""
 {
   "additional_ntp_source": {
     "type": "string",
@@ -445,6 +446,20 @@ class ServiceNetwork(APIObject):
             self.params['cluster_id'] = cluster_id
 
 class Cluster(APIObject):
+    fields = dict(
+        additional_ntp_source=Field(normalize=comma_separated_set),
+        api_vips=Field(match_on="ip"),
+        cluster_networks=Field(match_on="cidr"),
+        ingress_vips=Field(match_on="ip"),
+        machine_networks=Field(match_on="cidr"),
+        # the api returns the installed operators as monitored_operators, so the requested ones cannot be compared
+        olm_operators=Field(match_on="name", write_only=True),
+        pull_secret=Field(write_only=True),
+        service_networks=Field(match_on="cidr"),
+        ssh_public_key=Field(normalize=stripped),
+        tags=Field(normalize=comma_separated_set),
+    )
+
     def __init__(self, 
                  additional_ntp_sources: str = None,
                  api_vips: list[APIVIP] = None,
@@ -517,7 +532,7 @@ class Cluster(APIObject):
             self.params['hyperthreading'] = hyperthreading
 
         if ignition_endpoint is not None:
-            self.params['ignition_endpoint'] = ignition_endpoint
+            self.params['ignition_endpoint'] = ignition_endpoint.create_params()
 
         if ingress_vips is not None:
             vips = []
@@ -547,7 +562,7 @@ class Cluster(APIObject):
             operators = []
             for operator in olm_operator:
                 operators.append(operator.create_params())
-            self.params['olm_operator'] = operators
+            self.params['olm_operators'] = operators
 
         if openshift_version is not None:
             self.params['openshift_version'] = openshift_version
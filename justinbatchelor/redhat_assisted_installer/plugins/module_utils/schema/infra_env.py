@@ -1,9 +1,10 @@
-import os, yaml
+import os
 
-from .schema import APIObject
+from .schema import APIObject, Field, comma_separated_set, json_document, stripped
 
 
-"""
+# the attributes of infrastructure environments accepted by the api, with the constraints the api enforces on them
+SCHEMA = r"""
 {
   "additional_ntp_sources": {
     "type": "string",
@@ -187,6 +188,9 @@ class StaticNetworkConfig(APIObject):
         # Replace escaped newlines with actual newlines and remove unnecessary escape characters
         proper_yaml_str = escaped_yaml_str.replace('\\n', '\n').replace('\\', '')
 
+        # yaml is only loaded by the tasks that configure static networking
+        import yaml
+
         # Load the YAML string to ensure it's valid and then dump it back to a string
         yaml_data = yaml.safe_load(proper_yaml_str)
         proper_yaml_str = yaml.dump(yaml_data, default_flow_style=False)
@@ -209,6 +213,16 @@ class KernelArgument(APIObject):
 
 
 class InfraEnv(APIObject):
+    fields = dict(
+        additional_ntp_sources=Field(normalize=comma_separated_set),
+        additional_trust_bundle=Field(normalize=stripped),
+        ignition_config_override=Field(normalize=json_document),
+        kernel_arguments=Field(normalize=json_document),
+        pull_secret=Field(write_only=True),
+        ssh_authorized_key=Field(normalize=stripped),
+        static_network_config=Field(normalize=json_document),
+    )
+
     def __init__(self,
                  infra_env_id: str = None,
                  additional_ntp_sources: str = None, 
@@ -1,4 +1,55 @@
+import json
+
+
+class Field:
+    """
+    Describes how one attribute of an API object compares with the value the api returns for it.
+
+    Args:
+        match_on (str): For lists of objects, the element key identifying an element, e.g. "cidr".
+            Elements are matched on it, so the order of the list does not matter.
+        normalize (callable): Applied to the desired and the returned value before they are compared.
+        schema (dict): Fields of the keys of a nested object, or of the elements of a list of objects.
+        write_only (bool): The api accepts the attribute but never returns it, e.g. pull_secret,
+            so it cannot be compared.
+    """
+    def __init__(self, match_on: str = None, normalize=None, schema: dict = None, write_only: bool = False) -> None:
+        self.match_on = match_on
+        self.normalize = normalize
+        self.schema = schema or {}
+        self.write_only = write_only
+
+
+def comma_separated_set(value):
+    """
+    Normalizes a comma-separated string such as tags or NTP sources, ignoring order and spacing.
+    """
+    if isinstance(value, str):
+        value = value.split(",")
+    return sorted(set(item.strip() for item in value if item and item.strip()))
+
+def stripped(value):
+    """
+    Normalizes a string the api stores without surrounding whitespace, such as an SSH key.
+    """
+    return value.strip() if isinstance(value, str) else value
+
+def json_document(value):
+    """
+    Normalizes a value the api returns as a JSON encoded string, such as kernel arguments.
+    """
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
 class APIObject:
+    # how each attribute compares with the api representation, attributes not listed compare as plain values
+    fields = {}
+
     def __init__(self):
         """
         Initializes the APIObject with an empty params dictionary.
@@ -12,4 +63,4 @@ class APIObject:
         Returns:
             dict: A dictionary with keys and values from self.params where the values are not None.
         """
-        return {key: value for key, value in self.params.items() if value is not None}
\ No newline at end of file
+        return {key: value for key, value in self.params.items() if value is not None}
@@ -0,0 +1,120 @@
+import hashlib, json, os, tempfile
+
+from collections.abc import Mapping
+
+from .client import get_client
+from .diff import DEFAULT_FIELD
+from .resolver import CACHE_DIR_ENV
+from .schema.schema import Field
+
+
+def normalize_params(value, field: Field = DEFAULT_FIELD):
+    """
+    Returns a canonical form of desired params, so equivalent params always serialize the same way.
+
+    The normalizers of the schema fields are applied, None values are dropped and lists of
+    objects matched on a key are sorted on it, mirroring how ObjectDiff compares them.
+    """
+    if value is None:
+        return None
+    if field.normalize is not None:
+        value = field.normalize(value)
+
+    if isinstance(value, Mapping):
+        return {key: normalize_params(item, field.schema.get(key, DEFAULT_FIELD))
+                for key, item in value.items() if item is not None}
+
+    if isinstance(value, list):
+        items = [normalize_params(item, Field(schema=field.schema)) for item in value]
+        if field.match_on is not None:
+            items.sort(key=lambda item: str(item.get(field.match_on)) if isinstance(item, Mapping) else str(item))
+        return items
+
+    return value
+
+def params_fingerprint(params: dict, fields: dict) -> str:
+    """
+    Returns a stable sha256 of the desired params of an API object.
+    """
+    canonical = normalize_params(params, Field(schema=fields))
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class DesiredStateStore:
+    """
+    Remembers, per object id, the fingerprint of the params last applied and the object's updated_at afterwards.
+
+    When a later run asks for the same params and the api still reports the same updated_at,
+    nobody changed the object in between, so it is known to be in the desired state without
+    diffing or patching it. The store is persisted as JSON next to the name index when a cache
+    directory is configured, kept by the broker of the persistent client for the rest of the
+    play when there is one, and only kept in memory otherwise.
+    """
+    def __init__(self, kind: str, account: str = None, cache_dir: str = None, broker=None) -> None:
+        self.kind = kind
+        self.broker = broker
+        self.path = None
+        if cache_dir is not None:
+            account_hash = hashlib.sha256((account or "").encode("utf-8")).hexdigest()[:16]
+            self.path = os.path.join(cache_dir, f"{kind}-state-{account_hash}.json")
+        self.entries = {}
+        self.load()
+
+    def load(self) -> None:
+        if self.path is None and self.broker is None:
+            return
+        try:
+            if self.path is None:
+                self.entries = self.broker.cache_get(f"{self.kind}-state") or {}
+            else:
+                with open(self.path, "r") as state_file:
+                    self.entries = json.load(state_file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self) -> None:
+        if self.path is None:
+            if self.broker is not None:
+                try:
+                    self.broker.cache_put(f"{self.kind}-state", self.entries)
+                except OSError:
+                    pass
+            return
+        cache_dir = os.path.dirname(self.path)
+        try:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=f".{self.kind}-state.")
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(self.entries, tmp_file)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # the state is only an optimization, failing to persist it must not fail the module
+            pass
+
+    def is_current(self, obj: dict, fingerprint: str) -> bool:
+        """
+        Checks that fingerprint was applied to obj and the object was not updated since.
+        """
+        entry = self.entries.get(obj.get("id"))
+        return (entry is not None and obj.get("updated_at") is not None
+                and entry.get("fingerprint") == fingerprint and entry.get("updated_at") == obj.get("updated_at"))
+
+    def record(self, obj: dict, fingerprint: str) -> None:
+        """
+        Records that obj, as returned by the api, is in the state described by fingerprint.
+        """
+        if obj.get("id") is None:
+            return
+        self.entries[obj["id"]] = dict(fingerprint=fingerprint, updated_at=obj.get("updated_at"))
+        self.save()
+
+    def discard(self, obj_id: str) -> None:
+        if self.entries.pop(obj_id, None) is not None:
+            self.save()
+
+
+def cluster_state_store() -> DesiredStateStore:
+    return DesiredStateStore("clusters", get_client().account_key(), os.environ.get(CACHE_DIR_ENV), get_client().broker)
+
+def infra_env_state_store() -> DesiredStateStore:
+    return DesiredStateStore("infra-envs", get_client().account_key(), os.environ.get(CACHE_DIR_ENV), get_client().broker)
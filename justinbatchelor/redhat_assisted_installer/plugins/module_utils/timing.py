@@ -0,0 +1,137 @@
+import json, os, re, threading, time
+
+
+# environment variable naming a trace file every module run appends its requests to
+TRACE_FILE_ENV = "REDHAT_TRACE_FILE"
+
+# endpoint template recorded for the offline token exchange
+SSO_ENDPOINT = "sso/token"
+
+UUID_PATTERN = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+# name of the id placeholder following each collection in an endpoint path
+ID_PLACEHOLDERS = {
+    "clusters": "{cluster_id}",
+    "infra-envs": "{infra_env_id}",
+    "hosts": "{host_id}",
+}
+
+
+def endpoint_template(endpoint: str) -> str:
+    """
+    Returns the endpoint with its query string dropped and ids replaced by placeholders.
+
+    e.g. clusters/4f1c.../actions/install becomes clusters/{cluster_id}/actions/install, so all
+    calls to one endpoint are aggregated together.
+    """
+    segments = endpoint.split("?", 1)[0].strip("/").split("/")
+    for index, segment in enumerate(segments):
+        if UUID_PATTERN.match(segment):
+            segments[index] = ID_PLACEHOLDERS.get(segments[index - 1] if index else None, "{id}")
+    return "/".join(segments)
+
+
+class RequestTimings:
+    """
+    Records the method, endpoint template, status, bytes and elapsed time of every request.
+
+    Calls are aggregated per "METHOD endpoint" into `summary`, which is updated in place so
+    modules can put it in their result up front, like the client stats. When a trace file is
+    given every call is also appended to it as a complete event of the Chrome trace event
+    format, which chrome://tracing, Perfetto and speedscope load. The file is a JSON array
+    left open so that several module runs can append to it; the viewers accept it as is.
+    """
+    def __init__(self, trace_file: str = None) -> None:
+        self.trace_file = trace_file
+        self.lock = threading.Lock()
+        self.summary = dict(requests=0, seconds=0.0, bytes_sent=0, bytes_received=0, endpoints={})
+
+    def record(self,
+               method: str,
+               endpoint: str,
+               status: int,
+               started: float,
+               elapsed: float,
+               bytes_sent: int = 0,
+               bytes_received: int = 0,
+               attempt: int = 0,
+               ) -> None:
+        """
+        Records one request.
+
+        Args:
+            method (str): The HTTP method.
+            endpoint (str): The endpoint template, see endpoint_template.
+            status (int): The response status, None when no response was received.
+            started (float): Wall clock time the request was sent at, in seconds since the epoch.
+            elapsed (float): Seconds until the response was read.
+            bytes_sent (int): Size of the request body.
+            bytes_received (int): Size of the response body.
+            attempt (int): 0 for the first attempt, then the number of the retry.
+        """
+        key = f"{method} {endpoint}"
+        with self.lock:
+            self.summary["requests"] += 1
+            self.summary["seconds"] = round(self.summary["seconds"] + elapsed, 6)
+            self.summary["bytes_sent"] += bytes_sent
+            self.summary["bytes_received"] += bytes_received
+
+            entry = self.summary["endpoints"].get(key)
+            if entry is None:
+                entry = self.summary["endpoints"][key] = dict(
+                    count=0, errors=0, seconds=0.0, min=elapsed, max=elapsed, bytes_received=0, statuses={},
+                )
+            entry["count"] += 1
+            entry["seconds"] = round(entry["seconds"] + elapsed, 6)
+            entry["min"] = round(min(entry["min"], elapsed), 6)
+            entry["max"] = round(max(entry["max"], elapsed), 6)
+            entry["bytes_received"] += bytes_received
+            if status is None or status >= 400:
+                entry["errors"] += 1
+            status_key = str(status) if status is not None else "error"
+            entry["statuses"][status_key] = entry["statuses"].get(status_key, 0) + 1
+
+            if self.trace_file is not None:
+                self.write_event(dict(
+                    name=key,
+                    cat="http",
+                    ph="X",
+                    ts=int(started * 1e6),
+                    dur=int(elapsed * 1e6),
+                    pid=os.getpid(),
+                    tid=threading.get_ident(),
+                    args=dict(method=method, endpoint=endpoint, status=status, attempt=attempt,
+                              bytes_sent=bytes_sent, bytes_received=bytes_received),
+                ))
+
+    def write_event(self, event: dict) -> None:
+        try:
+            # append mode keeps events of concurrent module runs whole, the array is opened by the first writer
+            with open(self.trace_file, "a") as trace:
+                if trace.tell() == 0:
+                    trace.write("[\n")
+                trace.write(json.dumps(event, separators=(",", ":")) + ",\n")
+        except OSError:
+            # tracing must never fail the module, stop writing after the first error
+            self.trace_file = None
+
+    def timed(self, method: str, endpoint: str, func, *args, **kwargs):
+        """
+        Calls func and records it as a request, for calls that do not go through the client.
+
+        The status and size are read from the returned response when there is one.
+        """
+        started = time.time()
+        clock = time.perf_counter()
+        status = None
+        sent = received = 0
+        try:
+            response = func(*args, **kwargs)
+            status = getattr(response, "status_code", None)
+            body = getattr(getattr(response, "request", None), "body", None)
+            sent = len(body) if body is not None else 0
+            received = len(getattr(response, "content", b"") or b"")
+            return response
+        finally:
+            self.record(method, endpoint, status, started, time.perf_counter() - clock,
+                        bytes_sent=sent, bytes_received=received)
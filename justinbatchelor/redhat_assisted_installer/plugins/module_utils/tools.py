@@ -1,18 +1,13 @@
-import re, jmespath, base64, textwrap, json
-from ..module_utils.schema.cluster import *
-from ..module_utils.schema.infra_env import *
+import functools
 from collections.abc import Mapping, Iterable
 
 
 def is_base64(base64_content: str):
-    # Define the regular expression for valid base64 characters
-    base64_pattern = re.compile(r'^[A-Za-z0-9+/=\n]+$')
-    
-    # Validate the base64 content
-    if not base64_pattern.match(base64_content):
-        return False
-    
-    return True
+    # the validation registry is only loaded by the tasks validating values
+    from .validation import named_pattern
+
+    # Validate the base64 content against the pattern of valid base64 characters, compiled once
+    return bool(named_pattern('base64').match(base64_content))
 
 def is_pem_format(cert_string: str):
     # Define the PEM format header and footer
@@ -38,7 +33,8 @@ def deep_equal(val1, val2):
         return (val1.keys() == val2.keys() and 
                 all(deep_equal(val1[k], val2[k]) for k in val1))
     elif isinstance(val1, Iterable) and isinstance(val2, Iterable) and not isinstance(val1, (str, bytes)):
-        return all(deep_equal(v1, v2) for v1, v2 in zip(val1, val2))
+        val1, val2 = list(val1), list(val2)
+        return len(val1) == len(val2) and all(deep_equal(v1, v2) for v1, v2 in zip(val1, val2))
     else:
         return val1 == val2
 
@@ -73,37 +69,136 @@ def filter_dict_by_keys(data, valid_keys):
     """
     return {key: value for key, value in data.items() if key in valid_keys}
 
+def filter_objects(objects: list, name: str = None, status: list = None) -> list:
+    """
+    Returns the objects matching every filter given, for filters the API cannot apply itself.
+
+    Parameters:
+    objects (list): The objects returned by the API.
+    name (str): Only keep objects with this name.
+    status (list): Only keep objects in one of these statuses.
+
+    Returns:
+    list: The matching objects, in their original order.
+    """
+    statuses = set(status) if status else None
+    return [obj for obj in objects
+            if (name is None or obj.get('name') == name)
+            and (statuses is None or obj.get('status') in statuses)]
+
+def project_fields(objects: list, fields: list) -> list:
+    """
+    Returns the objects reduced to the given top level keys, so only those are sent back to Ansible.
+    """
+    valid_keys = set(fields)
+    return [filter_dict_by_keys(obj, valid_keys) for obj in objects]
+
+
+class IndexedResponse:
+    """
+    Indexed view over a list of objects returned by the API.
+
+    A single pass over the list builds dictionaries keyed by `id` and by `name`, so any number
+    of lookups afterwards are O(1). Objects sharing a name or an id are all kept, which makes
+    duplicates easy to detect.
+    """
+    def __init__(self, data: list) -> None:
+        self.data = data if data is not None else []
+        self.by_id = {}
+        self.by_name = {}
+        for item in self.data:
+            if not isinstance(item, Mapping):
+                continue
+            if item.get('id') is not None:
+                self.by_id.setdefault(item['id'], []).append(item)
+            if item.get('name') is not None:
+                self.by_name.setdefault(item['name'], []).append(item)
+
+    def __len__(self):
+        return len(self.data)
+
+    def get_by_id(self, id: str) -> list:
+        """
+        Returns the list of objects whose id equals `id`.
+        """
+        return list(self.by_id.get(id, []))
+
+    def get_by_name(self, name: str) -> list:
+        """
+        Returns the list of objects whose name equals `name`.
+        """
+        return list(self.by_name.get(name, []))
+
+    def duplicate_names(self) -> dict:
+        """
+        Returns a dictionary of name -> objects for every name used by more than one object.
+        """
+        return {name: items for name, items in self.by_name.items() if len(items) > 1}
+
+    def duplicate_ids(self) -> dict:
+        """
+        Returns a dictionary of id -> objects for every id that appears more than once.
+        """
+        return {id: items for id, items in self.by_id.items() if len(items) > 1}
+
+
+@functools.lru_cache(maxsize=128)
+def compile_jmespath(expression: str):
+    """
+    Compiles a JMESPath expression once and returns the cached parsed expression afterwards.
+
+    Parameters:
+    expression (str): The JMESPath expression.
+
+    Returns:
+    jmespath.parser.ParsedResult: The compiled expression.
+    """
+    # jmespath is only loaded by the tasks that filter with a query
+    import jmespath
+    return jmespath.compile(expression)
+
+def jmespath_search(expression: str, data):
+    """
+    Evaluates a JMESPath expression against data using the compiled expression cache.
+
+    Parameters:
+    expression (str): The JMESPath expression, e.g. provided by the user as a module option.
+    data: The data returned from an api request.
+
+    Returns:
+    The result of the expression.
+    """
+    return compile_jmespath(expression).search(data)
 
 def jmespath_name_validator(name: str, data: list):
     """
     Filters lists of objects and returns a list of objects where []data.name == name
+
+    Names are compared directly instead of through a generated JMESPath expression, so names
+    containing quotes are matched correctly. Callers doing several lookups against the same
+    list should build one IndexedResponse instead.
+
     Parameters:
     name (str): Name to filter json list 
     data (list): The list of objects returned from api request
 
     Returns:
-    dict: A new dictionary with only the valid keys.
+    list: The objects with a matching name.
     """
-    # JMESPath expression to filter objects by name
-    expression = f"[?name=='{name}']"
-    # Search the API response using the JMESPath expression
-    return jmespath.search(expression, data)
+    return IndexedResponse(data).get_by_name(name)
 
 def jmespath_id_validator(id: str, data: list):
     """
     Filters lists of objects and returns a list of objects where []data.id == id
 
     Parameters:
-    id (str): The dictionary to filter.
+    id (str): The id to filter json list
     data (list): The list of objects returned from api request
 
     Returns:
-    dict: A new dictionary with only the valid keys.
+    list: The objects with a matching id.
     """
-    # JMESPath expression to filter objects by id
-    expression = f"[?id=='{id}']"
-    # Search the API response using the JMESPath expression
-    return jmespath.search(expression, data)
+    return IndexedResponse(data).get_by_id(id)
 
 
 def is_valid_http_proxy(proxy: str) -> bool:
@@ -116,9 +211,8 @@ def is_valid_http_proxy(proxy: str) -> bool:
     Returns:
         bool: True if the string matches the HTTP proxy pattern, False otherwise.
     """
-    pattern = r'^http:\/\/(?:[a-zA-Z0-9\-_]+(?:\:[a-zA-Z0-9\-_]+)?@)?[a-zA-Z0-9\.\-]+(?:\:[0-9]{1,5})?$'
-    
-    return bool(re.match(pattern, proxy))
+    from .validation import named_pattern
+    return bool(named_pattern('http_proxy').match(proxy))
 
 
 def is_valid_cidr(ip_address: str) -> bool:
@@ -131,15 +225,17 @@ def is_valid_cidr(ip_address: str) -> bool:
     Returns:
         bool: True if the string matches the IPv4 or IPv6 pattern with subnet mask, False otherwise.
     """
-    # Regular expression pattern to match either an IPv4 or IPv6 address with subnet mask
-    pattern = r'^(?:(?:(?:[0-9]{1,3}\.){3}[0-9]{1,3}\/(?:(?:[0-9])|(?:[1-2][0-9])|(?:3[0-2])))|(?:(?:[0-9a-fA-F]*:[0-9a-fA-F]*){2,})/(?:(?:[0-9])|(?:[1-9][0-9])|(?:1[0-1][0-9])|(?:12[0-8])))$'
-    
-    # Return the result of the match as a boolean
-    return bool(re.match(pattern, ip_address))
+    from .validation import schema_pattern
+
+    # the pattern the api schema sets on the cidr of networks, compiled once
+    return bool(schema_pattern('cluster', 'cluster_networks.cidr').match(ip_address))
 
 def is_valid_kernel_value(kernel_value) -> bool:
-    pattern = r'^(?:(?:[^\s\t\n\r"]+)|(?:"[^"]*"))+$'
-    return bool(re.match(pattern, kernel_value))
+    """
+    Validates a kernel argument against the pattern of the api schema, e.g. rd.net.timeout.carrier=60 or quiet.
+    """
+    from .validation import schema_pattern
+    return bool(schema_pattern('infra_env', 'kernel_arguments.value').match(kernel_value))
 
     
 def is_valid_openshift_version(version) -> bool:
@@ -152,8 +248,8 @@ def is_valid_openshift_version(version) -> bool:
     Returns:
     bool: True if valid, False otherwise.
     """
-    pattern = re.compile(r'^\d+\.\d+$')
-    return bool(pattern.match(version))
+    from .validation import named_pattern
+    return bool(named_pattern('openshift_version').match(version))
 
     
 def is_valid_ip(ip_address: str) -> bool:
@@ -166,11 +262,10 @@ def is_valid_ip(ip_address: str) -> bool:
     Returns:
         bool: True if the string matches the IPv4 or IPv6 pattern, False otherwise.
     """
-    # Regular expression pattern to match either an IPv4 or IPv6 address
-    pattern = r'^(?:(?:(?:[0-9]{1,3}\.){3}[0-9]{1,3})|(?:(?:[0-9a-fA-F]*:[0-9a-fA-F]*){2,}))?$'
-    
-    # Return the result of the match as a boolean
-    return bool(re.match(pattern, ip_address))
+    from .validation import schema_pattern
+
+    # the pattern the api schema sets on the ip of virtual ips, compiled once, allows an empty value the helper rejects
+    return bool(ip_address) and bool(schema_pattern('cluster', 'api_vips.ip').match(ip_address))
 
 
 def is_valid_base_domain(domain) -> bool:
@@ -183,175 +278,5 @@ def is_valid_base_domain(domain) -> bool:
     Returns:
     bool: True if valid, False otherwise.
     """
-    pattern = re.compile(
-        r'^(?!-)[A-Za-z0-9-]{1,63}(?<!-)\.'          # Domain
-        r'[A-Za-z]{2,63}$'                           # Top-level domain (TLD)
-    )
-    return bool(pattern.match(domain))
-
-def create_additional_ntp_sources_from_params(module_params: list) -> str:
-    if module_params is None:
-        return None
-    additional_ntp_sources = ""
-    for source in module_params:
-        additional_ntp_sources += (source + ',')
-    return additional_ntp_sources[:-1]
-
-def create_api_vips_from_module_params(module_params: list[dict]) -> list[APIVIP]:
-    if module_params is None:
-        return None
-    api_vips = []
-    for api_vip in module_params:
-        api_vips.append(APIVIP(
-            cluster_id=api_vip.get('cluster_id', None),
-            ip=api_vip.get('ip', None),
-            verification=api_vip.get('verification', None),
-        ))
-    return api_vips
-
-def create_cluster_networks_from_module_params(module_params: list[dict]) -> list[ClusterNetwork]:
-    if module_params is None:
-        return None
-    cluster_networks = []
-    for cluster_network in module_params:
-        cluster_networks.append(ClusterNetwork(
-            cidr=cluster_network.get('cidr', None),
-            cluster_id=cluster_network.get('cluster_id', None),
-            host_prefix=cluster_network.get('host_prefix', None),
-        ))
-    return cluster_networks
-        
-def create_disk_encryption_from_module_params(module_params: dict) -> DiskEncryption:
-    if module_params is None:
-        return None
-    return DiskEncryption(
-        enable_on=module_params.get('enable_on', None),
-        mode=module_params.get('mode', None),
-        tang_server=module_params.get('tang_server', None),
-    )
-
-def create_disk_encryption_from_module_params(module_params: dict) -> DiskEncryption:
-    if module_params is None:
-        return None
-    return DiskEncryption(
-        enable_on=module_params.get('enable_on', None),
-        mode=module_params.get('mode', None),
-        tang_server=module_params.get('tang_server', None),
-    )
-
-def create_ignition_endpoint_from_module_params(module_params: dict) -> IgnitionEndpoint:
-    if module_params is None:
-        return None
-    return IgnitionEndpoint(
-        ca_certificate=module_params.get('ca_certificate', None),
-        url=module_params.get('url', None),
-    )
-
-def create_ingress_vips_from_module_params(module_params: list[dict]) -> list[IngressVIP]:
-    if module_params is None:
-        return None
-    ingress_vips = []
-    for ingress_vip in module_params:
-        ingress_vips.append(IngressVIP(
-            ip=ingress_vip.get('ip', None),
-            cluster_id=ingress_vip.get('cluster_id', None),
-            verification=ingress_vip.get('verification', None),
-        ))
-    return ingress_vips
-
-
-def create_machine_networks_from_module_params(module_params: list[dict]) -> list[MachineNetwork]:
-    if module_params is None:
-        return None
-    machine_networks = []
-    for machine_network in module_params:
-        machine_networks.append(MachineNetwork(
-            cidr=machine_network.get('cidr', None),
-            cluster_id=machine_network.get('cluster_id', None),
-        ))
-    return machine_networks
-
-def create_olm_operators_from_module_params(module_params: list[dict]) -> list[OLMOperator]:
-    if module_params is None:
-        return None
-    olm_operators = []
-    for olm_operator in module_params:
-        olm_operators.append(OLMOperator(
-            name=olm_operator.get('name', None),
-            properties=olm_operator.get("properties", None),
-        ))
-    return olm_operators
-
-def create_platform_external_from_module_params(module_params: dict) -> PlatformExternal:
-    if module_params is None:
-        return None
-
-    return PlatformExternal(
-        cloud_controller_manager=module_params.get('cloud_controller_manager', None),
-        platform_name=module_params.get("platform_name", None),
-        )
-
-def create_platform_from_module_params(module_params: dict) -> Platform:
-    if module_params is None:
-        return None
-    
-    return Platform(
-        external=create_platform_external_from_module_params(module_params.get("external", None)),
-        type=module_params.get("type", None),
-    )
-
-def create_service_networks_from_module_params(module_params: list[dict]) -> list[ServiceNetwork]:
-    if module_params is None:
-        return None
-    service_networks = []
-    for service_network in module_params:
-        service_networks.append(ServiceNetwork(
-            cidr=service_network.get('cidr', None),
-            cluster_id=service_network.get('cluster_id', None),
-        ))
-    return service_networks
-
-
-def create_proxy_from_module_params(module_params: dict) -> Proxy:
-    if module_params is None or (module_params.get("http_proxy", None) is None and module_params.get("https_proxy") is None and module_params.get("no_proxy") is None):
-        return None
-    return Proxy(
-        http_proxy=module_params.get('http_proxy', None),
-        https_proxy=module_params.get('https_proxy', None),
-        no_proxy=module_params.get('no_proxy', None),
-    )
-
-def create_kernel_arguments_from_module_params(module_params: list[dict]) -> list[KernelArgument]:
-    if module_params is None:
-        return None
-    kernel_arguments = []
-    for kernel_argument in module_params:
-        kernel_arguments.append(KernelArgument(
-            operation=kernel_argument.get('operation', None),
-            value=kernel_argument.get('value', None),
-        ))
-    return kernel_arguments
-
-
-def create_static_network_config_from_module_params(module_params: list[dict]) -> list[StaticNetworkConfig]:
-    if module_params is None:
-        return None
-    network_configs = []
-    # for each static network config
-    for network_config in module_params:
-        # create an array of mac_interfaces
-        mac_interfaces = []
-        for mac_interface in network_config.get('mac_interface_map', None):
-            mac_interfaces.append(MacInterfaceMap(
-                logical_nic_name=mac_interface.get('logical_nic_name', None),
-                mac_address=mac_interface.get('mac_address', None),
-            ))
-
-        network_configs.append(StaticNetworkConfig(
-            mac_interface_map=mac_interfaces,
-            network_yaml=network_config.get('network_yaml', None),
-        ))
-    return network_configs
-    
-
-
+    from .validation import named_pattern
+    return bool(named_pattern('base_domain').match(domain))
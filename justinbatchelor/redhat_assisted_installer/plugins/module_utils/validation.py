@@ -0,0 +1,205 @@
+import functools
+import json
+import re
+
+
+# patterns of the embedded schema that backtrack exponentially on a value that almost matches, e.g. a kernel
+# argument with a trailing space, rewritten to match exactly the same strings in linear time
+LINEAR_REWRITES = (
+    # a run of hex digits and colons holding at least two colons
+    (r'(?:(?:[0-9a-fA-F]*:[0-9a-fA-F]*){2,})', r'(?:[0-9a-fA-F]*(?::[0-9a-fA-F]*){2,})'),
+    # a sequence of unquoted characters and quoted strings, without whitespace outside the quotes
+    (r'(?:(?:[^ \t\n\r"]+)|(?:"[^"]*"))+?', r'(?:[^ \t\n\r"]|"[^"]*")+'),
+)
+
+# patterns the api schema does not carry, used by the is_valid_* helpers of tools.py
+PATTERNS = dict(
+    base64=r'^[A-Za-z0-9+/=\n]+$',
+    base_domain=r'^(?!-)[A-Za-z0-9-]{1,63}(?<!-)\.[A-Za-z]{2,63}$',
+    http_proxy=r'^http:\/\/(?:[a-zA-Z0-9\-_]+(?:\:[a-zA-Z0-9\-_]+)?@)?[a-zA-Z0-9\.\-]+(?:\:[0-9]{1,5})?$',
+    openshift_version=r'^\d+\.\d+$',
+    uuid=r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$',
+)
+
+# json types of the schema and the python types of the params holding them
+JSON_TYPES = dict(
+    string=(str,),
+    integer=(int,),
+    number=(int, float),
+    boolean=(bool,),
+    array=(list, tuple),
+    object=(dict,),
+)
+
+
+@functools.lru_cache(maxsize=256)
+def compiled_pattern(pattern: str):
+    """
+    Compiles a pattern once, after rewriting the parts known to backtrack exponentially.
+    """
+    for slow, linear in LINEAR_REWRITES:
+        pattern = pattern.replace(slow, linear)
+    return re.compile(pattern)
+
+def named_pattern(name: str):
+    """
+    Returns the compiled pattern registered in PATTERNS under name.
+    """
+    return compiled_pattern(PATTERNS[name])
+
+
+def element_fields(spec: list) -> dict:
+    """
+    Returns the fields of the elements of a list of objects, as written in the embedded schema.
+
+    Lists are written as a one element list holding either the fields themselves, e.g. olm_operators,
+    or a description of the list and the fields under the singular name of an element, e.g. api_vip.
+    """
+    wrapper = spec[0] if spec else {}
+    fields = {key: value for key, value in wrapper.items() if isinstance(value, dict)}
+    if len(fields) == 1:
+        element = next(iter(fields.values()))
+        if 'type' not in element:
+            return {key: value for key, value in element.items() if isinstance(value, dict)}
+    return fields
+
+
+class SchemaValidator:
+    """
+    Validates params against the schema of an API object in one pass.
+
+    The schema is compiled once into one check per field, with its patterns compiled once, so validating a fleet
+    of specs costs a dictionary lookup and the checks of the fields present per key. Every problem found is
+    reported, not only the first one, and keys the schema does not describe are left to the API.
+
+    Args:
+        schema (dict): The fields of the object, as embedded in the schema modules.
+    """
+    def __init__(self, schema: dict) -> None:
+        # patterns by dotted field path, e.g. api_vips.ip, for the helpers validating a single value
+        self.patterns = {}
+        self.fields = {key: self.compile(spec, key) for key, spec in schema.items()}
+
+    def compile(self, spec, path: str):
+        """
+        Returns the check of one field, a callable taking the value, its path in the params and the list of errors.
+        """
+        if isinstance(spec, list):
+            return self.compile_list(element_fields(spec), path)
+        if spec.get('type') == 'array':
+            return self.compile_list(spec.get('items', {}).get('properties', {}), path)
+        if spec.get('type') == 'object':
+            return self.compile_object(spec.get('properties', {}), path)
+        return self.compile_value(spec, path)
+
+    def compile_object(self, properties: dict, path: str):
+        fields = {key: self.compile(spec, f"{path}.{key}") for key, spec in properties.items()}
+
+        def check(value, label, errors):
+            if not isinstance(value, dict):
+                errors.append(f"{label}: must be an object, got {type(value).__name__}")
+                return
+            for key, item in value.items():
+                field = fields.get(key)
+                if field is not None and item is not None:
+                    field(item, f"{label}.{key}", errors)
+        return check
+
+    def compile_list(self, fields: dict, path: str):
+        element = self.compile_object(fields, path) if fields else None
+
+        def check(value, label, errors):
+            if not isinstance(value, JSON_TYPES['array']):
+                errors.append(f"{label}: must be a list, got {type(value).__name__}")
+                return
+            if element is None:
+                return
+            for index, item in enumerate(value):
+                element(item, f"{label}[{index}]", errors)
+        return check
+
+    def compile_value(self, spec: dict, path: str):
+        # only the constraints present on the field are checked, in the order their errors are reported
+        checks = []
+        if 'enum' in spec:
+            choices = frozenset(spec['enum'])
+            listed = ', '.join(repr(choice) for choice in spec['enum'])
+            checks.append(lambda value: None if value in choices else f"{value!r} must be one of {listed}")
+        if spec.get('format') == 'uuid':
+            uuid = named_pattern('uuid')
+            checks.append(lambda value: None if uuid.match(str(value)) else f"{value!r} is not a UUID")
+        if 'pattern' in spec:
+            pattern = self.patterns[path] = compiled_pattern(spec['pattern'])
+            checks.append(lambda value: None if pattern.match(str(value)) else f"{value!r} does not match the pattern of the API")
+        if 'minimum' in spec:
+            minimum = spec['minimum']
+            checks.append(lambda value: None if value >= minimum else f"{value!r} is less than {minimum}")
+        if 'maximum' in spec:
+            maximum = spec['maximum']
+            checks.append(lambda value: None if value <= maximum else f"{value!r} is more than {maximum}")
+        if 'minLength' in spec:
+            shortest = spec['minLength']
+            checks.append(lambda value: None if len(value) >= shortest else f"must be at least {shortest} characters long")
+        if 'maxLength' in spec:
+            longest = spec['maxLength']
+            checks.append(lambda value: None if len(value) <= longest else f"must be at most {longest} characters long")
+
+        name = spec.get('type')
+        types = JSON_TYPES.get(name)
+        # booleans are ints in python, but not integers in the schema
+        strict = types is not None and bool not in types
+
+        def check(value, label, errors):
+            if types is not None and (not isinstance(value, types) or (strict and isinstance(value, bool))):
+                # the constraints assume a value of the right type
+                errors.append(f"{label}: must be of type {name}, got {type(value).__name__}")
+                return
+            for constraint in checks:
+                error = constraint(value)
+                if error is not None:
+                    errors.append(f"{label}: {error}")
+        return check
+
+    def validate(self, params: dict) -> list:
+        """
+        Returns every problem found in params, as "path: message", e.g. "cluster_networks[0].cidr: ...".
+        """
+        errors = []
+        for key, value in params.items():
+            field = self.fields.get(key)
+            if field is not None and value is not None:
+                field(value, key, errors)
+        return errors
+
+
+@functools.lru_cache(maxsize=None)
+def schema_validator(kind: str) -> SchemaValidator:
+    """
+    Returns the validator of an API object, compiled from its embedded schema on first use.
+
+    Parameters:
+    kind (str): The object to validate, "cluster" or "infra_env".
+    """
+    # the schema modules are only loaded by the tasks validating params
+    from .schema import cluster, infra_env
+    schemas = dict(cluster=cluster.SCHEMA, infra_env=infra_env.SCHEMA)
+    return SchemaValidator(json.loads(schemas[kind]))
+
+def validate_params(kind: str, params: dict) -> list:
+    """
+    Validates the params of a cluster or an infrastructure environment against the API schema before anything is sent.
+
+    Parameters:
+    kind (str): The object the params describe, "cluster" or "infra_env".
+    params (dict): The params, e.g. Cluster.create_params().
+
+    Returns:
+        list: One message per problem found, empty when the params are valid.
+    """
+    return schema_validator(kind).validate(params)
+
+def schema_pattern(kind: str, path: str):
+    """
+    Returns the compiled pattern the API schema of an object sets on a field, e.g. schema_pattern("cluster", "api_vips.ip").
+    """
+    return schema_validator(kind).patterns[path]
@@ -5,11 +5,17 @@ from __future__ import (absolute_import, division, print_function)
 
 from ansible.module_utils.basic import AnsibleModule
 
-from ..module_utils.api import *
-from ..module_utils.tools import *
-from ..module_utils.schema.cluster import *
-
-import jmespath, os
+from ..module_utils.api import CLUSTER_PATCH_PARAMS, delete_cluster, patch_cluster, post_cluster
+from ..module_utils.params import cluster_argument_spec, create_cluster_from_module_params
+from ..module_utils.network import validate_cluster_networks
+from ..module_utils.validation import validate_params
+from ..module_utils.diff import ObjectDiff
+from ..module_utils.state import cluster_state_store, params_fingerprint
+from ..module_utils.client import client_argument_spec, set_module_client
+from ..module_utils.resolver import cluster_resolver
+from ..module_utils.schema.cluster import Cluster
+
+import os
 
 __metaclass__ = type
 
@@ -20,6 +26,9 @@ short_description: Manage OpenShift clusters
 version_added: "0.0.1"
 description: >
   This module allows managing OpenShift clusters using the Red Hat Assisted Installer API.
+  With I(state=present) the networks and virtual IPs are checked before any request is sent: overlapping networks,
+  a host_prefix not fitting its cluster network, virtual IPs outside of the machine networks and misordered
+  dual-stack networks fail the task without creating or updating anything.
 options:
   additional_ntp_source:
     description: A list of NTP sources (name or IP) to be added to all the hosts.
@@ -266,6 +275,8 @@ requirements:
   - jmespath==1.0.1
 
   
+extends_documentation_fragment:
+  - justinbatchelor.redhat_assisted_installer.client
 author:
   - Justin Batchelor (@justinbatchelor)
 '''
@@ -296,6 +307,53 @@ EXAMPLES = r'''
 '''
 
 RETURN = r'''
+api_stats:
+  description: >
+    Number of requests sent to the API and how many of them were retries.
+  returned: always
+  type: dict
+  sample:
+    requests: 2
+    retries: 0
+timings:
+  description: >
+    Number of requests, seconds and bytes per endpoint, including the SSO token exchange.
+    Ids in endpoints are replaced by placeholders so calls to one endpoint are aggregated.
+  returned: when I(debug_timings=true)
+  type: dict
+  sample:
+    requests: 3
+    seconds: 0.753
+    bytes_sent: 311
+    bytes_received: 14145
+    endpoints:
+      POST sso/token:
+        count: 1
+        errors: 0
+        seconds: 0.187
+        min: 0.187
+        max: 0.187
+        bytes_received: 3841
+        statuses:
+          "200": 1
+      GET clusters/{cluster_id}:
+        count: 1
+        errors: 0
+        seconds: 0.214
+        min: 0.214
+        max: 0.214
+        bytes_received: 5120
+        statuses:
+          "200": 1
+      PATCH clusters/{cluster_id}:
+        count: 1
+        errors: 0
+        seconds: 0.352
+        min: 0.352
+        max: 0.352
+        bytes_received: 5184
+        statuses:
+          "201": 1
 cluster:
   description: >
     Details of the created, updated, or deleted cluster.
@@ -306,6 +364,34 @@ cluster:
     - id: "123"
       name: "my-cluster"
       status: "active"
+desired_state:
+  description: >
+    Fingerprint of the desired parameters, whether the cluster was already known to be in that state because
+    an earlier run applied the same parameters and the API reports no update since, in which case it was neither
+    diffed nor patched. Fingerprints are kept next to the name index when REDHAT_CACHE_DIR is set.
+  returned: when the cluster already exists and state is present
+  type: dict
+  sample:
+    fingerprint: "5f2b7c1e9a0d4b3c8e6f1a2d7c9b0e4f3a6d8c1b2e5f7a9d0c3b6e8f1a4d7c2b"
+    current: true
+validation_errors:
+  description: >
+    The values that do not match the API schema, e.g. a name too long or an invalid CIDR, which were not sent to the API.
+  returned: when a value does not match the API schema
+  type: list
+  elements: str
+  sample:
+    - "name: must be at most 54 characters long"
+    - "cluster_networks[0].cidr: '10.128.0.0/33' does not match the pattern of the API"
+network_errors:
+  description: >
+    The problems found in the networks and virtual IPs, which were not sent to the API.
+  returned: when the network configuration is invalid
+  type: list
+  elements: str
+  sample:
+    - "service_networks[0] 10.128.0.0/16 overlaps cluster_networks[0] 10.128.0.0/14"
+    - "api_vips[0] 192.168.2.5 is not in any machine network"
 msg:
   description: >
     Message indicating the status of the operation.
@@ -330,70 +416,12 @@ def format_module_results(results: dict, msg: str = None, cluster: list = None,
         results['changed'] = changed
 
 def run_module():
-    module_args = dict(
-        additional_ntp_sources=dict(type='list', required=False),
-        api_vips=dict(type='list', elements='dict', required=False, options=dict(
-            cluster_id=dict(type='str', required=False),
-            ip=dict(type='str', required=True),
-            verification=dict(type='str', required=False, choices=["unverified", "failed", "succeeded"])
-        )),
-        base_dns_domain=dict(type='str', required=False),
-        cluster_networks=dict(type='list',elements='dict', required=False, options=dict(
-            cidr=dict(type='str', required=True),
-            cluster_id=dict(type='str', required=False),
-            host_prefix=dict(type='int', required=False),
-        )),
-        cluster_id=dict(type='str', required=False),
-        cpu_architecture=dict(type='str', required=False, choices=['x86_64', 'aarch64', 'arm64', 'ppc64le', 's390x']),
-        disk_encryption=dict(type='dict',required=False,options=dict(
-            enable_on=dict(type='str', required=True, choices=["none", "all", "masters", "workers"]),
-            mode=dict(type='str', required=True, choices=["tang", "tpmv2"]),
-            tang_server=dict(type='str', required=False),
-        )),
-        high_availability_mode=dict(type='str', required=False, choices=["None", "Full"]),
-        http_proxy=dict(type='str', required=False),
-        https_proxy=dict(type='str', required=False),
-        hyperthreading=dict(type='str', required=False, choices=['all', 'none', "masters", "workers"]),
-        ignition_endpoint=dict(type='dict',elements='dict', required=False, options=dict(
-            ca_certificate=dict(type='str', required=True),
-            url=dict(type='str', required=True)
-        )),
-        ingress_vips=dict(type='list',elements='dict',required=False,options=dict(
-            cluster_id=dict(type='str', required=False),
-            ip=dict(type='str', required=True),
-            verification=dict(type='str', required=False, choices=["unverified", "failed", "succeeded"]),
-        )),
-        machine_networks=dict(type='list', elements='dict', required=False, options=dict(
-            cidr=dict(type='str', required=True),
-            cluster_id=dict(type='str', required=False),
-        )),
-        name=dict(type='str', required=False),
-        network_type=dict(type='str', required=False, choices=['OpenShiftSDN', 'OVNKubernetes']),
+    module_args = cluster_argument_spec()
+    module_args.update(
         offline_token=dict(type='str', required=False, no_log=True),
-        olm_operators=dict(type='list', elements='dict', required=False, options=dict(
-            name=dict(type='str', required=True),
-            properties=dict(type='str', required=False),
-        )),
-        openshift_version=dict(type='str', required=False),
-        platform=dict(type='dict', required=False, options=dict(
-            external=dict(type='dict', required=False, options=dict(
-                cloud_controller_manager=dict(type='str', required=True, choices=["", "External"]),
-                platform_name=dict(type='str', required=True),
-            )),
-            type=dict(type='str', required=True, choices=["baremetal", "nutanix", "vsphere", "none", "external"]),
-        )),
         pull_secret=dict(type='str', required=False, no_log=True),
-        schedulable_masters=dict(type='bool', required=False),
-        service_networks=dict(type='list', elements='dict', required=False, options=dict(
-            cidr=dict(type='str', required=True),
-            cluster_id=dict(type='str', required=False),
-        )),
-        state=dict(type='str', required=True, choices=['present', 'absent']),
-        tags=dict(type='str', required=False),
-        user_managed_networking=dict(type='bool', required=False),
-        ssh_public_key=dict(type='str', required=False),
-        vip_dhcp_allocation=dict(type='bool', required=False),
     )
+    module_args.update(client_argument_spec())
 
     # seed the result dict in the object
     # we primarily care about changed and state
@@ -415,6 +443,8 @@ def run_module():
         supports_check_mode=True
     )
 
+    set_module_client(module.params, result)
+
     ## First we need to check if the user provided an offline token 
     if module.params['offline_token'] is not None:
         os.environ["REDHAT_OFFLINE_TOKEN"] = module.params["offline_token"]
@@ -423,18 +453,6 @@ def run_module():
     if module.params['pull_secret'] is not None:
         os.environ["REDHAT_PULL_SECRET"] = module.params["pull_secret"]
 
-    # get all clusters
-    get_cluster_response = get_clusters()
-
-    if get_cluster_response.status_code != SUCCESS_GET_CODE:
-        format_module_results(results=result,
-                              msg=f"Failed to get clusters {get_cluster_response.json()}",
-                              changed=True,
-                              cluster=[],
-                              )
-        # fail module
-        module.fail_json(**result)
-    
     # check that a name or id was provided, fail if not
     if module.params['cluster_id'] is None and module.params['name'] is None:
         format_module_results(results=result,
@@ -444,38 +462,50 @@ def run_module():
                               )
         module.fail_json(**result)
 
-    filtered_response = jmespath_id_validator(module.params['cluster_id'], get_cluster_response.json()) if module.params['cluster_id'] is not None else jmespath_name_validator(module.params['name'], get_cluster_response.json())
+    # params the api would reject are reported before any request is sent
+    if module.params['state'] == "present":
+        params = create_cluster_from_module_params(module.params).create_params()
+        validation_errors = validate_params("cluster", params)
+        if validation_errors:
+            result['validation_errors'] = validation_errors
+            format_module_results(results=result,
+                                  msg=f"Invalid cluster configuration: {'; '.join(validation_errors)}",
+                                  changed=False,
+                                  cluster=[],
+                                  )
+            module.fail_json(**result)
+
+        # the networks are checked against each other once every value matches the schema
+        network_errors = validate_cluster_networks(params)
+        if network_errors:
+            result['network_errors'] = network_errors
+            format_module_results(results=result,
+                                  msg=f"Invalid network configuration: {'; '.join(network_errors)}",
+                                  changed=False,
+                                  cluster=[],
+                                  )
+            module.fail_json(**result)
+
+    # find the cluster by id, or by name through the name index, without listing every cluster when possible
+    resolver = cluster_resolver()
+    # fingerprints of the params applied by earlier runs, to skip objects nobody changed since
+    state = cluster_state_store()
+    try:
+        filtered_response = resolver.resolve(obj_id=module.params['cluster_id'], name=module.params['name'])
+    except Exception as e:
+        format_module_results(results=result,
+                              msg=f"Failed to get clusters {e}",
+                              changed=False,
+                              cluster=[],
+                              )
+        # fail module
+        module.fail_json(**result)
 
     # user defined a state of present
     if module.params['state'] == "present":
         ## First we want to create the cluster object provided the arguments from the user
-        cluster = Cluster(
-            additional_ntp_sources=create_additional_ntp_sources_from_params(module.params['additional_ntp_sources']),
-            api_vips=create_api_vips_from_module_params(module.params['api_vips']),
-            base_dns_domain=module.params['base_dns_domain'],
-            cluster_networks=create_cluster_networks_from_module_params(module.params['cluster_networks']),
-            cluster_id=module.params['cluster_id'],
-            cpu_architecture=module.params['cpu_architecture'],
-            disk_encryption=create_disk_encryption_from_module_params(module.params['disk_encryption']),
-            high_availability_mode=module.params['high_availability_mode'],
-            http_proxy=module.params['http_proxy'],
-            https_proxy=module.params['https_proxy'],
-            hyperthreading=module.params['hyperthreading'],
-            ignition_endpoint=create_ignition_endpoint_from_module_params(module.params['ignition_endpoint']),
-            ingress_vips=create_ingress_vips_from_module_params(module.params['ingress_vips']),
-            machine_networks=create_machine_networks_from_module_params(module.params['machine_networks']),
-            name=module.params['name'],
-            network_type=module.params['network_type'],
-            olm_operator=create_olm_operators_from_module_params(module.params['olm_operators']),
-            openshift_version=module.params["openshift_version"],
-            platform=create_platform_from_module_params(module.params['platform']),
-            schedulable_masters=module.params['schedulable_masters'],
-            service_networks=create_service_networks_from_module_params(module.params['service_networks']),
-            tags=module.params['tags'],
-            user_managed_networking=module.params['user_managed_networking'],
-            ssh_public_key=module.params['ssh_public_key'],
-            vip_dhcp_allocation=module.params['vip_dhcp_allocation'],
-        )
+        cluster = create_cluster_from_module_params(module.params)
+        fingerprint = params_fingerprint(cluster.create_params(), Cluster.fields)
         
         if len(filtered_response) == 0:
             create_cluster_response = post_cluster(cluster=cluster)
@@ -487,6 +517,8 @@ def run_module():
                                       )
                 module.fail_json(**result)
               
+            resolver.remember(create_cluster_response.json())
+            state.record(create_cluster_response.json(), fingerprint)
             format_module_results(results=result,
                                   msg=f"Successfully created the cluster: {create_cluster_response.json()['id']}",
                                   changed=True,
@@ -495,9 +527,32 @@ def run_module():
             module.exit_json(**result)
 
         elif len(filtered_response) == 1:
-            modified_params = remove_matching_pairs(cluster.create_params(), filtered_response[0])
-            result['msg'] = modified_params
-            patch_cluster_response = patch_cluster(filtered_response[0]['id'], modified_params)
+            # params applied by an earlier run are still in place when the api reports no update since,
+            # so neither the diff nor the PATCH is needed
+            current = state.is_current(filtered_response[0], fingerprint)
+            result['desired_state'] = dict(fingerprint=fingerprint, current=current)
+            # compare only what the PATCH endpoint accepts, normalized as described by the schema
+            cluster_diff = None if current else ObjectDiff(cluster.create_params(), filtered_response[0], Cluster.fields, CLUSTER_PATCH_PARAMS)
+            if module._diff:
+                result['diff'] = cluster_diff.ansible_diff() if not current else dict(before={}, after={})
+            if current or not cluster_diff:
+                if not current:
+                    state.record(filtered_response[0], fingerprint)
+                format_module_results(results=result,
+                                      msg=f"The cluster is up to date: {filtered_response[0]['id']}",
+                                      changed=False,
+                                      cluster=[filtered_response[0]],
+                                      )
+                module.exit_json(**result)
+            if module.check_mode:
+                format_module_results(results=result,
+                                      msg=f"The cluster would be patched: {filtered_response[0]['id']}",
+                                      changed=True,
+                                      cluster=[filtered_response[0]],
+                                      )
+                module.exit_json(**result)
+
+            patch_cluster_response = patch_cluster(filtered_response[0]['id'], cluster_diff.params)
             if patch_cluster_response.status_code != SUCCESS_PATCH_CODE:
                 format_module_results(results=result,
                                       msg=f'Failed to patch the cluster: {patch_cluster_response.json()}',
@@ -505,6 +560,7 @@ def run_module():
                                       changed=False,
                                       )
                 module.fail_json(**result)
+            state.record(patch_cluster_response.json(), fingerprint)
             format_module_results(results=result,
                                   msg=f"Successfully patched the cluster: {patch_cluster_response.json()['id']}",
                                   changed=True,
@@ -529,6 +585,8 @@ def run_module():
 
         elif len(filtered_response) == 1:
             if delete_cluster(cluster_id=filtered_response[0]['id']):
+                resolver.forget(filtered_response[0]['id'])
+                state.discard(filtered_response[0]['id'])
                 format_module_results(results=result, 
                                       msg=result['msg'] + f"Successfully deleted cluster: {filtered_response[0]['id']}\n",
                                       changed=True,
@@ -5,20 +5,169 @@ from __future__ import (absolute_import, division, print_function)
 
 from ansible.module_utils.basic import AnsibleModule
 
-from ..module_utils.api import *
-from ..module_utils.tools import *
+from ..module_utils.api import cluster_action_cancel, cluster_action_install, cluster_action_reset, get_cluster
+from ..module_utils.client import client_argument_spec, set_module_client
+from ..module_utils.resolver import cluster_resolver
+from ..module_utils.polling import AdaptivePoller
+
+import os
 
 __metaclass__ = type
 
 DOCUMENTATION = r'''
-
+---
+module: cluster_actions
+short_description: Install, cancel or reset OpenShift clusters
+version_added: "0.0.1"
+description: >
+  This module triggers installation actions on OpenShift clusters using the Red Hat Assisted Installer API,
+  and can optionally wait for the cluster to reach a target status.
+options:
+  cluster_id:
+    description: ID of the cluster.
+    type: str
+    required: false
+  cluster_name:
+    description: Name of the cluster, used when I(cluster_id) is not provided.
+    type: str
+    required: false
+  offline_token:
+    description: Offline token for authentication.
+    type: str
+    required: false
+    no_log: true
+  pull_secret:
+    description: The pull secret obtained from Red Hat OpenShift Cluster Manager.
+    type: str
+    required: false
+    no_log: true
+  state:
+    description: The action to perform on the cluster.
+    type: str
+    required: true
+    choices: ["install", "cancel", "reset"]
+  target_status:
+    description:
+      - Cluster statuses that end the wait successfully.
+      - Defaults to C(installed) for I(state=install), C(cancelled) for I(state=cancel) and
+        C(insufficient), C(ready) or C(pending-for-input) for I(state=reset).
+    type: list
+    elements: str
+    required: false
+  wait:
+    description:
+      - Wait in the module until the cluster reaches one of I(target_status).
+      - The cluster is polled every few seconds while its status changes, and less often during long phases.
+      - The module fails early when the cluster reaches C(error), C(cancelled) or C(installing-pending-user-action),
+        unless that status is one of I(target_status).
+    type: bool
+    required: false
+    default: false
+  wait_timeout:
+    description: Maximum number of seconds to wait when I(wait=true).
+    type: int
+    required: false
+    default: 7200
+extends_documentation_fragment:
+  - justinbatchelor.redhat_assisted_installer.client
+author:
+  - Justin Batchelor (@justinbatchelor)
 '''
 
 EXAMPLES = r'''
+# Start the installation of a cluster
+- name: Install a cluster
+  justinbatchelor.redhat_assisted_installer.cluster_actions:
+    cluster_name: "my-cluster"
+    state: install
+
+# Start the installation and wait until the cluster is installed
+- name: Install a cluster and wait for it
+  justinbatchelor.redhat_assisted_installer.cluster_actions:
+    cluster_id: "your-cluster-id"
+    state: install
+    wait: true
+    wait_timeout: 5400
+  register: install
 
+- debug:
+    msg: "{{ install.status_timeline }}"
 '''
 
 RETURN = r'''
+cluster:
+  description: >
+    The cluster returned by the action, or the last polled cluster when I(wait=true).
+  returned: always
+  type: list
+  elements: dict
+msg:
+  description: >
+    Message indicating the status of the operation.
+  returned: always
+  type: str
+status_timeline:
+  description: >
+    Every status observed while waiting, with the time it was first seen and the seconds elapsed since the wait started.
+  returned: when wait is true
+  type: list
+  elements: dict
+  sample:
+    - status: "preparing-for-installation"
+      status_info: "Preparing cluster for installation"
+      at: "2024-06-01T12:00:00+00:00"
+      elapsed: 0.41
+    - status: "installing"
+      status_info: "Installation in progress"
+      at: "2024-06-01T12:03:10+00:00"
+      elapsed: 190.2
+api_stats:
+  description: >
+    Number of requests sent to the API and how many of them were retries.
+  returned: always
+  type: dict
+  sample:
+    requests: 8
+    retries: 0
+timings:
+  description: >
+    Number of requests, seconds and bytes per endpoint, including the SSO token exchange.
+    Ids in endpoints are replaced by placeholders so calls to one endpoint are aggregated.
+  returned: when I(debug_timings=true)
+  type: dict
+  sample:
+    requests: 9
+    seconds: 2.12
+    bytes_sent: 0
+    bytes_received: 44817
+    endpoints:
+      POST sso/token:
+        count: 1
+        errors: 0
+        seconds: 0.187
+        min: 0.187
+        max: 0.187
+        bytes_received: 3841
+        statuses:
+          "200": 1
+      GET clusters/{cluster_id}:
+        count: 7
+        errors: 0
+        seconds: 1.435
+        min: 0.184
+        max: 0.226
+        bytes_received: 35840
+        statuses:
+          "200": 7
+      POST clusters/{cluster_id}/actions/install:
+        count: 1
+        errors: 0
+        seconds: 0.498
+        min: 0.498
+        max: 0.498
+        bytes_received: 5136
+        statuses:
+          "202": 1
 '''
 
 SUCCESS_GET_CODE = 200
@@ -26,6 +175,16 @@ SUCCESS_POST_CODE = SUCCESS_PATCH_CODE = 201
 SUCCESS_ACTION_CODE = 202
 SUCCESS_DELETE_CODE = 204
 
+# statuses each action is expected to end in
+DEFAULT_TARGET_STATUS = {
+    "install": ["installed"],
+    "cancel": ["cancelled"],
+    "reset": ["insufficient", "ready", "pending-for-input"],
+}
+
+# statuses a cluster will not leave without user intervention
+CLUSTER_FAILED_STATUS = ["error", "cancelled", "installing-pending-user-action"]
+
 def format_module_results(results: dict, msg: str = None, cluster: list = None, changed: bool = None):
     if msg is not None:
         results['msg'] = msg
@@ -43,8 +202,12 @@ def run_module():
         cluster_name = dict(type='str', default=None),
         offline_token=dict(type='str', required=False, no_log=True),
         pull_secret=dict(type='str', required=False, no_log=True),
-        state=dict(type='str', required=True, choices=["install", "cancel", "reset"])
+        state=dict(type='str', required=True, choices=["install", "cancel", "reset"]),
+        target_status=dict(type='list', elements='str', required=False),
+        wait=dict(type='bool', required=False, default=False),
+        wait_timeout=dict(type='int', required=False, default=7200),
     )
+    module_args.update(client_argument_spec())
 
     # seed the result dict in the object
     # we primarily care about changed and state
@@ -67,6 +230,8 @@ def run_module():
         supports_check_mode=True
     )
 
+    set_module_client(module.params, result)
+
     # if the user is working with this module in only check mode we do not
     # want to make any changes to the environment, just return the current
     # state with no modifications
@@ -81,29 +246,27 @@ def run_module():
     if module.params['pull_secret'] is not None:
         os.environ["REDHAT_PULL_SECRET"] = module.params["pull_secret"]
 
-    # get all clusters
-    get_cluster_response = get_clusters()
-
-    if get_cluster_response.status_code != SUCCESS_GET_CODE:
+    # check that a name or id was provided, fail if not
+    if module.params['cluster_id'] is None and module.params['cluster_name'] is None:
         format_module_results(results=result,
-                              msg=f"Failed to get clusters {get_cluster_response.json()}",
+                              msg=f"You must specifiy either an cluster ID or a NAME when STATE == {module.params['state']}",
                               changed=False,
                               cluster=[],
                               )
-        # fail module
         module.fail_json(**result)
-    
-        # check that a name or id was provided, fail if not
-    if module.params['cluster_id'] is None and module.params['name'] is None:
+
+    # find the cluster by id, or by name through the name index, without listing every cluster when possible
+    try:
+        filtered_response = cluster_resolver().resolve(obj_id=module.params['cluster_id'], name=module.params['cluster_name'])
+    except Exception as e:
         format_module_results(results=result,
-                              msg=f"You must specifiy either an cluster ID or a NAME when STATE == {module.params['state']}",
+                              msg=f"Failed to get clusters {e}",
                               changed=False,
-                              result=[],
+                              cluster=[],
                               )
+        # fail module
         module.fail_json(**result)
 
-    filtered_response = jmespath_id_validator(module.params['cluster_id'], get_cluster_response.json()) if module.params['cluster_id'] is not None else jmespath_name_validator(module.params['name'], get_cluster_response.json())
-
     if len(filtered_response) != 1:
         format_module_results(results=result,
                               msg="Found more than one instance of the cluster you defined, or the cluster you defined does not exist",
@@ -133,6 +296,51 @@ def run_module():
                           cluster=[action_response.json()]
                           )
 
+    if not module.params['wait']:
+        module.exit_json(**result)
+
+    # poll the cluster in this process instead of re-running the module in an until loop
+    target_status = module.params['target_status'] or DEFAULT_TARGET_STATUS[module.params['state']]
+    failed_status = [status for status in CLUSTER_FAILED_STATUS if status not in target_status]
+
+    def fetch_cluster():
+        response = get_cluster(cluster_id=filtered_response[0]['id'])
+        response.raise_for_status()
+        return response.json()
+
+    poller = AdaptivePoller(timeout=module.params['wait_timeout'])
+    try:
+        outcome, cluster = poller.poll(
+            fetch=fetch_cluster,
+            state_of=lambda cluster: cluster.get('status'),
+            is_done=lambda cluster: cluster.get('status') in target_status,
+            is_failed=lambda cluster: cluster.get('status') in failed_status,
+            describe=lambda cluster: dict(status_info=cluster.get('status_info')),
+        )
+    except Exception as e:
+        result['status_timeline'] = poller.timeline
+        format_module_results(results=result,
+                              msg=f"Failed to get the status of cluster {filtered_response[0]['id']}. {e}",
+                              )
+        module.fail_json(**result)
+
+    result['status_timeline'] = poller.timeline
+    format_module_results(results=result, cluster=[cluster])
+
+    if outcome == "failed":
+        format_module_results(results=result,
+                              msg=f"Cluster {cluster['id']} reached status {cluster.get('status')}: {cluster.get('status_info')}",
+                              )
+        module.fail_json(**result)
+    elif outcome == "timeout":
+        format_module_results(results=result,
+                              msg=f"Timed out after {module.params['wait_timeout']} seconds waiting for cluster {cluster['id']} to reach {target_status}, last status {cluster.get('status')}",
+                              )
+        module.fail_json(**result)
+
+    format_module_results(results=result,
+                          msg=f"Successfully {module.params['state']} cluster. {cluster['id']} reached status {cluster.get('status')}",
+                          )
     module.exit_json(**result)
     
 
@@ -0,0 +1,612 @@
+#!/usr/bin/python
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import (absolute_import, division, print_function)
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ..module_utils.api import CLUSTER_PATCH_PARAMS, delete_cluster, get_clusters, patch_cluster, post_cluster
+from ..module_utils.params import cluster_argument_spec, create_cluster_from_module_params
+from ..module_utils.network import validate_cluster_networks
+from ..module_utils.validation import validate_params
+from ..module_utils.tools import IndexedResponse
+from ..module_utils.bulk import DEFAULT_MAX_WORKERS, run_bounded
+from ..module_utils.diff import ObjectDiff
+from ..module_utils.state import DesiredStateStore, cluster_state_store, params_fingerprint
+from ..module_utils.client import client_argument_spec, set_module_client
+from ..module_utils.resolver import cluster_resolver
+from ..module_utils.schema.cluster import Cluster
+
+import os
+
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: cluster_bulk
+short_description: Manage many OpenShift clusters in one task
+version_added: "0.0.1"
+description: >
+  This module creates, updates and deletes a list of OpenShift clusters using the Red Hat Assisted Installer API.
+  Every cluster is resolved from a single listing of the account, the changes of each cluster are computed locally,
+  and the resulting create, update and delete calls are sent concurrently over one authenticated connection pool.
+  The networks and virtual IPs of every cluster are checked locally first, and a cluster whose networks the API
+  would reject fails without any request being sent for it. A failing cluster does not stop the others; the results of every cluster are returned and the task fails
+  once all calls completed if any of them failed.
+options:
+  clusters:
+    description:
+      - The clusters to manage. Every element accepts the options of the M(justinbatchelor.redhat_assisted_installer.cluster) module.
+      - Each cluster is identified by I(cluster_id), or by I(name) when no id is given.
+    type: list
+    required: true
+    elements: dict
+    suboptions:
+        additional_ntp_source:
+          description: A list of NTP sources (name or IP) to be added to all the hosts.
+          type: list
+          required: false
+        api_vips:
+          description: A list of virtual IPs used to reach the OpenShift cluster's API.
+          type: list
+          required: false
+          elements: dict
+          suboptions:
+            cluster_id:
+              description: The cluster that this VIP is associated with.
+              type: str
+              required: true
+            ip:
+              description: The virtual IP address.
+              type: str
+              required: true
+            verification:
+              description: VIP verification result.
+              type: str
+              required: false
+              choices: ["unverified", "failed", "succeeded"]
+        base_dns_domain:
+          description: Base domain of the cluster. All DNS records must be sub-domains of this base and include the cluster name.
+          type: str
+          required: false
+        cluster_networks:
+          description: Cluster networks that are associated with this cluster.
+          type: list
+          required: false
+          elements: dict
+          suboptions:
+            cidr:
+              description: A network from which Pod IPs are allocated. This block must not overlap with existing physical networks.
+              type: str
+              required: true
+            cluster_id:
+              description: The cluster that this network is associated with.
+              type: str
+              required: false
+            host_prefix:
+              description: The subnet prefix length to assign to each individual node.
+              type: int
+              required: false
+        cluster_id:
+          description: ID of the cluster.
+          type: str
+          required: false
+        cpu_architecture:
+          description: The CPU architecture of the image.
+          type: str
+          required: false
+          choices: ['x86_64', 'aarch64', 'arm64', 'ppc64le', 's390x']
+        disk_encryption:
+          description: Disk encryption settings.
+          type: dict
+          required: false
+          suboptions:
+            enable_on:
+              description: Enable/disable disk encryption on master nodes, worker nodes, or all nodes.
+              type: str
+              required: true
+              choices: ["none", "all", "masters", "workers"]
+            mode:
+              description: The disk encryption mode to use.
+              type: str
+              required: true
+              choices: ["tang", "tpmv2"]
+            tang_server:
+              description: JSON-formatted string containing additional information regarding tang's configuration.
+              type: str
+              required: false
+        high_availability_mode:
+          description: Guaranteed availability of the installed cluster.
+          type: str
+          required: false
+          choices: ["None", "Full"]
+        http_proxy:
+          description: A proxy URL to use for creating HTTP connections outside the cluster.
+          type: str
+          required: false
+        https_proxy:
+          description: A proxy URL to use for creating HTTPS connections outside the cluster.
+          type: str
+          required: false
+        hyperthreading:
+          description: Enable/disable hyperthreading on master nodes, worker nodes, or all nodes.
+          type: str
+          required: false
+          choices: ['all', 'none', "masters", "workers"]
+        ignition_endpoint:
+          description: Explicit ignition endpoint overrides the default ignition endpoint.
+          type: dict
+          required: false
+          suboptions:
+            ca_certificate:
+              description: Base64 encoded CA certificate to be used when contacting the URL via https.
+              type: str
+              required: true
+            url:
+              description: The URL for the ignition endpoint.
+              type: str
+              required: true
+        ingress_vips:
+          description: The virtual IPs used for cluster ingress traffic.
+          type: list
+          required: false
+          elements: dict
+          suboptions:
+            cluster_id:
+              description: The cluster that this VIP is associated with.
+              type: str
+              required: false
+            ip:
+              description: The virtual IP address.
+              type: str
+              required: true
+            verification:
+              description: VIP verification result.
+              type: str
+              required: false
+              choices: ["unverified", "failed", "succeeded"]
+        machine_networks:
+          description: Machine networks that are associated with this cluster.
+          type: list
+          required: false
+          elements: dict
+          suboptions:
+            cidr:
+              description: A network that all hosts belonging to the cluster should have an interface with IP address in.
+              type: str
+              required: true
+            cluster_id:
+              description: The cluster that this network is associated with.
+              type: str
+              required: false
+        name:
+          description: Name of the OpenShift cluster.
+          type: str
+          required: false
+        network_type:
+          description: The desired network type used.
+          type: str
+          required: false
+          choices: ['OpenShiftSDN', 'OVNKubernetes']
+        olm_operators:
+          description: List of OLM operators to be installed.
+          type: list
+          required: false
+          elements: dict
+          suboptions:
+            name:
+              description: Name of the OLM operator.
+              type: str
+              required: true
+            properties:
+              description: Blob of operator-dependent parameters that are required for installation.
+              type: str
+              required: false
+        openshift_version:
+          description: Version of the OpenShift cluster.
+          type: str
+          required: false
+        platform:
+          description: The configuration for the specific platform upon which to perform the installation.
+          type: dict
+          required: false
+          suboptions:
+            external:
+              description: Configuration used when installing with an external platform type.
+              type: dict
+              required: false
+              suboptions:
+                cloud_controller_manager:
+                  description: When set to external, this property will enable an external cloud provider.
+                  type: str
+                  required: true
+                  choices: ["", "External"]
+                platform_name:
+                  description: Holds the arbitrary string representing the infrastructure provider name.
+                  type: str
+                  required: true
+            type:
+              description: Type of platform.
+              type: str
+              required: true
+              choices: ["baremetal", "nutanix", "vsphere", "none", "external"]
+        schedulable_masters:
+          description: Schedule workloads on masters.
+          type: bool
+          required: false
+        service_networks:
+          description: Service networks that are associated with this cluster.
+          type: list
+          required: false
+          elements: dict
+          suboptions:
+            cidr:
+              description: IP address block for service IP blocks.
+              type: str
+              required: true
+            cluster_id:
+              description: A network to use for service IP addresses.
+              type: str
+              required: false
+        state:
+          description: The desired state of the cluster.
+          type: str
+          required: false
+          default: present
+          choices: ['present', 'absent']
+        tags:
+          description: A comma-separated list of tags that are associated to the cluster.
+          type: str
+          required: false
+        user_managed_networking:
+          description: Indicate if the networking is managed by the user.
+          type: bool
+          required: false
+        ssh_public_key:
+          description: SSH public key for debugging OpenShift nodes.
+          type: str
+          required: false
+        vip_dhcp_allocation:
+          description: Indicate if virtual IP DHCP allocation mode is enabled.
+          type: bool
+          required: false
+  max_workers:
+    description: Maximum number of create, update and delete calls sent to the API at the same time.
+    type: int
+    required: false
+    default: 8
+  offline_token:
+    description: Offline token for authentication.
+    type: str
+    required: false
+    no_log: true
+  pull_secret:
+    description: The pull secret obtained from Red Hat OpenShift Cluster Manager, used for every cluster.
+    type: str
+    required: false
+    no_log: true
+requirements:
+  - requests==2.32.3
+  - ansible==10.1.0
+  - jmespath==1.0.1
+extends_documentation_fragment:
+  - justinbatchelor.redhat_assisted_installer.client
+author:
+  - Justin Batchelor (@justinbatchelor)
+'''
+
+EXAMPLES = r'''
+# Create or update a fleet of single node clusters
+- name: Manage single node clusters
+  justinbatchelor.redhat_assisted_installer.cluster_bulk:
+    max_workers: 10
+    clusters: "{{ sites | map('combine', {'high_availability_mode': 'None', 'base_dns_domain': 'example.com', 'openshift_version': '4.15'}) }}"
+  register: result
+
+# Delete clusters by name
+- name: Delete retired clusters
+  justinbatchelor.redhat_assisted_installer.cluster_bulk:
+    clusters:
+      - name: "edge-01"
+        state: absent
+      - name: "edge-02"
+        state: absent
+'''
+
+RETURN = r'''
+api_stats:
+  description: >
+    Number of requests sent to the API and how many of them were retries.
+  returned: always
+  type: dict
+  sample:
+    requests: 4
+    retries: 0
+timings:
+  description: >
+    Number of requests, seconds and bytes per endpoint, including the SSO token exchange.
+    Ids in endpoints are replaced by placeholders so calls to one endpoint are aggregated.
+  returned: when I(debug_timings=true)
+  type: dict
+  sample:
+    requests: 5
+    seconds: 2.054
+    bytes_sent: 1406
+    bytes_received: 66646
+    endpoints:
+      POST sso/token:
+        count: 1
+        errors: 0
+        seconds: 0.187
+        min: 0.187
+        max: 0.187
+        bytes_received: 3841
+        statuses:
+          "200": 1
+      GET clusters:
+        count: 1
+        errors: 0
+        seconds: 0.631
+        min: 0.631
+        max: 0.631
+        bytes_received: 48213
+        statuses:
+          "200": 1
+      POST clusters:
+        count: 3
+        errors: 0
+        seconds: 1.236
+        min: 0.371
+        max: 0.453
+        bytes_received: 14592
+        statuses:
+          "201": 3
+results:
+  description: >
+    One entry per element of clusters, in the same order, describing what was done to the cluster.
+    Updated clusters list the key paths of the attributes that differed in changes, and unchanged clusters set current
+    when an earlier run applied the same parameters and the API reports no update since.
+    Clusters with values not matching the API schema list them in validation_errors,
+    and clusters with an invalid network configuration list the problems found in network_errors.
+  returned: always
+  type: list
+  elements: dict
+  sample:
+    - name: "edge-01"
+      id: "0b0a0e3e-1c8b-4b3c-9f1e-3f5f7b7c9d11"
+      state: present
+      action: update
+      changed: true
+      failed: false
+      msg: "Successfully patched the cluster: 0b0a0e3e-1c8b-4b3c-9f1e-3f5f7b7c9d11"
+      current: false
+      changes:
+        - "api_vips[ip=192.168.1.100]"
+        - "tags"
+      cluster:
+        id: "0b0a0e3e-1c8b-4b3c-9f1e-3f5f7b7c9d11"
+        name: "edge-01"
+summary:
+  description: >
+    Number of clusters created, updated, deleted, left unchanged and failed, and the number of unchanged clusters
+    that were neither diffed nor patched because an earlier run applied the same parameters and the API reports
+    no update since.
+  returned: always
+  type: dict
+  sample:
+    created: 1
+    updated: 2
+    deleted: 0
+    unchanged: 37
+    failed: 0
+    current: 12
+msg:
+  description: >
+    Message indicating the status of the operation.
+  returned: always
+  type: str
+  sample: "Processed 40 clusters: 1 created, 2 updated, 0 deleted, 37 unchanged, 0 failed."
+'''
+
+SUCCESS_POST_CODE = SUCCESS_PATCH_CODE = 201
+
+# the summary counter incremented for every action that succeeded
+ACTION_SUMMARY = dict(create="created", update="updated", delete="deleted", none="unchanged")
+
+
+def plan_cluster(item: dict, clusters: IndexedResponse, targets: set, state: DesiredStateStore) -> dict:
+    """
+    Decides which call, if any, brings one element of clusters to its desired state.
+
+    Returns:
+        dict: The result entry of the element, with the action to take and the params to send.
+    """
+    entry = dict(
+        name=item.get('name'),
+        id=item.get('cluster_id'),
+        state=item['state'],
+        action='none',
+        changed=False,
+        failed=False,
+        msg='',
+        cluster={},
+        current=False,
+    )
+
+    def fail(msg):
+        entry.update(failed=True, msg=msg)
+        return entry
+
+    if item.get('cluster_id') is None and item.get('name') is None:
+        return fail("You must specifiy either an cluster ID or a NAME for every cluster")
+
+    if item.get('cluster_id') is not None:
+        found = clusters.get_by_id(item['cluster_id'])
+    else:
+        found = clusters.get_by_name(item['name'])
+
+    if len(found) > 1:
+        return fail("Found more than one instance of the cluster you defined")
+
+    target = found[0]['id'] if found else f"name:{item.get('name')}"
+    if target in targets:
+        return fail("The cluster is listed more than once")
+    targets.add(target)
+
+    if found:
+        entry.update(id=found[0]['id'], name=found[0].get('name'), cluster=found[0])
+
+    if item['state'] == 'absent':
+        if not found:
+            entry['msg'] = "cluster not found."
+            return entry
+        entry['action'] = 'delete'
+        return entry
+
+    cluster = create_cluster_from_module_params(item)
+    validation_errors = validate_params("cluster", cluster.create_params())
+    if validation_errors:
+        entry['validation_errors'] = validation_errors
+        return fail(f"Invalid cluster configuration: {'; '.join(validation_errors)}")
+    network_errors = validate_cluster_networks(cluster.create_params())
+    if network_errors:
+        entry['network_errors'] = network_errors
+        return fail(f"Invalid network configuration: {'; '.join(network_errors)}")
+    entry['fingerprint'] = params_fingerprint(cluster.create_params(), Cluster.fields)
+    if not found:
+        if item.get('cluster_id') is not None:
+            return fail(f"cluster not found: {item['cluster_id']}")
+        entry.update(action='create', cluster_object=cluster)
+        return entry
+
+    # params applied by an earlier run are still in place when the api reports no update since,
+    # so neither the diff nor the PATCH is needed
+    current = state.is_current(found[0], entry['fingerprint'])
+    # compare only what the PATCH endpoint accepts, normalized as described by the schema
+    cluster_diff = None if current else ObjectDiff(cluster.create_params(), found[0], Cluster.fields, CLUSTER_PATCH_PARAMS)
+    if current or not cluster_diff:
+        if not current:
+            state.record(found[0], entry['fingerprint'])
+        entry.update(msg=f"The cluster is up to date: {found[0]['id']}", current=current)
+        return entry
+    entry.update(action='update', params=cluster_diff.params, changes=[change['path'] for change in cluster_diff.changes])
+    return entry
+
+def apply_cluster(entry: dict) -> dict:
+    """
+    Sends the call planned for one cluster. Runs on the worker threads of run_bounded.
+    """
+    if entry['action'] == 'create':
+        response = post_cluster(cluster=entry['cluster_object'])
+        if response.status_code != SUCCESS_POST_CODE:
+            raise Exception(f'Failed to create the cluster: {response.text}')
+        return response.json()
+
+    if entry['action'] == 'update':
+        response = patch_cluster(entry['id'], entry['params'])
+        if response.status_code != SUCCESS_PATCH_CODE:
+            raise Exception(f'Failed to patch the cluster: {response.text}')
+        return response.json()
+
+    if not delete_cluster(cluster_id=entry['id']):
+        raise Exception(f"Failed to delete cluster: {entry['id']}")
+    return entry['cluster']
+
+def run_module():
+    cluster_options = cluster_argument_spec()
+    cluster_options['state'] = dict(type='str', required=False, default='present', choices=['present', 'absent'])
+
+    module_args = dict(
+        clusters=dict(type='list', elements='dict', required=True, options=cluster_options),
+        max_workers=dict(type='int', required=False, default=DEFAULT_MAX_WORKERS),
+        offline_token=dict(type='str', required=False, no_log=True),
+        pull_secret=dict(type='str', required=False, no_log=True),
+    )
+    module_args.update(client_argument_spec())
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        msg='',
+        results=[],
+        summary=dict(created=0, updated=0, deleted=0, unchanged=0, failed=0, current=0),
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    set_module_client(module.params, result)
+
+    ## First we need to check if the user provided an offline token
+    if module.params['offline_token'] is not None:
+        os.environ["REDHAT_OFFLINE_TOKEN"] = module.params["offline_token"]
+
+    ## Now we need to check if the user provided a pull secret
+    if module.params['pull_secret'] is not None:
+        os.environ["REDHAT_PULL_SECRET"] = module.params["pull_secret"]
+
+    # one listing resolves every cluster, and refreshes the name index used by the cluster module
+    resolver = cluster_resolver()
+    # fingerprints of the params applied by earlier runs, to skip clusters nobody changed since
+    state = cluster_state_store()
+    try:
+        response = get_clusters()
+        response.raise_for_status()
+        clusters = IndexedResponse(response.json())
+        resolver.index.rebuild(clusters)
+    except Exception as e:
+        result['msg'] = f"Failed to get clusters {e}"
+        module.fail_json(**result)
+
+    targets = set()
+    entries = [plan_cluster(item, clusters, targets, state) for item in module.params['clusters']]
+    pending = [entry for entry in entries if not entry['failed'] and entry['action'] != 'none']
+
+    if module.check_mode:
+        for entry in pending:
+            entry.update(changed=True, msg=f"The cluster would be {ACTION_SUMMARY[entry['action']]}.")
+    else:
+        outcomes = run_bounded(apply_cluster, pending, module.params['max_workers'])
+        for entry, (cluster, error) in zip(pending, outcomes):
+            if error is not None:
+                entry.update(failed=True, msg=str(error))
+                continue
+            entry.update(changed=True, cluster=cluster, id=cluster.get('id'))
+            if entry['action'] == 'create':
+                resolver.remember(cluster)
+                state.record(cluster, entry['fingerprint'])
+                entry['msg'] = f"Successfully created the cluster: {cluster['id']}"
+            elif entry['action'] == 'update':
+                state.record(cluster, entry['fingerprint'])
+                entry['msg'] = f"Successfully patched the cluster: {cluster['id']}"
+            else:
+                resolver.forget(entry['id'])
+                state.discard(entry['id'])
+                entry['msg'] = f"Successfully deleted cluster: {entry['id']}"
+
+    for entry in entries:
+        entry.pop('cluster_object', None)
+        entry.pop('params', None)
+        entry.pop('fingerprint', None)
+        result['summary']['current'] += entry['current']
+        result['summary']['failed' if entry['failed'] else ACTION_SUMMARY[entry['action']]] += 1
+
+    summary = result['summary']
+    result['results'] = entries
+    result['changed'] = any(entry['changed'] for entry in entries)
+    result['msg'] = (f"Processed {len(entries)} clusters: {summary['created']} created, {summary['updated']} updated, "
+                     f"{summary['deleted']} deleted, {summary['unchanged']} unchanged, {summary['failed']} failed.")
+
+    if summary['failed'] > 0:
+        module.fail_json(**result)
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
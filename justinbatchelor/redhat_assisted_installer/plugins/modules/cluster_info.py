@@ -5,8 +5,11 @@ from __future__ import (absolute_import, division, print_function)
 
 from ansible.module_utils.basic import AnsibleModule
 
-from ..module_utils.api import *
-from ..module_utils.tools import *
+from ..module_utils.api import get_cluster, get_clusters
+from ..module_utils.tools import filter_objects, jmespath_search, project_fields
+from ..module_utils.client import client_argument_spec, set_module_client
+
+import os
 
 
 __metaclass__ = type
@@ -25,6 +28,42 @@ options:
       - Cluster ID for the assisted installer managed cluster.
     type: str
     required: false
+  query:
+    description:
+      - JMESPath expression applied to the list of clusters before it is returned, e.g. C([?status=='ready']).
+    type: str
+    required: false
+  owner:
+    description:
+      - Only return the clusters owned by this user. The filter is applied by the API.
+    type: str
+    required: false
+  name:
+    description:
+      - Only return the clusters with this name.
+    type: str
+    required: false
+  status:
+    description:
+      - Only return the clusters in one of these statuses, e.g. C(ready) or C(installed).
+    type: list
+    elements: str
+    required: false
+  with_hosts:
+    description:
+      - Include the hosts of every cluster when listing clusters. The API leaves them out by default.
+    type: bool
+    required: false
+    default: false
+  fields:
+    description:
+      - Only return these top level attributes of every cluster, e.g. C([id, name, status]).
+      - Keeps the result small when listing many clusters. I(query) is applied to the projected clusters.
+    type: list
+    elements: str
+    required: false
+extends_documentation_fragment:
+  - justinbatchelor.redhat_assisted_installer.client
 author:
   - Justin Batchelor (@justinbatchelor)
 '''
@@ -41,9 +80,58 @@ EXAMPLES = r'''
     cluster_id: '{{ all_cluster_info["cluster_info"][0]["id"] }}'
   register: cluster_info
 
+# Retrieve the id and name of the ready clusters of a user, nothing else is returned
+- name: Get the ready clusters of a user
+  justinbatchelor.redhat_assisted_installer.cluster_info:
+    owner: "my-user"
+    status:
+      - ready
+    fields:
+      - id
+      - name
+  register: ready_clusters
+
 '''
 
 RETURN = r'''
+api_stats:
+  description: >
+    Number of requests sent to the API and how many of them were retries.
+  returned: always
+  type: dict
+  sample:
+    requests: 1
+    retries: 0
+timings:
+  description: >
+    Number of requests, seconds and bytes per endpoint, including the SSO token exchange.
+    Ids in endpoints are replaced by placeholders so calls to one endpoint are aggregated.
+  returned: when I(debug_timings=true)
+  type: dict
+  sample:
+    requests: 2
+    seconds: 0.412
+    bytes_sent: 0
+    bytes_received: 48213
+    endpoints:
+      POST sso/token:
+        count: 1
+        errors: 0
+        seconds: 0.187
+        min: 0.187
+        max: 0.187
+        bytes_received: 3841
+        statuses:
+          "200": 1
+      GET clusters/{cluster_id}:
+        count: 1
+        errors: 0
+        seconds: 0.225
+        min: 0.225
+        max: 0.225
+        bytes_received: 44372
+        statuses:
+          "200": 1
 cluster_info:
   description: >
     List of cluster information retrieved from the Red Hat Assisted Installer.
@@ -72,10 +160,17 @@ def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
         cluster_id = dict(type='str', default=None),
+        query=dict(type='str', required=False),
+        owner=dict(type='str', required=False),
+        name=dict(type='str', required=False),
+        status=dict(type='list', elements='str', required=False),
+        with_hosts=dict(type='bool', required=False, default=False),
+        fields=dict(type='list', elements='str', required=False),
         offline_token=dict(type='str', required=False, no_log=True),
         pull_secret=dict(type='str', required=False, no_log=True),
 
     )
+    module_args.update(client_argument_spec())
 
     # seed the result dict in the object
     # we primarily care about changed and state
@@ -99,6 +194,8 @@ def run_module():
         supports_check_mode=True
     )
 
+    set_module_client(module.params, result)
+
     # if the user is working with this module in only check mode we do not
     # want to make any changes to the environment, just return the current
     # state with no modifications
@@ -116,12 +213,21 @@ def run_module():
     try:
         api_response = None
         if module.params['cluster_id'] is None:
-            api_response = get_clusters()
+            api_response = get_clusters(with_hosts=module.params['with_hosts'], owner=module.params['owner'])
         else:
             api_response = get_cluster(cluster_id=module.params['cluster_id'])
         api_response.raise_for_status()
-        result['cluster_info'] = [api_response.json()] if isinstance(api_response.json(), dict) else api_response.json()
-        result['count'] = len([api_response.json()]) if isinstance(api_response.json(), dict) else len(api_response.json())
+        data = api_response.json()
+        result['cluster_info'] = [data] if isinstance(data, dict) else data
+        # filters the api cannot apply and the projection run before the query, which sees their result
+        result['cluster_info'] = filter_objects(result['cluster_info'], name=module.params['name'], status=module.params['status'])
+        if module.params['fields']:
+            result['cluster_info'] = project_fields(result['cluster_info'], module.params['fields'])
+        result['count'] = len(result['cluster_info'])
+        if module.params['query'] is not None:
+            # the expression is compiled once and cached, so repeated queries do not re-parse it
+            result['cluster_info'] = jmespath_search(module.params['query'], result['cluster_info'])
+            result['count'] = len(result['cluster_info']) if isinstance(result['cluster_info'], list) else 1
         result['msg'] = "Success"
         module.exit_json(**result) 
 
@@ -0,0 +1,309 @@
+#!/usr/bin/python
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import (absolute_import, division, print_function)
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ..module_utils.api import get_infrastructure_environement_image_url
+from ..module_utils.client import client_argument_spec, set_module_client
+from ..module_utils.resolver import infra_env_resolver
+from ..module_utils.download import DEFAULT_CHUNK_SIZE, DEFAULT_CONNECTIONS, META_SUFFIX, PART_SUFFIX, SEGMENTS_SUFFIX, ParallelDownloader, is_current, read_metadata, url_fingerprint, write_metadata
+
+from datetime import datetime, timezone
+import os
+
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: discovery_image
+short_description: Download the discovery image of an infrastructure environment
+version_added: "0.0.1"
+description: >
+  This module downloads the discovery ISO of an infrastructure environment managed by the Red Hat Assisted Installer.
+  The image is fetched as byte ranges over several parallel connections and written at their offsets into a
+  preallocated file, an interrupted download is resumed with HTTP range requests,
+  and the download is skipped when the local copy was fetched from the current image.
+options:
+  checksum:
+    description:
+      - Expected sha256 digest of the image, as C(sha256:<hex>) or a bare hex digest.
+      - The downloaded file is removed when it does not match.
+    type: str
+    required: false
+  chunk_size:
+    description: Number of bytes read and written at a time.
+    type: int
+    required: false
+    default: 1048576
+  connections:
+    description:
+      - Number of parallel connections used to fetch the image in byte ranges.
+      - Servers without range support and images smaller than one range are downloaded over a single connection.
+    type: int
+    required: false
+    default: 4
+  dest:
+    description:
+      - Path the image is written to. When it is an existing directory, the image is saved as C(<infra_env_id>.iso) inside it.
+      - While downloading, data is written to C(<dest>.part), and C(<dest>.meta.json) records which image the file came from.
+    type: path
+    required: true
+  force:
+    description: Download the image even when the local copy matches the current image.
+    type: bool
+    required: false
+    default: false
+  infra_env_id:
+    description: ID of the infrastructure environment.
+    type: str
+    required: false
+  name:
+    description: Name of the infrastructure environment, used when I(infra_env_id) is not provided.
+    type: str
+    required: false
+  offline_token:
+    description: Offline token for authentication.
+    type: str
+    required: false
+    no_log: true
+  pull_secret:
+    description: The pull secret obtained from Red Hat OpenShift Cluster Manager.
+    type: str
+    required: false
+    no_log: true
+extends_documentation_fragment:
+  - justinbatchelor.redhat_assisted_installer.client
+author:
+  - Justin Batchelor (@justinbatchelor)
+'''
+
+EXAMPLES = r'''
+- name: Download the discovery image of an infrastructure environment
+  justinbatchelor.redhat_assisted_installer.discovery_image:
+    name: "my-infra-env"
+    dest: /var/lib/isos/my-infra-env.iso
+  register: image
+
+- name: Download the discovery image and verify its checksum
+  justinbatchelor.redhat_assisted_installer.discovery_image:
+    infra_env_id: "your-infra-env-id"
+    dest: /var/lib/isos/
+    checksum: "sha256:9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08"
+'''
+
+RETURN = r'''
+dest:
+  description: Path of the downloaded image.
+  returned: always
+  type: str
+  sample: /var/lib/isos/my-infra-env.iso
+fingerprint:
+  description: Fingerprint of the image url and expiry the local copy was downloaded from.
+  returned: success
+  type: str
+size:
+  description: Size of the image in bytes.
+  returned: success
+  type: int
+  sample: 104857600
+connections:
+  description: Number of parallel connections the image was downloaded with.
+  returned: when the image was downloaded
+  type: int
+  sample: 4
+resumed_from:
+  description: Number of bytes already present from an interrupted download, 0 when it started from the beginning.
+  returned: when the image was downloaded
+  type: int
+  sample: 0
+sha256:
+  description: The verified sha256 digest of the image.
+  returned: when checksum is set and the image was downloaded
+  type: str
+msg:
+  description: Message indicating the status of the operation.
+  returned: always
+  type: str
+  sample: "Successfully downloaded the discovery image."
+api_stats:
+  description: >
+    Number of requests sent to the API and how many of them were retries.
+    The image itself is fetched from the image service outside of the API client, so its ranged
+    requests are not counted, the connections, resumed_from and size results describe them instead.
+  returned: always
+  type: dict
+  sample:
+    requests: 2
+    retries: 0
+timings:
+  description: >
+    Number of requests, seconds and bytes per endpoint, including the SSO token exchange.
+    Ids in endpoints are replaced by placeholders so calls to one endpoint are aggregated.
+    The requests downloading the image are not included.
+  returned: when I(debug_timings=true)
+  type: dict
+  sample:
+    requests: 3
+    seconds: 0.626
+    bytes_sent: 0
+    bytes_received: 7017
+    endpoints:
+      POST sso/token:
+        count: 1
+        errors: 0
+        seconds: 0.187
+        min: 0.187
+        max: 0.187
+        bytes_received: 3841
+        statuses:
+          "200": 1
+      GET infra-envs/{infra_env_id}:
+        count: 1
+        errors: 0
+        seconds: 0.198
+        min: 0.198
+        max: 0.198
+        bytes_received: 2764
+        statuses:
+          "200": 1
+      GET infra-envs/{infra_env_id}/downloads/image-url:
+        count: 1
+        errors: 0
+        seconds: 0.241
+        min: 0.241
+        max: 0.241
+        bytes_received: 412
+        statuses:
+          "200": 1
+'''
+
+SUCCESS_GET_CODE = 200
+
+
+def parse_timestamp(value: str) -> datetime:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+def run_module():
+    module_args = dict(
+        checksum=dict(type='str', required=False),
+        chunk_size=dict(type='int', required=False, default=DEFAULT_CHUNK_SIZE),
+        connections=dict(type='int', required=False, default=DEFAULT_CONNECTIONS),
+        dest=dict(type='path', required=True),
+        force=dict(type='bool', required=False, default=False),
+        infra_env_id=dict(type='str', required=False),
+        name=dict(type='str', required=False),
+        offline_token=dict(type='str', required=False, no_log=True),
+        pull_secret=dict(type='str', required=False, no_log=True),
+    )
+    module_args.update(client_argument_spec())
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        dest='',
+        msg='',
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_one_of=[('infra_env_id', 'name')],
+        supports_check_mode=True
+    )
+
+    client = set_module_client(module.params, result)
+
+    ## First we need to check if the user provided an offline token
+    if module.params['offline_token'] is not None:
+        os.environ["REDHAT_OFFLINE_TOKEN"] = module.params["offline_token"]
+
+    ## Now we need to check if the user provided a pull secret
+    if module.params['pull_secret'] is not None:
+        os.environ["REDHAT_PULL_SECRET"] = module.params["pull_secret"]
+
+    try:
+        infra_envs = infra_env_resolver().resolve(obj_id=module.params['infra_env_id'], name=module.params['name'])
+    except Exception as e:
+        result['msg'] = f"Failed to get infrastructure environments {e}"
+        module.fail_json(**result)
+
+    if len(infra_envs) != 1:
+        result['msg'] = "Found more than one instance of the infrastructure environment you defined, or the infrastructure environment you defined does not exist"
+        module.fail_json(**result)
+    infra_env = infra_envs[0]
+
+    dest = module.params['dest']
+    if os.path.isdir(dest):
+        dest = os.path.join(dest, f"{infra_env['id']}.iso")
+    result['dest'] = dest
+
+    # the url stored on the infra env is presigned, ask for a new one once it expired
+    # urls that never expire carry the zero timestamp 0001-01-01T00:00:00Z
+    download_url = infra_env.get('download_url')
+    expires_at = infra_env.get('expires_at')
+    expiry = parse_timestamp(expires_at)
+    if not download_url or (expiry is not None and expiry.year > 1 and expiry <= datetime.now(timezone.utc)):
+        image_url_response = get_infrastructure_environement_image_url(infra_env['id'])
+        if image_url_response.status_code != SUCCESS_GET_CODE:
+            result['msg'] = f"Failed to get the image url of infrastructure environment {infra_env['id']}: {image_url_response.text}"
+            module.fail_json(**result)
+        download_url = image_url_response.json().get('url')
+        expires_at = image_url_response.json().get('expires_at')
+
+    fingerprint = url_fingerprint(download_url, expires_at)
+    result['fingerprint'] = fingerprint
+
+    if not module.params['force'] and is_current(dest, fingerprint):
+        result['size'] = os.path.getsize(dest)
+        result['msg'] = f"The discovery image at {dest} is up to date."
+        module.exit_json(**result)
+
+    if module.check_mode:
+        result['changed'] = True
+        result['msg'] = f"The discovery image would be downloaded to {dest}."
+        module.exit_json(**result)
+
+    # the image is served by the image service, not the API, so its ranged requests bypass the client and are
+    # left out of api_stats and timings
+    downloader = ParallelDownloader(
+        session=client.session,
+        connections=module.params['connections'],
+        chunk_size=module.params['chunk_size'],
+        timeout=client.timeout,
+        retry_policy=client.retry_policy,
+    )
+    # only resume a partial file that was started from this same image, its fingerprint is kept next to the
+    # partial file so the metadata of the image already at dest stays valid until the new one replaces it
+    part = dest + PART_SUFFIX
+    if os.path.exists(part) and (read_metadata(part) or {}).get('partial') != fingerprint:
+        os.remove(part)
+        if os.path.exists(part + SEGMENTS_SUFFIX):
+            os.remove(part + SEGMENTS_SUFFIX)
+    write_metadata(part, dict(partial=fingerprint))
+
+    try:
+        download = downloader.download(download_url, dest, checksum=module.params['checksum'])
+        write_metadata(dest, dict(fingerprint=fingerprint, size=download['size'], expires_at=expires_at))
+        os.remove(part + META_SUFFIX)
+    except Exception as e:
+        result['msg'] = f"Failed to download the discovery image of infrastructure environment {infra_env['id']}: {e}"
+        module.fail_json(**result)
+
+    result.update(download)
+    result['changed'] = True
+    result['msg'] = f"Successfully downloaded the discovery image of infrastructure environment {infra_env['id']} to {dest}."
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
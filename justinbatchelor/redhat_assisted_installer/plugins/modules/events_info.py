@@ -0,0 +1,292 @@
+#!/usr/bin/python
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import (absolute_import, division, print_function)
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ..module_utils.events import DEFAULT_BUFFER_SIZE, DEFAULT_PAGE_SIZE, EventTail
+from ..module_utils.polling import AdaptivePoller
+from ..module_utils.client import client_argument_spec, set_module_client
+
+import os
+
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: events_info
+short_description: Retrieve the events of OpenShift clusters, infrastructure environments and hosts from Red Hat Assisted Installer
+version_added: "0.0.1"
+description: >
+  This module communicates with the Red Hat Assisted Installer to retrieve the events of a cluster, an infrastructure environment or a host.
+  Given the I(since) cursor returned by an earlier run, only the events emitted after it are requested, newest first and page by page,
+  so following a long installation does not transfer the whole event history on every poll.
+  With I(follow) the module keeps polling for new events in one process, holding at most I(buffer_size) of them in memory.
+options:
+  cluster_id:
+    description:
+      - The ID of the cluster whose events are retrieved, including the events of its hosts.
+    type: str
+    required: false
+  infra_env_id:
+    description:
+      - The ID of the infrastructure environment whose events are retrieved.
+    type: str
+    required: false
+  host_id:
+    description:
+      - The ID of the host whose events are retrieved.
+    type: str
+    required: false
+  severities:
+    description:
+      - Only retrieve events of these severities.
+    type: list
+    elements: str
+    required: false
+    choices: ["info", "warning", "error", "critical"]
+  categories:
+    description:
+      - Only retrieve events of these categories.
+    type: list
+    elements: str
+    required: false
+    choices: ["user", "metrics"]
+  since:
+    description:
+      - The I(next_cursor) returned by an earlier run, or any RFC 3339 timestamp, e.g. C(2024-06-01T12:00:00Z).
+      - Only the events emitted after it are retrieved. All events are retrieved when not set, up to I(buffer_size).
+    type: str
+    required: false
+  follow:
+    description:
+      - Number of seconds to keep polling for new events after the first request.
+      - Events are polled every few seconds while new ones arrive, and less often while none do.
+    type: int
+    required: false
+    default: 0
+  buffer_size:
+    description:
+      - Maximum number of events returned. When more events were emitted since I(since), the oldest are skipped and I(truncated) is set.
+      - While following, the events are kept in a ring buffer of this size, the oldest being dropped first.
+    type: int
+    required: false
+    default: 1000
+  page_size:
+    description:
+      - Number of events requested at a time while retrieving the events emitted since I(since).
+    type: int
+    required: false
+    default: 100
+  offline_token:
+    description:
+      - Offline token for authentication with the Red Hat Assisted Installer API.
+    type: str
+    required: false
+    no_log: true
+  pull_secret:
+    description:
+      - Pull secret for authentication with the Red Hat Assisted Installer API.
+    type: str
+    required: false
+    no_log: true
+extends_documentation_fragment:
+  - justinbatchelor.redhat_assisted_installer.client
+author:
+  - Justin Batchelor (@justinbatchelor)
+'''
+
+EXAMPLES = r'''
+- name: Retrieve the latest events of a cluster
+  justinbatchelor.redhat_assisted_installer.events_info:
+    cluster_id: "your_cluster_id"
+    buffer_size: 50
+  register: events
+
+- name: Retrieve the warnings and errors emitted since the last run
+  justinbatchelor.redhat_assisted_installer.events_info:
+    cluster_id: "your_cluster_id"
+    severities:
+      - warning
+      - error
+    since: "{{ events['next_cursor'] }}"
+  register: events
+
+- name: Tail the events of an installation for five minutes
+  justinbatchelor.redhat_assisted_installer.events_info:
+    cluster_id: "your_cluster_id"
+    since: "{{ events['next_cursor'] }}"
+    follow: 300
+    buffer_size: 200
+  register: events
+'''
+
+RETURN = r'''
+api_stats:
+  description: >
+    Number of requests sent to the API and how many of them were retries.
+  returned: always
+  type: dict
+  sample:
+    requests: 3
+    retries: 0
+timings:
+  description: >
+    Number of requests, seconds and bytes per endpoint, including the SSO token exchange.
+    Ids in endpoints are replaced by placeholders so calls to one endpoint are aggregated.
+  returned: when I(debug_timings=true)
+  type: dict
+  sample:
+    requests: 4
+    seconds: 0.715
+    bytes_sent: 0
+    bytes_received: 7570
+    endpoints:
+      POST sso/token:
+        count: 1
+        errors: 0
+        seconds: 0.187
+        min: 0.187
+        max: 0.187
+        bytes_received: 3841
+        statuses:
+          "200": 1
+      GET events:
+        count: 3
+        errors: 0
+        seconds: 0.528
+        min: 0.158
+        max: 0.194
+        bytes_received: 3729
+        statuses:
+          "200": 3
+events:
+  description: >
+    The events emitted since I(since), oldest first.
+  returned: always
+  type: list
+  elements: dict
+  sample:
+    - cluster_id: "0b0a0e3e-1c8b-4b3c-9f1e-3f5f7b7c9d11"
+      event_time: "2024-06-01T12:03:10.123Z"
+      message: "Updated status of the cluster to installing"
+      name: "cluster_status_updated"
+      severity: "info"
+      category: "user"
+count:
+  description: >
+    The number of events returned by the module.
+  returned: always
+  type: int
+  sample: 1
+next_cursor:
+  description: >
+    The time of the newest event retrieved, to pass as I(since) to the next run. I(since) when no event was emitted since.
+  returned: always
+  type: str
+  sample: "2024-06-01T12:03:10.123Z"
+truncated:
+  description: >
+    Whether more events than I(buffer_size) were emitted since I(since) and the oldest of them were not retrieved.
+  returned: always
+  type: bool
+  sample: false
+dropped:
+  description: >
+    Number of events received while following that were dropped from the ring buffer by newer ones.
+  returned: always
+  type: int
+  sample: 0
+msg:
+  description: >
+    A message indicating the status of the operation.
+  returned: always
+  type: str
+  sample: "Success"
+'''
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        cluster_id=dict(type='str', required=False),
+        infra_env_id=dict(type='str', required=False),
+        host_id=dict(type='str', required=False),
+        severities=dict(type='list', elements='str', required=False, choices=['info', 'warning', 'error', 'critical']),
+        categories=dict(type='list', elements='str', required=False, choices=['user', 'metrics']),
+        since=dict(type='str', required=False),
+        follow=dict(type='int', required=False, default=0),
+        buffer_size=dict(type='int', required=False, default=DEFAULT_BUFFER_SIZE),
+        page_size=dict(type='int', required=False, default=DEFAULT_PAGE_SIZE),
+        offline_token=dict(type='str', required=False, no_log=True),
+        pull_secret=dict(type='str', required=False, no_log=True),
+    )
+    module_args.update(client_argument_spec())
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        events=[],
+        count=0,
+        next_cursor=None,
+        truncated=False,
+        dropped=0,
+        msg='',
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_one_of=[('cluster_id', 'infra_env_id', 'host_id')],
+        supports_check_mode=True
+    )
+
+    set_module_client(module.params, result)
+
+    # if the user is working with this module in only check mode we do not
+    # want to make any changes to the environment, just return the current
+    # state with no modifications
+    if module.check_mode:
+        module.exit_json(**result)
+
+    ## First we need to check if the user provided an offline token
+    if module.params['offline_token'] is not None:
+        os.environ["REDHAT_OFFLINE_TOKEN"] = module.params["offline_token"]
+
+    ## Now we need to check if the user provided a pull secret
+    if module.params['pull_secret'] is not None:
+        os.environ["REDHAT_PULL_SECRET"] = module.params["pull_secret"]
+
+    if module.params['buffer_size'] < 1 or module.params['page_size'] < 1:
+        result['msg'] = "buffer_size and page_size must be at least 1"
+        module.fail_json(**result)
+
+    filters = {key: module.params[key] for key in ('cluster_id', 'infra_env_id', 'host_id', 'severities', 'categories')
+               if module.params[key]}
+    try:
+        tail = EventTail(filters, since=module.params['since'], buffer_size=module.params['buffer_size'],
+                         page_size=module.params['page_size'])
+    except ValueError as e:
+        result['msg'] = f"Invalid since cursor: {e}"
+        module.fail_json(**result)
+
+    # without follow the poller returns after the first request
+    poller = AdaptivePoller(timeout=module.params['follow'], state_key='cursor')
+    try:
+        poller.poll(fetch=tail.fetch, state_of=lambda events: tail.cursor, is_done=lambda events: False)
+    except Exception as e:
+        result.update(events=tail.events, count=len(tail.buffer), next_cursor=tail.cursor, truncated=tail.truncated,
+                      dropped=tail.dropped, msg=f"Failed: {e}")
+        module.fail_json(**result)
+
+    result.update(events=tail.events, count=len(tail.buffer), next_cursor=tail.cursor, truncated=tail.truncated,
+                  dropped=tail.dropped, msg="Success")
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
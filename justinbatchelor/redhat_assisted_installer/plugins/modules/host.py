@@ -0,0 +1,363 @@
+#!/usr/bin/python
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+from __future__ import (absolute_import, division, print_function)
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ..module_utils.api import get_infrastructure_environement_hosts, patch_infrastructure_environment_host
+from ..module_utils.bulk import DEFAULT_MAX_WORKERS, run_bounded
+from ..module_utils.hosts import HostIndex, find_disk
+from ..module_utils.client import client_argument_spec, set_module_client
+
+import os
+
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: host
+short_description: Assign roles, hostnames and installation disks to the hosts of an infrastructure environment
+version_added: "0.0.1"
+description: >
+  This module updates the role, the requested hostname and the installation disk of many hosts discovered by the
+  Red Hat Assisted Installer in one task. The hosts of the infrastructure environment are listed once, every element
+  of hosts is resolved against that listing by id, mac address or hostname, and hosts already in the desired state
+  send no request at all. The remaining updates are sent concurrently over one authenticated connection pool.
+  A failing host does not stop the others; the results of every host are returned and the task fails
+  once all calls completed if any of them failed.
+options:
+  infra_env_id:
+    description:
+      - The ID of the infrastructure environment the hosts booted from.
+    type: str
+    required: true
+  hosts:
+    description:
+      - The hosts to update. Each host is identified by exactly one of I(id), I(mac_address) or I(name).
+    type: list
+    required: true
+    elements: dict
+    suboptions:
+      id:
+        description: ID of the host.
+        type: str
+        required: false
+      mac_address:
+        description: MAC address of any interface of the host, compared case-insensitively.
+        type: str
+        required: false
+      name:
+        description: Current hostname of the host, the one requested through the API or else the one reported by the agent.
+        type: str
+        required: false
+      role:
+        description: Role of the host in the cluster.
+        type: str
+        required: false
+        choices: ["auto-assign", "master", "worker"]
+      hostname:
+        description: Hostname to request for the host.
+        type: str
+        required: false
+      installation_disk:
+        description: Disk to install on, given by its id, e.g. C(/dev/disk/by-id/wwn-0x5000c500a0b1c2d3), its path, e.g. C(/dev/sda), or its name.
+        type: str
+        required: false
+  max_workers:
+    description:
+      - Maximum number of host updates sent to the API at the same time.
+    type: int
+    required: false
+    default: 8
+  offline_token:
+    description:
+      - Offline token for authentication with the Red Hat Assisted Installer API.
+    type: str
+    required: false
+    no_log: true
+  pull_secret:
+    description:
+      - Pull secret for authentication with the Red Hat Assisted Installer API.
+    type: str
+    required: false
+    no_log: true
+extends_documentation_fragment:
+  - justinbatchelor.redhat_assisted_installer.client
+author:
+  - Justin Batchelor (@justinbatchelor)
+'''
+
+EXAMPLES = r'''
+- name: Name the hosts after their mac address and assign their roles
+  justinbatchelor.redhat_assisted_installer.host:
+    infra_env_id: "your_infra_env_id"
+    hosts:
+      - mac_address: "52:54:00:aa:00:01"
+        hostname: "master-0"
+        role: master
+      - mac_address: "52:54:00:aa:00:02"
+        hostname: "master-1"
+        role: master
+      - mac_address: "52:54:00:aa:00:03"
+        hostname: "master-2"
+        role: master
+  register: result
+
+- name: Install the workers on their second disk
+  justinbatchelor.redhat_assisted_installer.host:
+    infra_env_id: "your_infra_env_id"
+    max_workers: 16
+    hosts: "{{ workers | map('combine', {'role': 'worker', 'installation_disk': '/dev/sdb'}) }}"
+'''
+
+RETURN = r'''
+api_stats:
+  description: >
+    Number of requests sent to the API and how many of them were retries.
+  returned: always
+  type: dict
+  sample:
+    requests: 4
+    retries: 0
+timings:
+  description: >
+    Number of requests, seconds and bytes per endpoint, including the SSO token exchange.
+    Ids in endpoints are replaced by placeholders so calls to one endpoint are aggregated.
+  returned: when I(debug_timings=true)
+  type: dict
+  sample:
+    requests: 5
+    seconds: 1.384
+    bytes_sent: 186
+    bytes_received: 58622
+    endpoints:
+      POST sso/token:
+        count: 1
+        errors: 0
+        seconds: 0.187
+        min: 0.187
+        max: 0.187
+        bytes_received: 3841
+        statuses:
+          "200": 1
+      GET infra-envs/{infra_env_id}/hosts:
+        count: 1
+        errors: 0
+        seconds: 0.243
+        min: 0.243
+        max: 0.243
+        bytes_received: 27391
+        statuses:
+          "200": 1
+      PATCH infra-envs/{infra_env_id}/hosts/{host_id}:
+        count: 3
+        errors: 0
+        seconds: 0.954
+        min: 0.286
+        max: 0.35
+        bytes_received: 27390
+        statuses:
+          "201": 3
+results:
+  description: >
+    One entry per element of hosts, in the same order, describing what was done to the host.
+    Updated hosts list the attributes that differed in changes. host is the host returned by the API, without its inventory.
+  returned: always
+  type: list
+  elements: dict
+  sample:
+    - id: "4c2f7c1e-0c5e-4b0e-9a55-1f0e6d3b2a10"
+      mac_address: "52:54:00:aa:00:01"
+      changed: true
+      failed: false
+      msg: "Successfully updated the host: 4c2f7c1e-0c5e-4b0e-9a55-1f0e6d3b2a10"
+      changes:
+        - "hostname"
+        - "role"
+      host:
+        id: "4c2f7c1e-0c5e-4b0e-9a55-1f0e6d3b2a10"
+        requested_hostname: "master-0"
+        role: "master"
+summary:
+  description: >
+    Number of hosts updated, left unchanged and failed.
+  returned: always
+  type: dict
+  sample:
+    updated: 2
+    unchanged: 1
+    failed: 0
+msg:
+  description: >
+    Message indicating the status of the operation.
+  returned: always
+  type: str
+  sample: "Processed 3 hosts: 2 updated, 1 unchanged, 0 failed."
+'''
+
+SUCCESS_PATCH_CODE = 201
+
+# the options identifying a host, in the order they are looked up
+HOST_KEYS = ('id', 'mac_address', 'name')
+
+
+def host_view(host: dict) -> dict:
+    """
+    Returns a host without its inventory, which is large and not needed to tell what was updated.
+    """
+    return {key: value for key, value in host.items() if key != 'inventory'}
+
+def plan_host(item: dict, hosts: HostIndex, targets: set) -> dict:
+    """
+    Decides which attributes of one element of hosts differ from the host, and the PATCH params setting them.
+
+    Returns:
+        dict: The result entry of the element, with the params to send when the host is not in the desired state.
+    """
+    entry = dict(
+        id=item.get('id'),
+        mac_address=item.get('mac_address'),
+        name=item.get('name'),
+        changed=False,
+        failed=False,
+        msg='',
+        changes=[],
+        host={},
+    )
+
+    def fail(msg):
+        entry.update(failed=True, msg=msg)
+        return entry
+
+    key = next(key for key in HOST_KEYS if item.get(key) is not None)
+    found = hosts.find(**{'hostname' if key == 'name' else key: item[key]})
+    if not found:
+        return fail(f"No host with {key} {item[key]} in the infrastructure environment")
+    if len(found) > 1:
+        return fail(f"{len(found)} hosts have {key} {item[key]}: {', '.join(str(host.get('id')) for host in found)}")
+
+    host = found[0]
+    if host['id'] in targets:
+        return fail(f"The host is listed more than once: {host['id']}")
+    targets.add(host['id'])
+    entry.update(id=host['id'], host=host_view(host))
+
+    params = {}
+    if item.get('role') is not None and host.get('role') != item['role']:
+        params['host_role'] = item['role']
+        entry['changes'].append('role')
+    if item.get('hostname') is not None and host.get('requested_hostname') != item['hostname']:
+        params['host_name'] = item['hostname']
+        entry['changes'].append('hostname')
+    if item.get('installation_disk') is not None:
+        disk = find_disk(hosts.inventory(host), item['installation_disk'])
+        if disk is None:
+            return fail(f"The host has no disk {item['installation_disk']}: {host['id']}")
+        if host.get('installation_disk_id') != disk.get('id'):
+            params['disks_selected_config'] = [dict(id=disk.get('id'), role='install')]
+            entry['changes'].append('installation_disk')
+
+    if not params:
+        entry['msg'] = f"The host is up to date: {host['id']}"
+        return entry
+    entry['params'] = params
+    return entry
+
+def run_module():
+    host_options = dict(
+        id=dict(type='str', required=False),
+        mac_address=dict(type='str', required=False),
+        name=dict(type='str', required=False),
+        role=dict(type='str', required=False, choices=['auto-assign', 'master', 'worker']),
+        hostname=dict(type='str', required=False),
+        installation_disk=dict(type='str', required=False),
+    )
+
+    module_args = dict(
+        infra_env_id=dict(type='str', required=True),
+        hosts=dict(type='list', elements='dict', required=True, options=host_options,
+                   mutually_exclusive=[HOST_KEYS], required_one_of=[HOST_KEYS]),
+        max_workers=dict(type='int', required=False, default=DEFAULT_MAX_WORKERS),
+        offline_token=dict(type='str', required=False, no_log=True),
+        pull_secret=dict(type='str', required=False, no_log=True),
+    )
+    module_args.update(client_argument_spec())
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        msg='',
+        results=[],
+        summary=dict(updated=0, unchanged=0, failed=0),
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    set_module_client(module.params, result)
+
+    ## First we need to check if the user provided an offline token
+    if module.params['offline_token'] is not None:
+        os.environ["REDHAT_OFFLINE_TOKEN"] = module.params["offline_token"]
+
+    ## Now we need to check if the user provided a pull secret
+    if module.params['pull_secret'] is not None:
+        os.environ["REDHAT_PULL_SECRET"] = module.params["pull_secret"]
+
+    infra_env_id = module.params['infra_env_id']
+
+    # one listing resolves every host, whatever it is identified by
+    try:
+        response = get_infrastructure_environement_hosts(infra_env_id=infra_env_id)
+        response.raise_for_status()
+        hosts = HostIndex(response.json())
+    except Exception as e:
+        result['msg'] = f"Failed to get the hosts of the infrastructure environment {infra_env_id}: {e}"
+        module.fail_json(**result)
+
+    targets = set()
+    entries = [plan_host(item, hosts, targets) for item in module.params['hosts']]
+    pending = [entry for entry in entries if 'params' in entry]
+
+    def apply_host(entry: dict) -> dict:
+        response = patch_infrastructure_environment_host(infra_env_id, entry['id'], entry['params'])
+        if response.status_code != SUCCESS_PATCH_CODE:
+            raise Exception(f'Failed to patch the host: {response.text}')
+        return response.json()
+
+    if module.check_mode:
+        for entry in pending:
+            entry.update(changed=True, msg=f"The host would be updated: {entry['id']}")
+    else:
+        outcomes = run_bounded(apply_host, pending, module.params['max_workers'])
+        for entry, (host, error) in zip(pending, outcomes):
+            if error is not None:
+                entry.update(failed=True, msg=str(error))
+                continue
+            entry.update(changed=True, host=host_view(host), msg=f"Successfully updated the host: {entry['id']}")
+
+    for entry in entries:
+        updated = 'params' in entry
+        entry.pop('params', None)
+        result['summary']['failed' if entry['failed'] else 'updated' if updated else 'unchanged'] += 1
+
+    summary = result['summary']
+    result['results'] = entries
+    result['changed'] = any(entry['changed'] for entry in entries)
+    result['msg'] = (f"Processed {len(entries)} hosts: {summary['updated']} updated, "
+                     f"{summary['unchanged']} unchanged, {summary['failed']} failed.")
+
+    if summary['failed'] > 0:
+        module.fail_json(**result)
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
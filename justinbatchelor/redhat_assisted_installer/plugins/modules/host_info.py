@@ -5,8 +5,11 @@ from __future__ import (absolute_import, division, print_function)
 
 from ansible.module_utils.basic import AnsibleModule
 
-from ..module_utils.api import *
-from ..module_utils.tools import *
+from ..module_utils.api import get_infrastructure_environement_host, get_infrastructure_environement_hosts
+from ..module_utils.tools import jmespath_search
+from ..module_utils.client import client_argument_spec, set_module_client
+
+import os
 
 __metaclass__ = type
 
@@ -18,6 +21,7 @@ version_added: "0.0.1"
 description: >
   This module communicates with the Red Hat Assisted Installer to gather information about OpenShift agents.
   It can retrieve data for all hosts within a specified infrastructure environment or a specific host.
+  It can also wait in one process until enough hosts booted from the discovery image registered and reached a status.
 options:
   infra_env_id:
     description:
@@ -41,6 +45,31 @@ options:
     type: str
     required: false
     no_log: true
+  query:
+    description:
+      - JMESPath expression applied to the list of hosts before it is returned, e.g. C([?status=='known']).
+    type: str
+    required: false
+  wait_for_count:
+    description:
+      - Wait until at least this many hosts registered in the infrastructure environment and are in one of I(wait_for_status).
+      - The hosts are listed every few seconds while hosts register or change status, and less often while nothing changes.
+    type: int
+    required: false
+  wait_for_status:
+    description:
+      - Host statuses the hosts are awaited in, e.g. C(known) once they passed their validations. Any status when not set.
+      - Without I(wait_for_count), wait until every registered host, and at least one, is in one of these statuses.
+    type: list
+    elements: str
+    required: false
+  wait_timeout:
+    description: Maximum number of seconds to wait for the hosts, the module fails when they did not arrive by then.
+    type: int
+    required: false
+    default: 3600
+extends_documentation_fragment:
+  - justinbatchelor.redhat_assisted_installer.client
 author:
   - Justin Batchelor (@justinbatchelor)
 '''
@@ -57,9 +86,56 @@ EXAMPLES = r'''
     host_id: "your_host_id"
   register: host
 
+- name: Wait until the three hosts booted from the discovery image passed their validations
+  justinbatchelor.redhat_assisted_installer.host_info:
+    infra_env_id: "your_infra_env_id"
+    wait_for_count: 3
+    wait_for_status:
+      - known
+    wait_timeout: 1800
+  register: hosts
+
 '''
 
 RETURN = r'''
+api_stats:
+  description: >
+    Number of requests sent to the API and how many of them were retries.
+  returned: always
+  type: dict
+  sample:
+    requests: 1
+    retries: 0
+timings:
+  description: >
+    Number of requests, seconds and bytes per endpoint, including the SSO token exchange.
+    Ids in endpoints are replaced by placeholders so calls to one endpoint are aggregated.
+  returned: when I(debug_timings=true)
+  type: dict
+  sample:
+    requests: 2
+    seconds: 0.43
+    bytes_sent: 0
+    bytes_received: 31232
+    endpoints:
+      POST sso/token:
+        count: 1
+        errors: 0
+        seconds: 0.187
+        min: 0.187
+        max: 0.187
+        bytes_received: 3841
+        statuses:
+          "200": 1
+      GET infra-envs/{infra_env_id}/hosts:
+        count: 1
+        errors: 0
+        seconds: 0.243
+        min: 0.243
+        max: 0.243
+        bytes_received: 27391
+        statuses:
+          "200": 1
 host_info:
   description: >
     A list containing information about the hosts retrieved from the Red Hat Assisted Installer.
@@ -70,6 +146,36 @@ host_info:
     - id: "123"
       name: "host1"
       status: "active"
+host_arrivals:
+  description: >
+    Every host seen while waiting, in the order they registered, with the time they were first seen and the
+    time they were first seen in one of I(wait_for_status), and the seconds elapsed since the wait started.
+  returned: when I(wait_for_count) or I(wait_for_status) is set
+  type: list
+  elements: dict
+  sample:
+    - id: "4c2f7c1e-0c5e-4b0e-9a55-1f0e6d3b2a10"
+      hostname: "master-0"
+      status: "known"
+      registered_at: "2024-06-01T12:00:00+00:00"
+      registered_elapsed: 0.0
+      ready_at: "2024-06-01T12:02:15+00:00"
+      ready_elapsed: 135.2
+status_timeline:
+  description: >
+    The number of hosts per status every time it changed while waiting, with the time and the seconds elapsed since the wait started.
+  returned: when I(wait_for_count) or I(wait_for_status) is set
+  type: list
+  elements: dict
+  sample:
+    - statuses:
+        discovering: 2
+      at: "2024-06-01T12:00:00+00:00"
+      elapsed: 0.0
+    - statuses:
+        known: 3
+      at: "2024-06-01T12:02:15+00:00"
+      elapsed: 135.2
 count:
   description: >
     The number of hosts returned by the module.
@@ -85,14 +191,76 @@ msg:
 '''
 
 
+def status_counts(hosts: list) -> dict:
+    """
+    Returns the number of hosts in every status, the state whose changes reset the polling interval.
+    """
+    counts = {}
+    for host in hosts:
+        counts[host.get('status')] = counts.get(host.get('status'), 0) + 1
+    return dict(sorted(counts.items(), key=lambda item: str(item[0])))
+
+def wait_for_hosts(module: AnsibleModule, result: dict) -> list:
+    """
+    Lists the hosts of the infrastructure environment in this process until enough of them are in the awaited statuses.
+
+    Returns:
+        list: The hosts of the last listing.
+    """
+    # the polling helpers are only loaded by the tasks that wait, a plain lookup does not pay for them
+    from ..module_utils.hosts import HostArrivals
+    from ..module_utils.polling import AdaptivePoller
+
+    infra_env_id = module.params['infra_env_id']
+    count = module.params['wait_for_count']
+    arrivals = HostArrivals(module.params['wait_for_status'])
+    # the matching hosts of the last listing, so the condition is evaluated once per poll
+    matching = []
+
+    def fetch_hosts():
+        response = get_infrastructure_environement_hosts(infra_env_id=infra_env_id)
+        response.raise_for_status()
+        hosts = response.json()
+        matching[:] = arrivals.update(hosts)
+        return hosts
+
+    def hosts_arrived(hosts):
+        if count is not None:
+            return len(matching) >= count
+        return bool(hosts) and len(matching) == len(hosts)
+
+    poller = AdaptivePoller(timeout=module.params['wait_timeout'], state_key='statuses')
+    try:
+        outcome, hosts = poller.poll(fetch=fetch_hosts, state_of=status_counts, is_done=hosts_arrived)
+    except Exception as e:
+        result.update(status_timeline=poller.timeline, host_arrivals=arrivals.arrivals, msg=f"Failed: {e}")
+        module.fail_json(**result)
+
+    result.update(status_timeline=poller.timeline, host_arrivals=arrivals.arrivals)
+    awaited = f"{count} hosts" if count is not None else "every host"
+    if module.params['wait_for_status']:
+        awaited += f" in status {', '.join(module.params['wait_for_status'])}"
+    if outcome == "timeout":
+        result.update(host_info=hosts, count=len(hosts),
+                      msg=f"Timed out after {module.params['wait_timeout']} seconds waiting for {awaited}, {len(matching)} of {len(hosts)} hosts matched")
+        module.fail_json(**result)
+
+    result['msg'] = f"Success, {awaited} arrived after {arrivals.stamp()['elapsed']} seconds"
+    return hosts
+
 def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
         infra_env_id = dict(type='str', default=None, required=True),
         host_id = dict(type='str', default=None),
+        query=dict(type='str', required=False),
+        wait_for_count=dict(type='int', required=False),
+        wait_for_status=dict(type='list', elements='str', required=False),
+        wait_timeout=dict(type='int', required=False, default=3600),
         offline_token=dict(type='str', required=False, no_log=True),
         pull_secret=dict(type='str', required=False, no_log=True),
     )
+    module_args.update(client_argument_spec())
 
     # seed the result dict in the object
     # we primarily care about changed and state
@@ -112,9 +280,12 @@ def run_module():
     # supports check mode
     module = AnsibleModule(
         argument_spec=module_args,
+        mutually_exclusive=[('host_id', 'wait_for_count'), ('host_id', 'wait_for_status')],
         supports_check_mode=True
     )
 
+    set_module_client(module.params, result)
+
     # if the user is working with this module in only check mode we do not
     # want to make any changes to the environment, just return the current
     # state with no modifications
@@ -130,6 +301,14 @@ def run_module():
     if module.params['pull_secret'] is not None:
         os.environ["REDHAT_PULL_SECRET"] = module.params["pull_secret"]
 
+    if module.params['wait_for_count'] is not None or module.params['wait_for_status']:
+        result['host_info'] = wait_for_hosts(module, result)
+        result['count'] = len(result['host_info'])
+        if module.params['query'] is not None:
+            result['host_info'] = jmespath_search(module.params['query'], result['host_info'])
+            result['count'] = len(result['host_info']) if isinstance(result['host_info'], list) else 1
+        module.exit_json(**result)
+
     try:
         api_response = None
         if module.params['host_id'] is None:
@@ -137,8 +316,12 @@ def run_module():
         else:
             api_response = get_infrastructure_environement_host(infra_env_id=module.params['infra_env_id'], host_id=module.params['host_id'])
         api_response.raise_for_status()
-        result['host_info'] = [api_response.json()] if isinstance(api_response.json, dict) else api_response.json()
+        result['host_info'] = [api_response.json()] if isinstance(api_response.json(), dict) else api_response.json()
         result['count'] = len([api_response.json()]) if isinstance(api_response.json(), dict) else len(api_response.json())
+        if module.params['query'] is not None:
+            # the expression is compiled once and cached, so repeated queries do not re-parse it
+            result['host_info'] = jmespath_search(module.params['query'], result['host_info'])
+            result['count'] = len(result['host_info']) if isinstance(result['host_info'], list) else 1
         result['msg'] = "Success"
         module.exit_json(**result) 
 
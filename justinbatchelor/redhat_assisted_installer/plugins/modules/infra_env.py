@@ -4,9 +4,15 @@
 from __future__ import (absolute_import, division, print_function)
 
 from ansible.module_utils.basic import AnsibleModule
-from ..module_utils.api import *
-from ..module_utils.tools import *
-from ..module_utils.schema.infra_env import *
+from ..module_utils.api import INFRA_ENV_PATCH_PARAMS, delete_infrastructure_environment, patch_infrastructure_environment, post_infrastructure_environment
+from ..module_utils.params import (create_additional_ntp_sources_from_params, create_kernel_arguments_from_module_params,
+                                   create_proxy_from_module_params, create_static_network_config_from_module_params)
+from ..module_utils.diff import ObjectDiff
+from ..module_utils.state import infra_env_state_store, params_fingerprint
+from ..module_utils.client import client_argument_spec, set_module_client
+from ..module_utils.resolver import infra_env_resolver
+from ..module_utils.schema.infra_env import InfraEnv
+from ..module_utils.validation import validate_params
 import os, json
 
 __metaclass__ = type
@@ -23,6 +29,8 @@ requirements:
   - requests==2.32.3
   - ansible==10.1.0
   - jmespath==1.0.1
+extends_documentation_fragment:
+  - justinbatchelor.redhat_assisted_installer.client
 author:
   - Justin Batchelor (@justinbatchelor)
 options:
@@ -171,6 +179,53 @@ EXAMPLES = r'''
 '''
 
 RETURN = r'''
+api_stats:
+  description: >
+    Number of requests sent to the API and how many of them were retries.
+  returned: always
+  type: dict
+  sample:
+    requests: 2
+    retries: 0
+timings:
+  description: >
+    Number of requests, seconds and bytes per endpoint, including the SSO token exchange.
+    Ids in endpoints are replaced by placeholders so calls to one endpoint are aggregated.
+  returned: when I(debug_timings=true)
+  type: dict
+  sample:
+    requests: 3
+    seconds: 1.038
+    bytes_sent: 2913
+    bytes_received: 17677
+    endpoints:
+      POST sso/token:
+        count: 1
+        errors: 0
+        seconds: 0.187
+        min: 0.187
+        max: 0.187
+        bytes_received: 3841
+        statuses:
+          "200": 1
+      GET infra-envs:
+        count: 1
+        errors: 0
+        seconds: 0.264
+        min: 0.264
+        max: 0.264
+        bytes_received: 11072
+        statuses:
+          "200": 1
+      POST infra-envs:
+        count: 1
+        errors: 0
+        seconds: 0.587
+        min: 0.587
+        max: 0.587
+        bytes_received: 2764
+        statuses:
+          "201": 1
 infra_env:
   description: >
     Details of the created, updated, or deleted infrastructure environment.
@@ -181,6 +236,25 @@ infra_env:
     - id: "123"
       name: "my-infra-env"
       status: "active"
+desired_state:
+  description: >
+    Fingerprint of the desired parameters, whether the infrastructure environment was already known to be in that state because
+    an earlier run applied the same parameters and the API reports no update since, in which case it was neither
+    diffed nor patched. Fingerprints are kept next to the name index when REDHAT_CACHE_DIR is set.
+  returned: when the infrastructure environment already exists and state is present
+  type: dict
+  sample:
+    fingerprint: "5f2b7c1e9a0d4b3c8e6f1a2d7c9b0e4f3a6d8c1b2e5f7a9d0c3b6e8f1a4d7c2b"
+    current: true
+validation_errors:
+  description: >
+    The values that do not match the API schema, e.g. an invalid kernel argument or MAC address, which were not sent to the API.
+  returned: when a value does not match the API schema
+  type: list
+  elements: str
+  sample:
+    - "kernel_arguments[0].value: 'rd.net.timeout.carrier=60 ' does not match the pattern of the API"
+    - "static_network_config[0].mac_interface_map[0].mac_address: '52:54:00:aa:00' does not match the pattern of the API"
 msg:
   description: >
     Message indicating the status of the operation.
@@ -241,6 +315,7 @@ def run_module():
             network_yaml=dict(type='str', required=True)
         )),
     )
+    module_args.update(client_argument_spec())
 
     # seed the result dict in the object
     # we primarily care about changed and state
@@ -262,6 +337,8 @@ def run_module():
         supports_check_mode=True
     )
 
+    set_module_client(module.params, result)
+
     ## First we need to check if the user provided an offline token 
     if module.params['offline_token'] is not None:
         os.environ["REDHAT_OFFLINE_TOKEN"] = module.params["offline_token"]
@@ -270,19 +347,6 @@ def run_module():
     if module.params['pull_secret'] is not None:
         os.environ["REDHAT_PULL_SECRET"] = module.params["pull_secret"]
 
-    # get all infrastructure environment api response
-    get_infras_resposne = get_infrastructure_environements()
-
-    if get_infras_resposne.status_code != SUCCESS_GET_CODE:
-        # update results with failed message from api
-        format_module_results(results=result, 
-                              msg=f"Failed to get infrastructure environments {get_infras_resposne.json()}",
-                              changed=False,
-                              infra_env=[]
-                              )
-        # fail module
-        module.fail_json(**result)
-
     # check that a name or id was provided, fail if not
     if module.params['infra_env_id'] is None and module.params['name'] is None:
        format_module_results(results=result,
@@ -291,13 +355,8 @@ def run_module():
                       infra_env=[])
        module.fail_json(**result)
 
-
-    filtered_response = jmespath_id_validator(module.params['infra_env_id'], get_infras_resposne.json()) if module.params['infra_env_id'] is not None else jmespath_name_validator(module.params['name'], get_infras_resposne.json())
-        
-
-    # user defined a state of present
+    # params the api would reject are reported before any request is sent
     if module.params['state'] == "present":
-
         infra_env = InfraEnv(
             additional_ntp_sources=create_additional_ntp_sources_from_params(module.params['additional_ntp_sources']),
             additional_trust_bundle=module.params['additional_trust_bundle'],
@@ -313,6 +372,34 @@ def run_module():
             ssh_authorized_key=module.params['ssh_authorized_key'],
             static_network_config=create_static_network_config_from_module_params(module.params['static_network_config']),
         )
+        validation_errors = validate_params("infra_env", infra_env.create_params())
+        if validation_errors:
+            result['validation_errors'] = validation_errors
+            format_module_results(results=result,
+                                  msg=f"Invalid infrastructure environment configuration: {'; '.join(validation_errors)}",
+                                  changed=False,
+                                  infra_env=[])
+            module.fail_json(**result)
+
+    # find the infrastructure environment by id, or by name through the name index
+    resolver = infra_env_resolver()
+    # fingerprints of the params applied by earlier runs, to skip objects nobody changed since
+    state = infra_env_state_store()
+    try:
+        filtered_response = resolver.resolve(obj_id=module.params['infra_env_id'], name=module.params['name'])
+    except Exception as e:
+        # update results with failed message from api
+        format_module_results(results=result, 
+                              msg=f"Failed to get infrastructure environments {e}",
+                              changed=False,
+                              infra_env=[]
+                              )
+        # fail module
+        module.fail_json(**result)
+
+    # user defined a state of present
+    if module.params['state'] == "present":
+        fingerprint = params_fingerprint(infra_env.create_params(), InfraEnv.fields)
         
         if len(filtered_response) == 0:
             create_infra_response = post_infrastructure_environment(infra_env=infra_env)
@@ -324,6 +411,8 @@ def run_module():
                                       )
                 module.fail_json(**result)
               
+            resolver.remember(create_infra_response.json())
+            state.record(create_infra_response.json(), fingerprint)
             format_module_results(results=result,
                                   msg=f"Successfully created the infrastructure environment: {create_infra_response.json()['id']}",
                                   changed=True,
@@ -332,9 +421,32 @@ def run_module():
             module.exit_json(**result)
 
         elif len(filtered_response) == 1:
-            modified_params = remove_matching_pairs(infra_env.create_params(), filtered_response[0])
-            result['msg'] = modified_params
-            patch_infra_response = patch_infrastructure_environment(filtered_response[0]['id'], modified_params)
+            # params applied by an earlier run are still in place when the api reports no update since,
+            # so neither the diff nor the PATCH is needed
+            current = state.is_current(filtered_response[0], fingerprint)
+            result['desired_state'] = dict(fingerprint=fingerprint, current=current)
+            # compare only what the PATCH endpoint accepts, normalized as described by the schema
+            infra_env_diff = None if current else ObjectDiff(infra_env.create_params(), filtered_response[0], InfraEnv.fields, INFRA_ENV_PATCH_PARAMS)
+            if module._diff:
+                result['diff'] = infra_env_diff.ansible_diff() if not current else dict(before={}, after={})
+            if current or not infra_env_diff:
+                if not current:
+                    state.record(filtered_response[0], fingerprint)
+                format_module_results(results=result,
+                                      msg=f"The infrastructure environment is up to date: {filtered_response[0]['id']}",
+                                      changed=False,
+                                      infra_env=[filtered_response[0]],
+                                      )
+                module.exit_json(**result)
+            if module.check_mode:
+                format_module_results(results=result,
+                                      msg=f"The infrastructure environment would be patched: {filtered_response[0]['id']}",
+                                      changed=True,
+                                      infra_env=[filtered_response[0]],
+                                      )
+                module.exit_json(**result)
+
+            patch_infra_response = patch_infrastructure_environment(filtered_response[0]['id'], infra_env_diff.params)
             if patch_infra_response.status_code != SUCCESS_PATCH_CODE:
                 format_module_results(results=result,
                                       msg=f'Failed to patch the infrastructure environment: {patch_infra_response.json()}',
@@ -342,6 +454,7 @@ def run_module():
                                       changed=False,
                                       )
                 module.fail_json(**result)
+            state.record(patch_infra_response.json(), fingerprint)
             format_module_results(results=result,
                                   msg=f"Successfully patched the infrastructure environment: {patch_infra_response.json()['id']}",
                                   changed=True,
@@ -366,6 +479,8 @@ def run_module():
 
         elif len(filtered_response) == 1:
             if delete_infrastructure_environment(infra_env_id=filtered_response[0]['id']):
+                resolver.forget(filtered_response[0]['id'])
+                state.discard(filtered_response[0]['id'])
                 format_module_results(results=result, 
                                       msg=result['msg'] + f"Successfully deleted infrastructure environment: {filtered_response[0]['id']}\n",
                                       changed=True,
@@ -4,8 +4,11 @@
 from __future__ import (absolute_import, division, print_function)
 
 from ansible.module_utils.basic import AnsibleModule
-from ..module_utils.api import *
-from ..module_utils.tools import *
+from ..module_utils.api import get_infrastructure_environement, get_infrastructure_environements
+from ..module_utils.tools import filter_objects, jmespath_search, project_fields
+from ..module_utils.client import client_argument_spec, set_module_client
+
+import os
 
 __metaclass__ = type
 
@@ -23,6 +26,35 @@ options:
       - ID for the assisted installer managed infrastructure environment.
     type: str
     required: false
+  query:
+    description:
+      - JMESPath expression applied to the list of infrastructure environments before it is returned, e.g. C([?cpu_architecture=='x86_64']).
+    type: str
+    required: false
+  owner:
+    description:
+      - Only return the infrastructure environments owned by this user. The filter is applied by the API.
+    type: str
+    required: false
+  cluster_id:
+    description:
+      - Only return the infrastructure environments bound to this cluster. The filter is applied by the API.
+    type: str
+    required: false
+  name:
+    description:
+      - Only return the infrastructure environments with this name.
+    type: str
+    required: false
+  fields:
+    description:
+      - Only return these top level attributes of every infrastructure environment, e.g. C([id, name, download_url]).
+      - Keeps the result small when listing many infrastructure environments. I(query) is applied to the projected objects.
+    type: list
+    elements: str
+    required: false
+extends_documentation_fragment:
+  - justinbatchelor.redhat_assisted_installer.client
 author:
   - Justin Batchelor (@justinbatchelor)
 '''
@@ -44,9 +76,56 @@ EXAMPLES = r'''
 
 - debug:
     msg: "{{ specific_infra_env }}"
+
+# Retrieve the id and download url of the infrastructure environments of a cluster
+- name: Get the infra_env objects of a cluster
+  justinbatchelor.redhat_assisted_installer.infra_env_info:
+    cluster_id: "abcdefgh-ijkl-mnop-qrst-xxxxxxxxxxxx"
+    fields:
+      - id
+      - download_url
+  register: cluster_infra_envs
 '''
 
 RETURN = r'''
+api_stats:
+  description: >
+    Number of requests sent to the API and how many of them were retries.
+  returned: always
+  type: dict
+  sample:
+    requests: 1
+    retries: 0
+timings:
+  description: >
+    Number of requests, seconds and bytes per endpoint, including the SSO token exchange.
+    Ids in endpoints are replaced by placeholders so calls to one endpoint are aggregated.
+  returned: when I(debug_timings=true)
+  type: dict
+  sample:
+    requests: 2
+    seconds: 0.451
+    bytes_sent: 0
+    bytes_received: 14913
+    endpoints:
+      POST sso/token:
+        count: 1
+        errors: 0
+        seconds: 0.187
+        min: 0.187
+        max: 0.187
+        bytes_received: 3841
+        statuses:
+          "200": 1
+      GET infra-envs:
+        count: 1
+        errors: 0
+        seconds: 0.264
+        min: 0.264
+        max: 0.264
+        bytes_received: 11072
+        statuses:
+          "200": 1
 infra_env_info:
   description: >
     List of infrastructure environment information retrieved from the Red Hat Assisted Installer.
@@ -75,9 +154,15 @@ def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
         infra_env_id = dict(type='str', default=None),
+        query=dict(type='str', required=False),
+        owner=dict(type='str', required=False),
+        cluster_id=dict(type='str', required=False),
+        name=dict(type='str', required=False),
+        fields=dict(type='list', elements='str', required=False),
         offline_token=dict(type='str', required=False, no_log=True),
         pull_secret=dict(type='str', required=False, no_log=True),
     )
+    module_args.update(client_argument_spec())
 
     # seed the result dict in the object
     # we primarily care about changed and state
@@ -100,6 +185,8 @@ def run_module():
         supports_check_mode=True
     )
 
+    set_module_client(module.params, result)
+
     # if the user is working with this module in only check mode we do not
     # want to make any changes to the environment, just return the current
     # state with no modifications
@@ -118,12 +205,21 @@ def run_module():
     try:
         api_response = None
         if module.params['infra_env_id'] is None:
-            api_response = get_infrastructure_environements()
+            api_response = get_infrastructure_environements(cluster_id=module.params['cluster_id'], owner=module.params['owner'])
         else:
             api_response = get_infrastructure_environement(infra_env_id=module.params["infra_env_id"])
         api_response.raise_for_status()
-        result['infra_env_info'] = [api_response.json()] if isinstance(api_response.json(), dict) else api_response.json()
-        result['count'] = len([api_response.json()]) if isinstance(api_response.json(), dict) else len(api_response.json())
+        data = api_response.json()
+        result['infra_env_info'] = [data] if isinstance(data, dict) else data
+        # filters the api cannot apply and the projection run before the query, which sees their result
+        result['infra_env_info'] = filter_objects(result['infra_env_info'], name=module.params['name'])
+        if module.params['fields']:
+            result['infra_env_info'] = project_fields(result['infra_env_info'], module.params['fields'])
+        result['count'] = len(result['infra_env_info'])
+        if module.params['query'] is not None:
+            # the expression is compiled once and cached, so repeated queries do not re-parse it
+            result['infra_env_info'] = jmespath_search(module.params['query'], result['infra_env_info'])
+            result['count'] = len(result['infra_env_info']) if isinstance(result['infra_env_info'], list) else 1
         result['msg'] = "Success"
         module.exit_json(**result) 
 
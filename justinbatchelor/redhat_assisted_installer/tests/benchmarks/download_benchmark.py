@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Compares single stream and parallel ranged downloads against a local HTTP stand-in.
+
+The stand-in serves one in-memory object with range support and caps the bandwidth of
+every connection, the way CDNs and object stores serving the discovery ISO do, so the
+gain from fetching several ranges at once shows up without leaving the machine.
+
+    python tests/benchmarks/download_benchmark.py --size-mb 256 --rate-mb 32 --connections 1 4 8
+"""
+import argparse, hashlib, importlib, json, os, re, sys, tempfile, threading, time, types
+
+import requests
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+MODULE_UTILS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "plugins", "module_utils")
+
+
+def load_download():
+    # load module_utils as a package so its relative imports resolve without installing the collection
+    package = types.ModuleType("assisted_module_utils")
+    package.__path__ = [os.path.normpath(MODULE_UTILS)]
+    sys.modules.setdefault("assisted_module_utils", package)
+    return importlib.import_module("assisted_module_utils.download")
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = self.server.body
+        start, end = 0, len(body) - 1
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end + 1 - start))
+        self.end_headers()
+
+        # throttle every connection to the configured rate in 64 KiB slices
+        slice_size = 64 * 1024
+        started = time.monotonic()
+        sent = 0
+        for offset in range(start, end + 1, slice_size):
+            data = body[offset:min(offset + slice_size, end + 1)]
+            self.wfile.write(data)
+            sent += len(data)
+            ahead = sent / self.server.rate - (time.monotonic() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+def serve(body: bytes, rate: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    server.daemon_threads = True
+    server.body = body
+    server.rate = rate
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(download, url: str, dest: str, connections: int, checksum: str) -> dict:
+    with requests.Session() as session:
+        session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=max(connections, 1)))
+        downloader = download.ParallelDownloader(session, connections=connections)
+        started = time.monotonic()
+        result = downloader.download(url, dest, checksum=checksum)
+        elapsed = time.monotonic() - started
+    os.remove(dest)
+    return dict(
+        connections=result["connections"],
+        segments=result["segments"],
+        seconds=round(elapsed, 3),
+        mb_per_second=round(result["size"] / elapsed / 2 ** 20, 2),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=128, help="size of the served object")
+    parser.add_argument("--rate-mb", type=float, default=32, help="bandwidth cap of one connection in MiB/s")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    download = load_download()
+    body = os.urandom(args.size_mb * 2 ** 20)
+    checksum = hashlib.sha256(body).hexdigest()
+    server = serve(body, args.rate_mb * 2 ** 20)
+    url = f"http://127.0.0.1:{server.server_address[1]}/image.iso"
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for connections in args.connections:
+            results.append(run(download, url, os.path.join(tmp_dir, "image.iso"), connections, checksum))
+    server.shutdown()
+
+    baseline = results[0]["seconds"]
+    for entry in results:
+        entry["speedup"] = round(baseline / entry["seconds"], 2)
+    print(json.dumps(dict(size_mb=args.size_mb, rate_mb=args.rate_mb, results=results), indent=2))
+
+
+if __name__ == "__main__":
+    main()
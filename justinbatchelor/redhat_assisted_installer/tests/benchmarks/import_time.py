@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Measures the import cost of every module and fails when one exceeds its budget.
+
+Ansible ships each module with the module_utils it imports in a zip file and imports it in a
+new interpreter for every task on every host, compiling the collection's sources each time.
+This script reproduces that: every module is imported in a fresh interpreter, from a copy of
+the collection without bytecode caches. ansible.module_utils.basic and requests are loaded
+first, every module needs them anyway, so what is measured is the cost of the collection's own
+code and of the libraries it adds. import_budget.json also lists libraries a module must not
+import at all, such as yaml or jmespath for modules that never parse YAML or evaluate queries.
+
+Import times swing by a factor of two with the load of the machine, so they are not compared
+with the budgets as measured. Each run first compiles a fixed set of standard library sources,
+the same kind of work as importing the collection without bytecode, in the same interpreter.
+The median over the runs of the import time divided by that reference time, multiplied by the
+reference_ms of the budget file, is the import time the module would have on the machine the
+budgets were set on. It is compared with the budget plus the headroom of the budget file.
+
+    python tests/benchmarks/import_time.py
+    python tests/benchmarks/import_time.py --runs 10 --json
+
+The script exits with 1 when a budget is exceeded or a forbidden library is imported.
+"""
+import argparse, json, os, shutil, statistics, subprocess, sys, tempfile
+
+
+COLLECTION_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+COLLECTION_PACKAGE = "ansible_collections.justinbatchelor.redhat_assisted_installer"
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+
+# run in the fresh interpreter, prints the seconds spent compiling the reference sources and importing
+# the module, and what the module loaded
+PROBE = """
+import json, sys, time
+import ansible.module_utils.basic, requests
+import argparse, ast, dataclasses, typing
+sources = [open(module.__file__).read() for module in (argparse, ast, dataclasses, typing)]
+started = time.perf_counter()
+for source in sources:
+    compile(source, "<reference>", "exec")
+reference = time.perf_counter() - started
+before = set(sys.modules)
+started = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - started
+loaded = sorted(name for name in set(sys.modules) - before if not name.startswith("ansible_collections"))
+print(json.dumps(dict(seconds=elapsed, reference=reference, loaded=loaded)))
+"""
+
+
+def copy_collection(tmp_dir: str) -> None:
+    """
+    Copies the plugins of the collection into an ansible_collections tree without bytecode caches.
+    """
+    target = os.path.join(tmp_dir, "ansible_collections", "justinbatchelor", "redhat_assisted_installer")
+    shutil.copytree(os.path.join(COLLECTION_ROOT, "plugins"), os.path.join(target, "plugins"),
+                    ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+
+
+def measure(tmp_dir: str, module: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=tmp_dir, PYTHONDONTWRITEBYTECODE="1")
+    completed = subprocess.run([sys.executable, "-c", PROBE, f"{COLLECTION_PACKAGE}.plugins.modules.{module}"],
+                               env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def top_level(names: list) -> list:
+    return sorted({name.split(".", 1)[0] for name in names if not name.startswith("_")})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="imports per module, the median one is reported")
+    parser.add_argument("--budget-file", default=BUDGET_FILE)
+    parser.add_argument("--json", action="store_true", help="print the measurements as JSON")
+    args = parser.parse_args()
+
+    with open(args.budget_file, "r") as budget_file:
+        budgets = json.load(budget_file)
+
+    modules = sorted(name[:-3] for name in os.listdir(os.path.join(COLLECTION_ROOT, "plugins", "modules"))
+                     if name.endswith(".py") and not name.startswith("_"))
+
+    results = []
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        copy_collection(tmp_dir)
+        for module in modules:
+            runs = [measure(tmp_dir, module) for _ in range(args.runs)]
+            milliseconds = round(statistics.median(run["seconds"] for run in runs) * 1000, 2)
+            # the import time scaled to the machine the budgets were set on
+            normalized = round(statistics.median(run["seconds"] / run["reference"] for run in runs) * budgets["reference_ms"], 2)
+            libraries = top_level(lib for run in runs for lib in run["loaded"])
+
+            budget = budgets["modules"].get(module, budgets["default_ms"])
+            allowed = round(budget * (1 + budgets["headroom"]), 2)
+            forbidden = sorted(set(budgets.get("forbidden", {}).get(module, [])) & set(libraries))
+            if normalized > allowed:
+                failures.append(f"{module} imports in {normalized} ms normalized, over its budget of {budget} ms "
+                                f"plus {budgets['headroom']:.0%} headroom")
+            if forbidden:
+                failures.append(f"{module} imports {', '.join(forbidden)}, which it must not load")
+            results.append(dict(module=module, milliseconds=milliseconds, normalized_ms=normalized, budget_ms=budget,
+                                libraries=libraries))
+
+    if args.json:
+        print(json.dumps(dict(results=results, failures=failures), indent=2))
+    else:
+        for result in results:
+            print(f"{result['module']:20} {result['normalized_ms']:>8.2f} ms  (measured {result['milliseconds']:.2f} ms, "
+                  f"budget {result['budget_ms']} ms)  {' '.join(result['libraries'])}")
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+"""
+Times the modules and the module_utils hot paths against the local mock of the API.
+
+Every module runs in-process through run_module() against tests/mock/assisted_api.py seeded
+with fleets of 10, 1000 and 10000 clusters. The client singletons and the token cache are
+reset before every run, so each run pays what one task of a playbook pays: the SSO token
+exchange, the lookups, the diff and the write calls. The time spent on each HTTP route is
+recorded separately, the remainder is spent in the module itself.
+
+The pure functions the modules rely on (remove_matching_pairs, the jmespath validators,
+schema construction and the StaticNetworkConfig YAML normalization) are timed over inputs
+of the same sizes.
+
+Results are printed as JSON, write them to a file to compare two releases:
+
+    python tests/benchmarks/module_benchmark.py --output before.json
+    git checkout <other release>
+    python tests/benchmarks/module_benchmark.py --output after.json --compare before.json
+
+Point REDHAT_CACHE_DIR or REDHAT_TOKEN_CACHE_DIR at a directory to measure runs with warm caches.
+"""
+import argparse, contextlib, copy, importlib, io, json, os, platform, re, statistics, subprocess, sys, tempfile, threading, time
+
+from datetime import datetime, timezone
+
+import requests
+
+
+COLLECTION_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+COLLECTION_PACKAGE = "ansible_collections.justinbatchelor.redhat_assisted_installer"
+
+sys.path.insert(0, os.path.join(COLLECTION_ROOT, "tests", "mock"))
+from assisted_api import API_PATH, IMAGE_PATH, OFFLINE_TOKEN, SSO_PATH, MockAssistedInstaller  # noqa: E402
+
+
+DEFAULT_SIZES = [10, 1000, 10000]
+
+UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+NETWORK_YAML = """interfaces:
+- name: eth0
+  type: ethernet
+  state: up
+  mac-address: 52:54:00:00:{index_hi:02x}:{index_lo:02x}
+  ipv4:
+    enabled: true
+    dhcp: false
+    address:
+    - ip: 192.168.{index_hi}.{index_lo}
+      prefix-length: 16
+dns-resolver:
+  config:
+    server:
+    - 192.168.0.1
+routes:
+  config:
+  - destination: 0.0.0.0/0
+    next-hop-address: 192.168.0.1
+    next-hop-interface: eth0
+"""
+
+
+def load_collection(tmp_dir: str):
+    """
+    Makes the collection importable as ansible_collections.justinbatchelor.redhat_assisted_installer.
+
+    Modules use relative imports of module_utils, so they are loaded from a temporary
+    ansible_collections tree that links back to this checkout.
+    """
+    namespace_dir = os.path.join(tmp_dir, "ansible_collections", "justinbatchelor")
+    os.makedirs(namespace_dir)
+    os.symlink(COLLECTION_ROOT, os.path.join(namespace_dir, "redhat_assisted_installer"))
+    sys.path.insert(0, tmp_dir)
+    return importlib.import_module(COLLECTION_PACKAGE)
+
+
+def import_plugin(name: str):
+    return importlib.import_module(f"{COLLECTION_PACKAGE}.plugins.{name}")
+
+
+class RouteTimer:
+    """
+    Records the number of requests and seconds spent per HTTP route while installed.
+
+    Ids in the path are replaced by {id}, so all calls to one endpoint add up.
+    """
+    def __init__(self) -> None:
+        self.routes = {}
+        self.lock = threading.Lock()
+        self.original = requests.Session.request
+
+    def route(self, method: str, url: str) -> str:
+        path = url.split("://", 1)[-1]
+        path = path[path.find("/"):].split("?", 1)[0]
+        if path.startswith(SSO_PATH):
+            return f"{method} sso/token"
+        if path.startswith(IMAGE_PATH):
+            return f"{method} images/{{id}}"
+        return f"{method} {UUID_PATTERN.sub('{id}', path.replace(API_PATH, '', 1))}"
+
+    def install(self) -> None:
+        timer = self
+
+        def request(session, method, url, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return timer.original(session, method, url, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                key = timer.route(method.upper(), url)
+                with timer.lock:
+                    entry = timer.routes.setdefault(key, dict(count=0, seconds=0.0))
+                    entry["count"] += 1
+                    entry["seconds"] += elapsed
+
+        requests.Session.request = request
+
+    def uninstall(self) -> None:
+        requests.Session.request = self.original
+
+    def take(self) -> dict:
+        with self.lock:
+            routes, self.routes = self.routes, {}
+        return routes
+
+
+def reset_process_state() -> None:
+    """
+    Drops the pooled client, its sessions and the in-memory access tokens, like a new module process.
+    """
+    client = import_plugin("module_utils.client")
+    auth = import_plugin("module_utils.auth")
+    client._client = None
+    for session in list(client._sessions.values()):
+        client.discard_session(session)
+    auth.TOKEN_CACHE.tokens.clear()
+
+
+def run_module(name: str, args: dict) -> dict:
+    """
+    Runs a module in-process with args and returns its result.
+    """
+    from ansible.module_utils import basic
+    from ansible.module_utils.common.text.converters import to_bytes
+
+    module = import_plugin(f"modules.{name}")
+    basic._ANSIBLE_ARGS = to_bytes(json.dumps(dict(ANSIBLE_MODULE_ARGS=args)))
+    basic._ANSIBLE_PROFILE = "legacy"
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            module.run_module()
+        except SystemExit:
+            pass
+    return json.loads(output.getvalue())
+
+
+def summarize(samples: list) -> dict:
+    return dict(
+        min=round(min(samples), 6),
+        median=round(statistics.median(samples), 6),
+        mean=round(statistics.mean(samples), 6),
+        max=round(max(samples), 6),
+    )
+
+
+def bench_module(timer: RouteTimer, name: str, scenario: str, size: int, repeat: int, make_args) -> dict:
+    """
+    Times `repeat` runs of a module, make_args(iteration) returns the module args of each run.
+    """
+    samples = []
+    routes = {}
+    api_requests = []
+    error = None
+
+    # one untimed run so imports and the first connection are not measured
+    reset_process_state()
+    run_module(name, make_args(-1))
+    timer.take()
+
+    for iteration in range(repeat):
+        reset_process_state()
+        args = make_args(iteration)
+        started = time.perf_counter()
+        result = run_module(name, args)
+        samples.append(time.perf_counter() - started)
+
+        if result.get("failed"):
+            error = result.get("msg")
+        api_requests.append((result.get("api_stats") or {}).get("requests", 0))
+        for route, entry in timer.take().items():
+            total = routes.setdefault(route, dict(count=0, seconds=0.0))
+            total["count"] += entry["count"]
+            total["seconds"] += entry["seconds"]
+
+    http = {route: dict(count=entry["count"] / repeat, seconds=round(entry["seconds"] / repeat, 6))
+            for route, entry in sorted(routes.items())}
+    http_seconds = sum(entry["seconds"] for entry in http.values())
+    return dict(
+        group="module",
+        name=f"{name}:{scenario}",
+        size=size,
+        repeat=repeat,
+        seconds=summarize(samples),
+        api_requests=statistics.median(api_requests),
+        http=http,
+        local_seconds=round(max(0.0, statistics.mean(samples) - http_seconds), 6),
+        error=error,
+    )
+
+
+def bench_function(name: str, size: int, repeat: int, func, setup=None) -> dict:
+    """
+    Times `repeat` calls of func, setup() builds a fresh argument for each call when given.
+    """
+    samples = []
+    for _ in range(repeat + 1):
+        argument = setup() if setup is not None else None
+        started = time.perf_counter()
+        func(argument)
+        samples.append(time.perf_counter() - started)
+    # the first call warms up caches such as compiled expressions and is not reported
+    samples = samples[1:]
+    return dict(
+        group="function",
+        name=name,
+        size=size,
+        repeat=repeat,
+        seconds=summarize(samples),
+        per_item_us=round(statistics.median(samples) / size * 1e6, 3),
+    )
+
+
+def module_scenarios(mock: MockAssistedInstaller, size: int, dest_dir: str) -> list:
+    """
+    Returns (module, scenario, make_args) for every module, targeting the last seeded cluster
+    so lookups by name cannot stop early.
+    """
+    clusters = sorted(mock.state.clusters.values(), key=lambda cluster: cluster["name"])
+    target = clusters[-1]
+    infra_env = next(infra_env for infra_env in mock.state.infra_envs.values() if infra_env.get("cluster_id") == target["id"])
+    connection = dict(api_url=mock.api_url, sso_url=mock.sso_url, offline_token=OFFLINE_TOKEN)
+    bulk = clusters[-min(10, len(clusters)):]
+
+    def args(**kwargs):
+        return lambda iteration: dict(connection, **kwargs)
+
+    return [
+        ("cluster_info", "list", args()),
+        ("cluster_info", "by_id", args(cluster_id=target["id"])),
+        ("cluster", "present_unchanged", args(name=target["name"], openshift_version="4.15",
+                                              base_dns_domain="example.com", state="present")),
+        ("cluster", "present_patch", lambda iteration: dict(connection, name=target["name"], openshift_version="4.15",
+                                                            base_dns_domain="example.com", state="present",
+                                                            additional_ntp_sources=[f"ntp{iteration % 2}.example.com"])),
+        ("cluster_bulk", "present_unchanged", args(clusters=[dict(name=cluster["name"], openshift_version="4.15",
+                                                                  base_dns_domain="example.com") for cluster in bulk])),
+        ("cluster_actions", "reset", args(cluster_name=target["name"], state="reset")),
+        ("infra_env", "present_unchanged", args(name=infra_env["name"], openshift_version="4.15", state="present")),
+        ("infra_env_info", "list", args()),
+        ("infra_env_info", "by_id", args(infra_env_id=infra_env["id"])),
+        ("host_info", "list", args(infra_env_id=infra_env["id"])),
+        ("discovery_image", "download", args(infra_env_id=infra_env["id"], force=True,
+                                             dest=os.path.join(dest_dir, "discovery.iso"))),
+    ]
+
+
+def function_scenarios(mock: MockAssistedInstaller, size: int) -> list:
+    """
+    Returns (name, func, setup) for the module_utils functions, with inputs of `size` objects.
+    """
+    tools = import_plugin("module_utils.tools")
+    builders = import_plugin("module_utils.params")
+    infra_env_schema = import_plugin("module_utils.schema.infra_env")
+
+    clusters = list(mock.state.clusters.values())
+    last = clusters[-1]
+    desired = [dict(name=cluster["name"], openshift_version="4.16", base_dns_domain="example.com",
+                    tags="mock,seeded", high_availability_mode="Full") for cluster in clusters]
+    # module params carry every option of the argument spec, unset ones as None
+    unset = dict.fromkeys(builders.cluster_argument_spec())
+    cluster_params = [dict(unset, **params) for params in desired]
+    network_configs = [dict(
+        mac_interface_map=[dict(logical_nic_name="eth0", mac_address=f"52:54:00:00:{index // 256 % 256:02x}:{index % 256:02x}")],
+        # modules receive the yaml escaped, the way it is written in playbooks
+        network_yaml=NETWORK_YAML.format(index_hi=index // 256 % 256, index_lo=index % 256).replace("\n", "\\n"),
+    ) for index in range(size)]
+
+    def remove_all(pairs):
+        for desired_params, current in pairs:
+            tools.remove_matching_pairs(desired_params, current)
+
+    return [
+        ("remove_matching_pairs", remove_all,
+         lambda: [(copy.copy(params), cluster) for params, cluster in zip(desired, clusters)]),
+        ("jmespath_name_validator", lambda _: tools.jmespath_name_validator(last["name"], clusters), None),
+        ("jmespath_id_validator", lambda _: tools.jmespath_id_validator(last["id"], clusters), None),
+        ("schema:cluster", lambda _: [builders.create_cluster_from_module_params(params).create_params()
+                                      for params in cluster_params], None),
+        ("schema:static_network_config", lambda _: [config.create_params() for config in
+                                                    builders.create_static_network_config_from_module_params(network_configs)], None),
+        ("schema:infra_env", lambda _: [infra_env_schema.InfraEnv(name=cluster["name"], cluster_id=cluster["id"],
+                                                                  openshift_version="4.15").create_params()
+                                        for cluster in clusters], None),
+    ]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=COLLECTION_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def collection_version() -> str:
+    try:
+        with open(os.path.join(COLLECTION_ROOT, "galaxy.yml"), "r") as galaxy:
+            match = re.search(r"^version:\s*(\S+)", galaxy.read(), re.MULTILINE)
+        return match.group(1) if match else None
+    except OSError:
+        return None
+
+
+def compare(results: list, baseline_path: str) -> None:
+    """
+    Prints the median time of every result relative to the same result in a baseline file.
+    """
+    with open(baseline_path, "r") as baseline_file:
+        baseline = {(entry["name"], entry["size"]): entry for entry in json.load(baseline_file)["results"]}
+
+    print(f"{'benchmark':48} {'size':>6} {'before':>10} {'after':>10} {'ratio':>7}", file=sys.stderr)
+    for entry in results:
+        before = baseline.get((entry["name"], entry["size"]))
+        if before is None:
+            continue
+        old, new = before["seconds"]["median"], entry["seconds"]["median"]
+        ratio = new / old if old else float("inf")
+        print(f"{entry['name']:48} {entry['size']:>6} {old:>10.4f} {new:>10.4f} {ratio:>6.2f}x", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of seeded clusters")
+    parser.add_argument("--hosts-per-cluster", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs of every benchmark")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the mock adds to every api response")
+    parser.add_argument("--only", help="regular expression selecting the benchmarks to run")
+    parser.add_argument("--skip-modules", action="store_true", help="only time the module_utils functions")
+    parser.add_argument("--output", help="file the JSON results are written to instead of stdout")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    selected = re.compile(args.only) if args.only else None
+    results = []
+    timer = RouteTimer()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        load_collection(tmp_dir)
+        timer.install()
+        try:
+            for size in args.sizes:
+                with MockAssistedInstaller(clusters=size, hosts_per_cluster=args.hosts_per_cluster,
+                                           latency=args.latency, image_size=1024 * 1024) as mock:
+                    if not args.skip_modules:
+                        for name, scenario, make_args in module_scenarios(mock, size, tmp_dir):
+                            if selected is not None and not selected.search(f"{name}:{scenario}"):
+                                continue
+                            results.append(bench_module(timer, name, scenario, size, args.repeat, make_args))
+                            print(f"{name}:{scenario} size={size} median={results[-1]['seconds']['median']:.4f}s",
+                                  file=sys.stderr, flush=True)
+
+                    for name, func, setup in function_scenarios(mock, size):
+                        if selected is not None and not selected.search(name):
+                            continue
+                        results.append(bench_function(name, size, args.repeat, func, setup))
+                        print(f"{name} size={size} median={results[-1]['seconds']['median']:.4f}s",
+                              file=sys.stderr, flush=True)
+        finally:
+            timer.uninstall()
+            reset_process_state()
+
+    report = dict(
+        meta=dict(
+            collection_version=collection_version(),
+            commit=git_commit(),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            created_at=datetime.now(timezone.utc).isoformat(),
+            sizes=args.sizes,
+            hosts_per_cluster=args.hosts_per_cluster,
+            repeat=args.repeat,
+            latency=args.latency,
+        ),
+        results=results,
+    )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
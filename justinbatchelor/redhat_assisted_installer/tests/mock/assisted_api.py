@@ -0,0 +1,713 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the Red Hat Assisted Installer API and the Red Hat SSO token endpoint.
+
+It serves the endpoints used by plugins/module_utils/api.py from memory: clusters, infra-envs,
+hosts, events, cluster actions, credentials and file downloads, discovery image urls and the images
+themselves, and the offline token exchange. Fleets of thousands of objects can be seeded, and
+latency and error responses can be injected, so modules can be tested and benchmarked without
+a Red Hat account.
+
+Point the collection at it with the environment variables printed on startup:
+
+    python tests/mock/assisted_api.py --port 8090 --clusters 1000 --hosts-per-cluster 3 --latency 0.02
+    export REDHAT_API_URL=http://127.0.0.1:8090/api/assisted-install/v2/
+    export REDHAT_SSO_URL=http://127.0.0.1:8090/auth/realms/redhat-external/protocol/openid-connect/token
+    export REDHAT_OFFLINE_TOKEN=mock-offline-token
+    ansible-playbook tests/info-cluster.yaml
+
+From Python, start it in a background thread:
+
+    with MockAssistedInstaller(clusters=100, latency=0.01) as mock:
+        os.environ.update(mock.environment())
+"""
+import argparse, json, random, re, threading, time, uuid
+
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+API_PATH = "/api/assisted-install/v2/"
+SSO_PATH = "/auth/realms/redhat-external/protocol/openid-connect/token"
+IMAGE_PATH = "/images/"
+
+OFFLINE_TOKEN = "mock-offline-token"
+
+# status a cluster moves to when an action is invoked
+ACTION_STATUS = {
+    "allow-add-hosts": "adding-hosts",
+    "allow-add-workers": "adding-hosts",
+    "cancel": "cancelled",
+    "complete-installation": "installed",
+    "install": "installing",
+    "reset": "insufficient",
+}
+
+CLUSTER_STATUSES = ["insufficient", "ready", "pending-for-input", "installing", "installed"]
+HOST_STATUSES = ["discovering", "known", "insufficient", "installed"]
+
+# fields the api accepts but never returns, it reports pull_secret_set instead
+WRITE_ONLY_FIELDS = ("pull_secret",)
+
+# mandatory fields of the POST endpoints
+REQUIRED_CLUSTER_FIELDS = ("name", "openshift_version")
+REQUIRED_INFRA_ENV_FIELDS = ("name",)
+
+
+def timestamp(moment: datetime = None) -> str:
+    return (moment or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class MockState:
+    """
+    The objects served by the stand-in, shared by every request handler thread.
+    """
+    def __init__(self, image_size: int = 1024 * 1024, seed: int = 0) -> None:
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.clusters = {}
+        self.infra_envs = {}
+        self.hosts = {}
+        self.events = []
+        self.last_event_time = datetime.min.replace(tzinfo=timezone.utc)
+        self.tokens = {}
+        self.image = (b"ASSISTED-INSTALLER-MOCK-ISO\n" * (image_size // 28 + 1))[:image_size]
+        self.requests = {}
+
+    def new_id(self) -> str:
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+
+    def count(self, route: str) -> None:
+        with self.lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def add_event(self, message: str, severity: str = "info", name: str = None, **ids) -> dict:
+        # event times are unique and increasing, as they are sorted by
+        self.last_event_time = max(datetime.now(timezone.utc), self.last_event_time + timedelta(microseconds=1))
+        event = dict(event_time=timestamp(self.last_event_time), message=message, severity=severity,
+                     category="user", name=name, request_id=str(uuid.uuid4()), **ids)
+        self.events.append(event)
+        return event
+
+    def create_cluster(self, params: dict, status: str = "insufficient") -> dict:
+        cluster_id = self.new_id()
+        now = timestamp()
+        cluster = dict(
+            kind="Cluster",
+            id=cluster_id,
+            href=f"{API_PATH}clusters/{cluster_id}",
+            status=status,
+            status_info="Cluster is not ready for install",
+            created_at=now,
+            updated_at=now,
+            base_dns_domain=None,
+            cpu_architecture="x86_64",
+            high_availability_mode="Full",
+            hyperthreading="all",
+            api_vips=[],
+            ingress_vips=[],
+            cluster_networks=[dict(cidr="10.128.0.0/14", cluster_id=cluster_id, host_prefix=23)],
+            service_networks=[dict(cidr="172.30.0.0/16", cluster_id=cluster_id)],
+            machine_networks=[],
+            network_type="OVNKubernetes",
+            user_managed_networking=False,
+            vip_dhcp_allocation=False,
+            schedulable_masters=False,
+            pull_secret_set=False,
+            org_id="mock-org",
+            user_name="mock-user",
+            hosts=[],
+            total_host_count=0,
+            ready_host_count=0,
+        )
+        self.apply(cluster, params)
+        for key in ("api_vips", "ingress_vips", "machine_networks", "cluster_networks", "service_networks"):
+            for item in cluster.get(key) or []:
+                item.setdefault("cluster_id", cluster_id)
+        self.clusters[cluster_id] = cluster
+        self.add_event(f"Successfully registered cluster {cluster.get('name')}", name="cluster_registration_succeeded", cluster_id=cluster_id)
+        return cluster
+
+    def create_infra_env(self, params: dict) -> dict:
+        infra_env_id = self.new_id()
+        now = timestamp()
+        infra_env = dict(
+            kind="InfraEnv",
+            id=infra_env_id,
+            href=f"{API_PATH}infra-envs/{infra_env_id}",
+            created_at=now,
+            updated_at=now,
+            cpu_architecture="x86_64",
+            user_name="mock-user",
+            type="minimal-iso",
+            pull_secret_set=False,
+            download_url=None,
+            expires_at="0001-01-01T00:00:00.000Z",
+        )
+        self.apply(infra_env, params)
+        if "image_type" in params:
+            infra_env["type"] = infra_env.pop("image_type")
+        self.infra_envs[infra_env_id] = infra_env
+        return infra_env
+
+    def create_host(self, infra_env: dict, index: int, status: str = "known", role: str = "auto-assign") -> dict:
+        host_id = self.new_id()
+        now = timestamp()
+        mac = "52:54:00:%02x:%02x:%02x" % (self.random.randrange(256), self.random.randrange(256), self.random.randrange(256))
+        address = f"192.168.{self.random.randrange(1, 250)}.{self.random.randrange(2, 250)}/24"
+        hostname = f"{infra_env['name']}-host-{index}"
+        inventory = dict(
+            hostname=hostname,
+            interfaces=[dict(name="eth0", mac_address=mac, ipv4_addresses=[address], ipv6_addresses=[])],
+            disks=[dict(id=f"/dev/disk/by-id/wwn-0x{index:016x}", name="vda", path="/dev/vda",
+                        size_bytes=128 * 1024 ** 3, drive_type="HDD", bootable=True)],
+            cpu=dict(count=8, architecture="x86_64"),
+            memory=dict(physical_bytes=32 * 1024 ** 3),
+        )
+        host = dict(
+            kind="Host",
+            id=host_id,
+            href=f"{API_PATH}infra-envs/{infra_env['id']}/hosts/{host_id}",
+            infra_env_id=infra_env["id"],
+            cluster_id=infra_env.get("cluster_id"),
+            requested_hostname=hostname,
+            role=role,
+            suggested_role="master" if index < 3 else "worker",
+            status=status,
+            status_info="Host is ready to be installed",
+            inventory=json.dumps(inventory),
+            installation_disk_id=inventory["disks"][0]["id"],
+            installation_disk_path="/dev/vda",
+            created_at=now,
+            updated_at=now,
+        )
+        self.hosts[host_id] = host
+        self.add_event(f"Host {hostname}: Successfully registered", name="host_registration_succeeded",
+                       cluster_id=host["cluster_id"], infra_env_id=infra_env["id"], host_id=host_id)
+        cluster = self.clusters.get(infra_env.get("cluster_id"))
+        if cluster is not None:
+            cluster["total_host_count"] += 1
+            cluster["ready_host_count"] += 1 if status == "known" else 0
+        return host
+
+    def apply(self, obj: dict, params: dict) -> None:
+        for key, value in params.items():
+            if key in WRITE_ONLY_FIELDS:
+                obj[f"{key}_set"] = True
+            else:
+                obj[key] = value
+        obj["updated_at"] = timestamp()
+
+    def seed(self, clusters: int = 0, hosts_per_cluster: int = 0, infra_envs: int = 0) -> None:
+        """
+        Creates `clusters` clusters, each with an infra env and `hosts_per_cluster` hosts,
+        plus `infra_envs` infra envs that are not bound to any cluster.
+        """
+        for index in range(clusters):
+            name = f"cluster-{index:05d}"
+            cluster = self.create_cluster(dict(
+                name=name,
+                openshift_version="4.15",
+                base_dns_domain="example.com",
+                high_availability_mode="None" if hosts_per_cluster == 1 else "Full",
+                tags="mock,seeded",
+            ), status=self.random.choice(CLUSTER_STATUSES))
+            infra_env = self.create_infra_env(dict(name=f"{name}-infra-env", cluster_id=cluster["id"], openshift_version="4.15"))
+            for host_index in range(hosts_per_cluster):
+                self.create_host(infra_env, host_index, status=self.random.choice(HOST_STATUSES))
+        for index in range(infra_envs):
+            self.create_infra_env(dict(name=f"infra-env-{index:05d}", openshift_version="4.15"))
+
+    def hosts_by_cluster(self) -> dict:
+        grouped = {}
+        for host in self.hosts.values():
+            grouped.setdefault(host.get("cluster_id"), []).append(host)
+        return grouped
+
+    def cluster_view(self, cluster: dict, with_hosts: bool, hosts_by_cluster: dict = None) -> dict:
+        view = dict(cluster)
+        if with_hosts:
+            hosts_by_cluster = hosts_by_cluster if hosts_by_cluster is not None else self.hosts_by_cluster()
+            view["hosts"] = hosts_by_cluster.get(cluster["id"], [])
+        return view
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # headers and body are written separately, without TCP_NODELAY every response waits for a delayed ack
+    disable_nagle_algorithm = True
+
+    # (method, path pattern relative to API_PATH, handler method)
+    ROUTES = [
+        ("GET", r"clusters", "list_clusters"),
+        ("GET", r"clusters/default-config", "default_config"),
+        ("POST", r"clusters", "post_cluster"),
+        ("GET", r"clusters/(?P<cluster_id>[^/]+)", "get_cluster"),
+        ("PATCH", r"clusters/(?P<cluster_id>[^/]+)", "patch_cluster"),
+        ("DELETE", r"clusters/(?P<cluster_id>[^/]+)", "delete_cluster"),
+        ("POST", r"clusters/(?P<cluster_id>[^/]+)/actions/(?P<action>[^/]+)", "cluster_action"),
+        ("GET", r"clusters/(?P<cluster_id>[^/]+)/credentials", "get_credentials"),
+        ("GET", r"clusters/(?P<cluster_id>[^/]+)/downloads/(?P<kind>credentials|files)", "download_cluster_file"),
+        ("GET", r"infra-envs", "list_infra_envs"),
+        ("POST", r"infra-envs", "post_infra_env"),
+        ("GET", r"infra-envs/(?P<infra_env_id>[^/]+)", "get_infra_env"),
+        ("PATCH", r"infra-envs/(?P<infra_env_id>[^/]+)", "patch_infra_env"),
+        ("DELETE", r"infra-envs/(?P<infra_env_id>[^/]+)", "delete_infra_env"),
+        ("GET", r"infra-envs/(?P<infra_env_id>[^/]+)/hosts", "list_hosts"),
+        ("GET", r"infra-envs/(?P<infra_env_id>[^/]+)/hosts/(?P<host_id>[^/]+)", "get_host"),
+        ("PATCH", r"infra-envs/(?P<infra_env_id>[^/]+)/hosts/(?P<host_id>[^/]+)", "patch_host"),
+        ("GET", r"infra-envs/(?P<infra_env_id>[^/]+)/downloads/image-url", "image_url"),
+        ("GET", r"events", "list_events"),
+    ]
+    COMPILED_ROUTES = [(method, re.compile(f"^{pattern}$"), handler, pattern) for method, pattern, handler in ROUTES]
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    @property
+    def state(self) -> MockState:
+        return self.server.state
+
+    def send_json(self, code: int, obj=None, headers: dict = None) -> None:
+        self.send_raw_json(code, json.dumps(obj).encode("utf-8") if obj is not None else b"", headers)
+
+    def send_raw_json(self, code: int, body: bytes, headers: dict = None) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, code: int, reason: str, headers: dict = None) -> None:
+        self.send_json(code, dict(code=str(code), href="", id=code, kind="Error", reason=reason), headers)
+
+    # route handlers run under the state lock and return one of these, the response is sent after the lock is released
+
+    def json_response(self, code: int, obj=None) -> tuple:
+        return "json", code, obj
+
+    def error_response(self, code: int, reason: str) -> tuple:
+        return "json", code, dict(code=str(code), href="", id=code, kind="Error", reason=reason)
+
+    def bytes_response(self, data: bytes) -> tuple:
+        return "bytes", 200, data
+
+    def send_bytes(self, data: bytes, content_type: str = "application/octet-stream") -> None:
+        """
+        Sends data honoring a single Range header, throttled to the configured per-connection rate.
+        """
+        start, end = 0, len(data) - 1
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(end + 1 - start))
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+
+        slice_size = 64 * 1024
+        started = time.monotonic()
+        sent = 0
+        for offset in range(start, end + 1, slice_size):
+            chunk = data[offset:min(offset + slice_size, end + 1)]
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if self.server.download_rate:
+                ahead = sent / self.server.download_rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length == 0:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def authorized(self) -> bool:
+        if not self.server.require_auth:
+            return True
+        header = self.headers.get("Authorization", "")
+        expires = self.state.tokens.get(header[len("Bearer "):]) if header.startswith("Bearer ") else None
+        return expires is not None and expires > time.time()
+
+    def inject(self) -> bool:
+        """
+        Applies the configured latency and error injection, returns True when an error was sent.
+        """
+        if self.server.latency or self.server.jitter:
+            time.sleep(self.server.latency + random.uniform(0, self.server.jitter))
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self.read_json() if self.command in ("POST", "PATCH") else None
+            self.send_error_json(self.server.error_status, "Injected error", {"Retry-After": "0"})
+            return True
+        return False
+
+    def dispatch(self) -> None:
+        url = urlsplit(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path == SSO_PATH and self.command == "POST":
+            self.state.count("POST sso/token")
+            return self.token()
+
+        if url.path.startswith(IMAGE_PATH) and self.command in ("GET", "HEAD"):
+            self.state.count("GET images")
+            return self.send_bytes(self.state.image)
+
+        if not url.path.startswith(API_PATH):
+            return self.send_error_json(404, f"Unknown path {url.path}")
+
+        endpoint = url.path[len(API_PATH):].strip("/")
+        for method, pattern, handler, template in self.COMPILED_ROUTES:
+            match = pattern.match(endpoint)
+            if method == self.command and match:
+                self.state.count(f"{method} {template}")
+                if self.inject():
+                    return
+                if not self.authorized():
+                    return self.send_error_json(401, "Invalid or expired access token")
+                with self.state.lock:
+                    kind, code, payload = getattr(self, handler)(**match.groupdict())
+                    # serialize while the objects cannot change underneath
+                    if kind == "json":
+                        payload = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                if kind == "bytes":
+                    return self.send_bytes(payload)
+                return self.send_raw_json(code, payload)
+        return self.send_error_json(404, f"No route for {self.command} {endpoint}")
+
+    do_GET = do_POST = do_PATCH = do_DELETE = do_HEAD = dispatch
+
+    # sso
+
+    def token(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        if form.get("refresh_token", [None])[0] != self.server.offline_token:
+            return self.send_json(400, dict(error="invalid_grant", error_description="Invalid refresh token"))
+        access_token = uuid.uuid4().hex
+        with self.state.lock:
+            self.state.tokens[access_token] = time.time() + self.server.token_lifetime
+        self.send_json(200, dict(access_token=access_token, expires_in=self.server.token_lifetime, token_type="Bearer"))
+
+    # clusters
+
+    def list_clusters(self) -> None:
+        with_hosts = self.query.get("with_hosts") == "true"
+        owner = self.query.get("owner")
+        hosts_by_cluster = self.state.hosts_by_cluster() if with_hosts else None
+        clusters = [self.state.cluster_view(cluster, with_hosts, hosts_by_cluster) for cluster in self.state.clusters.values()
+                    if owner is None or cluster.get("user_name") == owner]
+        return self.json_response(200, clusters)
+
+    def default_config(self) -> None:
+        return self.json_response(200, dict(
+            cluster_network_cidr="10.128.0.0/14",
+            cluster_network_host_prefix=23,
+            service_network_cidr="172.30.0.0/16",
+            ntp_source="",
+            inactive_deletion_hours=480,
+        ))
+
+    def post_cluster(self) -> None:
+        params = self.read_json()
+        missing = [key for key in REQUIRED_CLUSTER_FIELDS if not params.get(key)]
+        if missing:
+            return self.error_response(400, f"Missing required fields: {', '.join(missing)}")
+        return self.json_response(201, self.state.cluster_view(self.state.create_cluster(params), True))
+
+    def get_cluster(self, cluster_id: str) -> None:
+        cluster = self.state.clusters.get(cluster_id)
+        if cluster is None:
+            return self.error_response(404, f"Cluster {cluster_id} not found")
+        return self.json_response(200, self.state.cluster_view(cluster, True))
+
+    def patch_cluster(self, cluster_id: str) -> None:
+        cluster = self.state.clusters.get(cluster_id)
+        params = self.read_json()
+        if cluster is None:
+            return self.error_response(404, f"Cluster {cluster_id} not found")
+        self.state.apply(cluster, params)
+        return self.json_response(201, self.state.cluster_view(cluster, True))
+
+    def delete_cluster(self, cluster_id: str) -> None:
+        if self.state.clusters.pop(cluster_id, None) is None:
+            return self.error_response(404, f"Cluster {cluster_id} not found")
+        return self.json_response(204)
+
+    def cluster_action(self, cluster_id: str, action: str) -> None:
+        cluster = self.state.clusters.get(cluster_id)
+        self.read_json()
+        if cluster is None:
+            return self.error_response(404, f"Cluster {cluster_id} not found")
+        if action not in ACTION_STATUS:
+            return self.error_response(404, f"Unknown action {action}")
+        cluster["status"] = ACTION_STATUS[action]
+        cluster["status_info"] = f"Cluster status changed by the {action} action"
+        cluster["updated_at"] = timestamp()
+        self.state.add_event(f"Updated status of the cluster to {cluster['status']}", name="cluster_status_updated", cluster_id=cluster_id)
+        return self.json_response(202, self.state.cluster_view(cluster, True))
+
+    def get_credentials(self, cluster_id: str) -> None:
+        if cluster_id not in self.state.clusters:
+            return self.error_response(404, f"Cluster {cluster_id} not found")
+        cluster = self.state.clusters[cluster_id]
+        return self.json_response(200, dict(
+            username="kubeadmin",
+            password="mock-kubeadmin-password",
+            console_url=f"https://console-openshift-console.apps.{cluster['name']}.{cluster.get('base_dns_domain')}",
+        ))
+
+    def download_cluster_file(self, cluster_id: str, kind: str) -> None:
+        if cluster_id not in self.state.clusters:
+            return self.error_response(404, f"Cluster {cluster_id} not found")
+        file_name = self.query.get("file_name")
+        if not file_name:
+            return self.error_response(400, "file_name is required")
+        content = f"# mock {kind} file {file_name} of cluster {cluster_id}\n".encode("utf-8")
+        return self.bytes_response(content * max(1, self.server.file_size // len(content)))
+
+    # infra envs
+
+    def list_infra_envs(self) -> None:
+        cluster_id = self.query.get("cluster_id")
+        owner = self.query.get("owner")
+        return self.json_response(200, [infra_env for infra_env in self.state.infra_envs.values()
+                             if (cluster_id is None or infra_env.get("cluster_id") == cluster_id)
+                             and (owner is None or infra_env.get("user_name") == owner)])
+
+    def post_infra_env(self) -> None:
+        params = self.read_json()
+        missing = [key for key in REQUIRED_INFRA_ENV_FIELDS if not params.get(key)]
+        if missing:
+            return self.error_response(400, f"Missing required fields: {', '.join(missing)}")
+        if params.get("cluster_id") is not None and params["cluster_id"] not in self.state.clusters:
+            return self.error_response(400, f"Cluster {params['cluster_id']} not found")
+        return self.json_response(201, self.state.create_infra_env(params))
+
+    def get_infra_env(self, infra_env_id: str) -> None:
+        infra_env = self.state.infra_envs.get(infra_env_id)
+        if infra_env is None:
+            return self.error_response(404, f"Infra env {infra_env_id} not found")
+        return self.json_response(200, infra_env)
+
+    def patch_infra_env(self, infra_env_id: str) -> None:
+        infra_env = self.state.infra_envs.get(infra_env_id)
+        params = self.read_json()
+        if infra_env is None:
+            return self.error_response(404, f"Infra env {infra_env_id} not found")
+        self.state.apply(infra_env, params)
+        return self.json_response(201, infra_env)
+
+    def delete_infra_env(self, infra_env_id: str) -> None:
+        if self.state.infra_envs.pop(infra_env_id, None) is None:
+            return self.error_response(404, f"Infra env {infra_env_id} not found")
+        return self.json_response(204)
+
+    def list_hosts(self, infra_env_id: str) -> None:
+        if infra_env_id not in self.state.infra_envs:
+            return self.error_response(404, f"Infra env {infra_env_id} not found")
+        return self.json_response(200, [host for host in self.state.hosts.values() if host["infra_env_id"] == infra_env_id])
+
+    def get_host(self, infra_env_id: str, host_id: str) -> None:
+        host = self.state.hosts.get(host_id)
+        if host is None or host["infra_env_id"] != infra_env_id:
+            return self.error_response(404, f"Host {host_id} not found")
+        return self.json_response(200, host)
+
+    def patch_host(self, infra_env_id: str, host_id: str) -> None:
+        host = self.state.hosts.get(host_id)
+        params = self.read_json()
+        if host is None or host["infra_env_id"] != infra_env_id:
+            return self.error_response(404, f"Host {host_id} not found")
+        inventory = json.loads(host["inventory"])
+        disks = {disk["id"]: disk for disk in inventory.get("disks", [])}
+        for config in params.get("disks_selected_config") or []:
+            if config.get("id") not in disks:
+                return self.error_response(400, f"Disk {config.get('id')} not found on host {host_id}")
+        if "host_role" in params:
+            host["role"] = params["host_role"]
+        if "host_name" in params:
+            host["requested_hostname"] = params["host_name"]
+        for config in params.get("disks_selected_config") or []:
+            if config.get("role") == "install":
+                host.update(installation_disk_id=config["id"], installation_disk_path=disks[config["id"]]["path"])
+        host["updated_at"] = timestamp()
+        self.state.add_event(f"Host {host['requested_hostname']}: updated", name="host_updated",
+                             cluster_id=host["cluster_id"], infra_env_id=infra_env_id, host_id=host_id)
+        return self.json_response(201, host)
+
+    def list_events(self) -> None:
+        filters = {key: self.query[key] for key in ("cluster_id", "infra_env_id", "host_id") if self.query.get(key)}
+        if not filters:
+            return self.error_response(400, "cluster_id, infra_env_id or host_id is required")
+        severities = set(self.query["severities"].split(",")) if self.query.get("severities") else None
+        categories = set(self.query["categories"].split(",")) if self.query.get("categories") else None
+        events = [event for event in self.state.events
+                  if all(event.get(key) == value for key, value in filters.items())
+                  and (severities is None or event["severity"] in severities)
+                  and (categories is None or event["category"] in categories)]
+        if self.query.get("order") == "descending":
+            events.reverse()
+        offset = int(self.query.get("offset") or 0)
+        limit = int(self.query["limit"]) if self.query.get("limit") else None
+        events = events[offset:offset + limit if limit is not None else None]
+        return self.json_response(200, events)
+
+    def image_url(self, infra_env_id: str) -> None:
+        infra_env = self.state.infra_envs.get(infra_env_id)
+        if infra_env is None:
+            return self.error_response(404, f"Infra env {infra_env_id} not found")
+        host, port = self.server.server_address[:2]
+        expires_at = (datetime.now(timezone.utc) + timedelta(hours=4)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        url = f"http://{host}:{port}{IMAGE_PATH}{infra_env_id}/{infra_env.get('type', 'minimal-iso')}.iso?image_token={uuid.uuid4().hex}"
+        infra_env.update(download_url=url, expires_at=expires_at)
+        return self.json_response(200, dict(url=url, expires_at=expires_at))
+
+
+class MockAssistedInstaller:
+    """
+    Runs the stand-in on a background thread, usable as a context manager.
+
+    Args:
+        host (str): Address to listen on.
+        port (int): Port to listen on, 0 picks a free port.
+        clusters (int): Number of clusters to seed, each with one infra env.
+        hosts_per_cluster (int): Number of hosts seeded in every cluster's infra env.
+        infra_envs (int): Number of extra infra envs seeded without a cluster.
+        latency (float): Seconds added to every API response.
+        jitter (float): Upper bound of a random number of seconds added on top of latency.
+        error_rate (float): Fraction of API requests answered with error_status instead.
+        error_status (int): Status of injected errors, sent with Retry-After: 0.
+        require_auth (bool): Reject API requests without an access token minted by the SSO endpoint.
+        token_lifetime (int): Seconds an access token stays valid.
+        image_size (int): Size in bytes of the discovery images.
+        file_size (int): Approximate size in bytes of downloaded cluster files.
+        download_rate (float): Bytes per second one download connection is throttled to, 0 for unlimited.
+        seed (int): Seed of the generated ids and statuses.
+    """
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 clusters: int = 0,
+                 hosts_per_cluster: int = 0,
+                 infra_envs: int = 0,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 error_status: int = 503,
+                 require_auth: bool = True,
+                 token_lifetime: int = 900,
+                 image_size: int = 1024 * 1024,
+                 file_size: int = 4096,
+                 download_rate: float = 0,
+                 seed: int = 0,
+                 verbose: bool = False,
+                 ) -> None:
+        self.state = MockState(image_size=image_size, seed=seed)
+        self.state.seed(clusters, hosts_per_cluster, infra_envs)
+        self.server = ThreadingHTTPServer((host, port), MockHandler)
+        self.server.daemon_threads = True
+        self.server.state = self.state
+        self.server.latency = latency
+        self.server.jitter = jitter
+        self.server.error_rate = error_rate
+        self.server.error_status = error_status
+        self.server.require_auth = require_auth
+        self.server.token_lifetime = token_lifetime
+        self.server.offline_token = OFFLINE_TOKEN
+        self.server.file_size = file_size
+        self.server.download_rate = download_rate
+        self.server.verbose = verbose
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        return self.base_url + API_PATH
+
+    @property
+    def sso_url(self) -> str:
+        return self.base_url + SSO_PATH
+
+    def environment(self) -> dict:
+        """
+        Returns the environment variables that point the collection at the stand-in.
+        """
+        return dict(REDHAT_API_URL=self.api_url, REDHAT_SSO_URL=self.sso_url, REDHAT_OFFLINE_TOKEN=OFFLINE_TOKEN)
+
+    def start(self) -> "MockAssistedInstaller":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockAssistedInstaller":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--clusters", type=int, default=10, help="number of seeded clusters")
+    parser.add_argument("--hosts-per-cluster", type=int, default=3, help="number of seeded hosts per cluster")
+    parser.add_argument("--infra-envs", type=int, default=0, help="number of seeded infra envs without a cluster")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every api response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra seconds added to every api response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of api requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="status of injected errors")
+    parser.add_argument("--no-auth", action="store_true", help="accept api requests without an access token")
+    parser.add_argument("--token-lifetime", type=int, default=900, help="seconds an access token stays valid")
+    parser.add_argument("--image-size", type=int, default=1024 * 1024, help="size of the discovery images in bytes")
+    parser.add_argument("--download-rate", type=float, default=0, help="bytes per second per download connection")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    mock = MockAssistedInstaller(
+        host=args.host, port=args.port, clusters=args.clusters, hosts_per_cluster=args.hosts_per_cluster,
+        infra_envs=args.infra_envs, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        error_status=args.error_status, require_auth=not args.no_auth, token_lifetime=args.token_lifetime,
+        image_size=args.image_size, download_rate=args.download_rate, seed=args.seed, verbose=args.verbose,
+    )
+    for key, value in mock.environment().items():
+        print(f"export {key}={value}", flush=True)
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Checks the offline validation of cluster and infrastructure environment params against the embedded API schema.
+
+Every case builds params as the modules do, validates them with validate_params and compares the
+paths reported with the ones expected, so a schema field the validator stops reaching, such as a
+params key not named like its schema field, fails the check instead of going unnoticed.
+
+    python tests/schema_validation.py
+
+The script exits with 1 when a case reports other problems than expected.
+"""
+import os, shutil, sys, tempfile
+
+
+COLLECTION_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+COLLECTION_PACKAGE = "ansible_collections.justinbatchelor.redhat_assisted_installer"
+
+VALID_CLUSTER = dict(
+    name="edge-01",
+    openshift_version="4.15",
+    base_dns_domain="example.com",
+    cluster_networks=[dict(cidr="10.128.0.0/14", host_prefix=23)],
+    service_networks=[dict(cidr="172.30.0.0/16")],
+    machine_networks=[dict(cidr="192.168.1.0/24")],
+    api_vips=[dict(ip="192.168.1.100")],
+    olm_operators=[dict(name="lvm")],
+)
+
+# (kind, description, module params overriding the valid ones, paths of the problems expected)
+CASES = [
+    ("cluster", "valid cluster", {}, []),
+    ("cluster", "name too long", dict(name="c" * 55), ["name"]),
+    ("cluster", "invalid cidr and vip", dict(cluster_networks=[dict(cidr="10.128.0.0/33", host_prefix=23)], api_vips=[dict(ip="x")]),
+     ["cluster_networks[0].cidr", "api_vips[0].ip"]),
+    ("cluster", "invalid operator", dict(olm_operators=[dict(name="lvm"), dict(name=5, properties=["a"])]),
+     ["olm_operators[1].name", "olm_operators[1].properties"]),
+    ("cluster", "unknown architecture", dict(cpu_architecture="sparc"), ["cpu_architecture"]),
+    ("infra_env", "invalid kernel argument and mac address",
+     dict(kernel_arguments=[dict(operation="append", value="quiet ")],
+          static_network_config=[dict(mac_interface_map=[dict(logical_nic_name="eth0", mac_address="52:54:00:aa:00")])]),
+     ["kernel_arguments[0].value", "static_network_config[0].mac_interface_map[0].mac_address"]),
+]
+
+
+def load_collection(tmp_dir: str):
+    target = os.path.join(tmp_dir, "ansible_collections", "justinbatchelor", "redhat_assisted_installer")
+    shutil.copytree(os.path.join(COLLECTION_ROOT, "plugins"), os.path.join(target, "plugins"),
+                    ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+    sys.path.insert(0, tmp_dir)
+
+
+def build_params(kind: str, overrides: dict) -> dict:
+    from ansible_collections.justinbatchelor.redhat_assisted_installer.plugins.module_utils.params import create_cluster_from_module_params
+    from ansible_collections.justinbatchelor.redhat_assisted_installer.plugins.module_utils.schema.infra_env import InfraEnv
+
+    if kind == "cluster":
+        module_params = dict(VALID_CLUSTER, **overrides)
+        return create_cluster_from_module_params(module_params).create_params()
+    return InfraEnv(name="edge-01").create_params() | overrides
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        load_collection(tmp_dir)
+        from ansible_collections.justinbatchelor.redhat_assisted_installer.plugins.module_utils.validation import validate_params
+
+        for kind, description, overrides, expected in CASES:
+            errors = validate_params(kind, build_params(kind, overrides))
+            paths = sorted(error.split(":", 1)[0] for error in errors)
+            expected = sorted(expected)
+            status = "ok" if paths == expected else "FAIL"
+            print(f"{status:4} {kind:9} {description}")
+            if paths != expected:
+                failures.append(f"{kind} {description}: expected problems at {expected}, got {errors}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()